@@ -0,0 +1,176 @@
+"""
+Micro-benchmark da extração de assinaturas do relatório de /simples.
+
+Compara process_relatorio (extração guiada por mapas de campos, com o plano
+de cada formato em cache) com a implementação original, que procurava a
+lista de assinaturas com str(value[0]).lower() em cada lista do topo e
+resolvia cada campo com .get encadeados. Não usa rede.
+
+Uso:
+    python benchmarks/bench_relatorio.py
+    python benchmarks/bench_relatorio.py --signatures 1000 --padding 5000 -o relatorio.json
+"""
+
+import argparse
+import json
+import sys
+import timeit
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+if str(RAIZ) not in sys.path:
+    sys.path.insert(0, str(RAIZ))
+
+from validator_api.relatorio import process_relatorio  # noqa: E402
+
+
+def process_relatorio_original(relatorio, filename):
+    """Implementação anterior de process_relatorio (referência)."""
+    try:
+        assinaturas = []
+        if isinstance(relatorio, dict):
+            if 'assinaturas' in relatorio:
+                assinaturas_raw = relatorio['assinaturas']
+            elif 'signatures' in relatorio:
+                assinaturas_raw = relatorio['signatures']
+            else:
+                assinaturas_raw = []
+                for key, value in relatorio.items():
+                    if isinstance(value, list) and len(value) > 0:
+                        if any(k in str(value[0]).lower() for k in ['assinado', 'cpf', 'certificado', 'signature']):
+                            assinaturas_raw = value
+                            break
+            for assinatura in assinaturas_raw:
+                if isinstance(assinatura, dict):
+                    assinatura_info = {
+                        'assinado_por': assinatura.get('nome', assinatura.get('signerName', assinatura.get('assinado_por', 'N/A'))),
+                        'cpf': assinatura.get('cpf', assinatura.get('CPF', 'N/A')),
+                        'certificadora': assinatura.get('certificadora', 'N/A'),
+                        'numero_serie_certificado': assinatura.get('numSerial', assinatura.get('serialNumber', assinatura.get('numero_serie', 'N/A'))),
+                        'data_assinatura': assinatura.get('data', assinatura.get('signatureDate', assinatura.get('data_assinatura', 'N/A'))),
+                        'status': assinatura.get('status', assinatura.get('resultado', 'N/A')),
+                        'possui_carimbo_tempo': assinatura.get('possuiCarimboTempo', False)
+                    }
+                    assinaturas.append(assinatura_info)
+            doc_info = {
+                'nome_arquivo': relatorio.get('nomeArquivo', filename),
+                'hash': relatorio.get('hash', relatorio.get('documentHash', 'N/A')),
+                'data_validacao': relatorio.get('dataValidacao', relatorio.get('validationDate', 'N/A')),
+                'status_documento': relatorio.get('statusDocumento', 'N/A')
+            }
+            return {
+                'status': 'valid' if assinaturas else 'invalid',
+                'documento': doc_info,
+                'assinaturas': assinaturas,
+                'total_assinaturas': len(assinaturas),
+                'relatorio_completo': relatorio
+            }
+        return {
+            'status': 'unknown',
+            'relatorio_completo': relatorio
+        }
+    except Exception as e:
+        return {
+            'status': 'error',
+            'error': f"Erro ao processar relatório: {str(e)}",
+            'relatorio_completo': relatorio
+        }
+
+
+def _assinatura_pt(i):
+    return {
+        "nome": f"SIGNATARIO {i}",
+        "cpf": f"***.{i % 1000:03d}.***-**",
+        "certificadora": "AC FALSA v5",
+        "numSerial": f"{i:032x}",
+        "data": "01/01/2025 11:59:00",
+        "status": "Aprovado",
+        "possuiCarimboTempo": i % 2 == 0,
+    }
+
+
+def _assinatura_en(i):
+    return {
+        "signerName": f"SIGNER {i}",
+        "CPF": f"***.{i % 1000:03d}.***-**",
+        "certificadora": "AC FALSA v5",
+        "serialNumber": f"{i:032x}",
+        "signatureDate": "2025-01-01T11:59:00",
+        "resultado": "Approved",
+    }
+
+
+def _cadeia(tamanho):
+    """Lista grande de certificados, vista antes das assinaturas pela busca original."""
+    return [
+        {"emissor": f"AC {n}", "politicas": [{"oid": f"2.16.76.1.{n}.{k}", "url": "http://exemplo"} for k in range(5)]}
+        for n in range(tamanho)
+    ]
+
+
+def montar_relatorios(assinaturas, padding):
+    """Relatórios grandes nos formatos suportados."""
+    topo = {"nomeArquivo": "doc.pdf", "hash": "0" * 64, "dataValidacao": "01/01/2025", "statusDocumento": "Aprovado"}
+    return {
+        # Lista de assinaturas em 'assinaturas' (formato usual do ITI)
+        "chave_assinaturas": {
+            **topo,
+            "assinaturas": [_assinatura_pt(i) for i in range(assinaturas)],
+        },
+        # Sem 'assinaturas'/'signatures': a busca original serializa o primeiro
+        # elemento de cada lista do topo até achar a das assinaturas
+        "lista_no_topo": {
+            "documentHash": "0" * 64,
+            "validationDate": "2025-01-01",
+            "cadeia": [{"emissores": _cadeia(padding)}],
+            "itens": [_assinatura_en(i) for i in range(assinaturas)],
+        },
+        # Assinaturas abaixo do topo (a implementação original não as encontra)
+        "aninhado": {
+            **topo,
+            "validacao": {"documento": {"assinaturas": [_assinatura_pt(i) for i in range(assinaturas)]}},
+        },
+    }
+
+
+def medir(funcao, relatorio, repeticoes):
+    funcao(relatorio, "doc.pdf")  # aquecimento (planos em cache)
+    tempos = timeit.repeat(lambda: funcao(relatorio, "doc.pdf"), number=repeticoes, repeat=5)
+    return min(tempos) / repeticoes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmark da extração de assinaturas")
+    parser.add_argument("--signatures", type=int, default=200, help="Assinaturas por relatório")
+    parser.add_argument("--padding", type=int, default=2000, help="Certificados na lista vista antes das assinaturas")
+    parser.add_argument("-n", "--number", type=int, default=50, help="Execuções por medição")
+    parser.add_argument("-o", "--output", help="Grava os resultados em JSON")
+    args = parser.parse_args(argv)
+
+    resultados = []
+    for formato, relatorio in montar_relatorios(args.signatures, args.padding).items():
+        original = medir(process_relatorio_original, relatorio, args.number)
+        novo = medir(process_relatorio, relatorio, args.number)
+        item = {
+            "formato": formato,
+            "original_us": original * 1e6,
+            "novo_us": novo * 1e6,
+            "assinaturas_original": process_relatorio_original(relatorio, "doc.pdf")["total_assinaturas"],
+            "assinaturas_novo": process_relatorio(relatorio, "doc.pdf")["total_assinaturas"],
+        }
+        # Só faz sentido comparar tempos quando as duas extraem as mesmas assinaturas
+        comparavel = item["assinaturas_original"] == item["assinaturas_novo"]
+        item["speedup"] = original / novo if comparavel else None
+        resultados.append(item)
+        speedup = f"{item['speedup']:7.2f}x" if comparavel else "     n/d"
+        print(
+            f"{formato:18} original {item['original_us']:10.1f} µs  novo {item['novo_us']:10.1f} µs"
+            f"  {speedup}  assinaturas {item['assinaturas_original']} -> {item['assinaturas_novo']}"
+        )
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(resultados, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""
+Servidor local que imita a API do ITI, para benchmarks.
+
+Responde /arquivo, /url, /simples, /conformidade e /downloadPdf com o mesmo
+formato do validar.iti.gov.br, com latência, taxa de erros, respostas 429 e
+tamanho das respostas configuráveis. Não valida assinatura nenhuma: um
+documento é considerado assinado se contém "/ByteRange".
+
+Uso isolado:
+    python benchmarks/fake_iti.py --port 8080 --latency 0.05 --throttle-rate 0.1
+    ITI_BASE_URL=http://127.0.0.1:8080 python -m validator_api batch docs/
+"""
+
+import argparse
+import json
+import random
+import socket
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+TAMANHO_BLOCO_LEITURA = 64 * 1024
+
+
+@dataclass
+class FakeItiConfig:
+    """
+    Comportamento do servidor.
+
+    Args:
+        latency: Latência (segundos) de cada resposta, ou dict endpoint -> latência
+        jitter: Variação aleatória somada à latência (0 a jitter segundos)
+        error_rate: Fração das requisições respondidas com HTTP 500
+        throttle_rate: Fração das requisições respondidas com HTTP 429
+        retry_after: Valor do header Retry-After nas respostas 429 (None = sem header)
+        signatures: Número de assinaturas nos relatórios de /simples e /conformidade
+        json_bruto_size: Tamanho aproximado (bytes) do json_bruto devolvido por /arquivo
+        pdf_size: Tamanho (bytes) do PDF devolvido por /downloadPdf
+        contadores: Requisições recebidas por endpoint (preenchido pelo servidor)
+    """
+    latency: object = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    throttle_rate: float = 0.0
+    retry_after: object = None
+    signatures: int = 1
+    json_bruto_size: int = 2048
+    pdf_size: int = 64 * 1024
+    contadores: dict = field(default_factory=dict)
+
+    def atraso(self, endpoint):
+        latencia = self.latency.get(endpoint, 0.0) if isinstance(self.latency, dict) else self.latency
+        if self.jitter:
+            latencia += random.uniform(0, self.jitter)
+        return latencia
+
+
+def relatorio_falso(assinaturas, nome_arquivo="documento.pdf"):
+    """Monta um relatório no formato de /simples e /conformidade."""
+    return {
+        "nomeArquivo": nome_arquivo,
+        "hash": "0" * 64,
+        "dataValidacao": "01/01/2025 12:00:00",
+        "statusDocumento": "Aprovado",
+        "assinaturas": [
+            {
+                "nome": f"SIGNATARIO {i}",
+                "cpf": f"***.{i:03d}.***-**",
+                "certificadora": "AC FALSA v5",
+                "numSerial": f"{i:032x}",
+                "data": "01/01/2025 11:59:00",
+                "status": "Aprovado",
+                "possuiCarimboTempo": i % 2 == 0,
+            }
+            for i in range(assinaturas)
+        ],
+    }
+
+
+class FakeItiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def config(self):
+        return self.server.config
+
+    def do_POST(self):
+        endpoint = self.path.strip("/").split("?", 1)[0]
+        config = self.config
+        with self.server.lock:
+            config.contadores[endpoint] = config.contadores.get(endpoint, 0) + 1
+
+        if endpoint == "arquivo":
+            assinado = self._consumir_corpo(b"/ByteRange")
+        else:
+            corpo = self._consumir_corpo()
+
+        atraso = config.atraso(endpoint)
+        if atraso > 0:
+            time.sleep(atraso)
+
+        sorteio = random.random()
+        if sorteio < config.throttle_rate:
+            headers = {}
+            if config.retry_after is not None:
+                headers["Retry-After"] = str(config.retry_after)
+            return self._responder(429, b'{"erro": "Too Many Requests"}', headers=headers)
+        if sorteio < config.throttle_rate + config.error_rate:
+            return self._responder(500, b'{"erro": "Internal Server Error"}')
+
+        if endpoint == "arquivo":
+            if not assinado:
+                return self._responder(400, b'{"erro": "Nenhuma assinatura encontrada"}')
+            return self._responder_json({"identificador": "fake", "dados": "x" * config.json_bruto_size})
+        if endpoint == "url":
+            return self._responder_json({"identificador": "fake", "dados": "x" * config.json_bruto_size})
+        if endpoint in ("simples", "conformidade"):
+            return self._responder_json(relatorio_falso(config.signatures))
+        if endpoint == "downloadPdf":
+            try:
+                json.loads(corpo)
+            except ValueError:
+                return self._responder(400, b'{"erro": "JSON invalido"}')
+            return self._responder_pdf(config.pdf_size)
+        return self._responder(404, b'{"erro": "Not Found"}')
+
+    def _consumir_corpo(self, marcador=None):
+        """
+        Lê o corpo em blocos. Sem marcador, retorna os bytes; com marcador,
+        retorna apenas se ele apareceu (sem guardar uploads grandes na memória).
+        """
+        restante = int(self.headers.get("Content-Length", 0))
+        if marcador is None:
+            return self.rfile.read(restante)
+        encontrado = False
+        cauda = b""
+        while restante > 0:
+            bloco = self.rfile.read(min(TAMANHO_BLOCO_LEITURA, restante))
+            if not bloco:
+                break
+            restante -= len(bloco)
+            if not encontrado:
+                janela = cauda + bloco
+                encontrado = marcador in janela
+                cauda = janela[-len(marcador):]
+        return encontrado
+
+    def _cabecalhos(self, status, content_type, tamanho, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(tamanho))
+        for nome, valor in (headers or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+
+    def _responder(self, status, corpo, content_type="application/json", headers=None):
+        self._cabecalhos(status, content_type, len(corpo), headers)
+        self.wfile.write(corpo)
+
+    def _responder_json(self, dados):
+        self._responder(200, json.dumps(dados).encode("utf-8"))
+
+    def _responder_pdf(self, tamanho):
+        self._cabecalhos(200, "application/pdf", tamanho)
+        cabecalho = b"%PDF-1.4\n"
+        self.wfile.write(cabecalho)
+        restante = tamanho - len(cabecalho)
+        bloco = b"0" * TAMANHO_BLOCO_LEITURA
+        while restante > 0:
+            self.wfile.write(bloco[:restante])
+            restante -= len(bloco)
+
+
+class FakeItiServer(ThreadingHTTPServer):
+    """
+    Servidor HTTP (uma thread por conexão) com a configuração compartilhada.
+
+    Args:
+        config: FakeItiConfig (alterável entre cenários)
+        host, port: Endereço de escuta (port=0 escolhe uma porta livre)
+    """
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.config = config or FakeItiConfig()
+        self.lock = threading.Lock()
+        super().__init__((host, port), FakeItiHandler)
+
+    def get_request(self):
+        # Sem Nagle: cabeçalhos e corpo saem em writes separados, e o delayed
+        # ACK do cliente somaria ~40 ms a cada resposta
+        conexao, endereco = super().get_request()
+        conexao.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return conexao, endereco
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Atende requisições em uma thread de fundo."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor local que imita a API do ITI")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0, help="Latência por resposta (segundos)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Variação aleatória da latência")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fração de respostas HTTP 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fração de respostas HTTP 429")
+    parser.add_argument("--retry-after", type=float, default=None, help="Retry-After das respostas 429")
+    parser.add_argument("--signatures", type=int, default=1, help="Assinaturas por relatório")
+    parser.add_argument("--json-bruto-size", type=int, default=2048, help="Tamanho do json_bruto (bytes)")
+    parser.add_argument("--pdf-size", type=int, default=64 * 1024, help="Tamanho do PDF do relatório (bytes)")
+    args = parser.parse_args(argv)
+
+    config = FakeItiConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        signatures=args.signatures,
+        json_bruto_size=args.json_bruto_size,
+        pdf_size=args.pdf_size,
+    )
+    servidor = FakeItiServer(config, host=args.host, port=args.port)
+    print(f"ITI falso em {servidor.base_url} (Ctrl+C para sair)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+
+if __name__ == "__main__":
+    main()
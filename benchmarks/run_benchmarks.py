@@ -0,0 +1,373 @@
+"""
+Benchmarks do validator_api contra um ITI falso local (ver fake_iti.py).
+
+Mede vazão, latência (p50/p95/p99) e pico de memória (RSS) de validate_pdf,
+get_conformidade_report e download_relatorio_pdf, nos modos sequencial,
+com threads e assíncrono, para diferentes tamanhos de arquivo. Cada cenário
+roda em um processo novo, para que o pico de RSS de um não contamine o outro.
+
+Uso:
+    python benchmarks/run_benchmarks.py -o resultados.json
+    python benchmarks/run_benchmarks.py --sizes 100k,10m --modes thread,async --latency 0.05
+    python benchmarks/run_benchmarks.py -o novo.json --compare resultados.json
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import asdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows: pico de RSS não disponível
+    resource = None
+
+RAIZ = Path(__file__).resolve().parent.parent
+if str(RAIZ) not in sys.path:
+    sys.path.insert(0, str(RAIZ))
+
+from fake_iti import FakeItiConfig, FakeItiServer, relatorio_falso  # noqa: E402
+from validator_api import json_backend  # noqa: E402
+
+
+OPERACOES = ("validate_pdf", "get_conformidade_report", "download_relatorio_pdf")
+MODOS = ("sequential", "thread", "async")
+
+# Operações com equivalente em AsyncItiClient
+OPERACOES_ASYNC = ("validate_pdf",)
+
+TAMANHOS_PADRAO = "100k,1m,10m"
+
+UNIDADES = {"k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}
+
+
+def parse_tamanho(valor):
+    """Converte '100k', '10m', '2048' etc. em bytes."""
+    valor = valor.strip().lower()
+    if valor and valor[-1] in UNIDADES:
+        return int(float(valor[:-1]) * UNIDADES[valor[-1]])
+    return int(valor)
+
+
+def gerar_pdf(path, tamanho):
+    """Gera um PDF "assinado" (contém /ByteRange) com aproximadamente `tamanho` bytes."""
+    cabecalho = (
+        b"%PDF-1.7\n1 0 obj\n<< /Type /Sig /Filter /Adobe.PPKLite /SubFilter /adbe.pkcs7.detached"
+        b" /ByteRange [0 100 200 300] /Contents <00> >>\nendobj\n"
+    )
+    rodape = b"\n%%EOF\n"
+    with open(path, "wb") as f:
+        f.write(cabecalho)
+        restante = max(0, tamanho - len(cabecalho) - len(rodape))
+        bloco = b"%" + b"0" * 1023
+        while restante > 0:
+            f.write(bloco[:restante])
+            restante -= len(bloco)
+        f.write(rodape)
+    return path
+
+
+def percentil(ordenados, p):
+    """Percentil `p` (0-100) com interpolação linear de uma lista já ordenada."""
+    if not ordenados:
+        return None
+    posicao = (len(ordenados) - 1) * p / 100
+    inferior = int(posicao)
+    superior = min(inferior + 1, len(ordenados) - 1)
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (posicao - inferior)
+
+
+def pico_rss():
+    """Pico de RSS do processo atual em bytes (None se indisponível)."""
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KiB, macOS em bytes
+    return pico if sys.platform == "darwin" else pico * 1024
+
+
+def _criar_cliente(cenario):
+    from validator_api import ItiClient
+
+    return ItiClient(
+        base_url=cenario["base_url"],
+        pool_connections=cenario["concurrency"],
+        pool_maxsize=cenario["concurrency"],
+        rate_limiter=None if cenario["rate_limiter"] else False,
+        retry=None if cenario["retry"] else False,
+    )
+
+
+def _chamada(client, cenario):
+    operacao = cenario["operation"]
+    if operacao == "validate_pdf":
+        return lambda: client.validate_pdf(cenario["pdf_path"])
+    if operacao == "get_conformidade_report":
+        return lambda: client.get_conformidade_report(cenario["pdf_path"])
+    relatorio = cenario["relatorio"]
+    return lambda: client.download_relatorio_pdf(relatorio)
+
+
+def _cronometrar(funcao):
+    inicio = time.perf_counter()
+    try:
+        status = funcao().get("status", "unknown")
+    except Exception:
+        status = "exception"
+    return time.perf_counter() - inicio, status
+
+
+def _executar_sequencial(cenario):
+    with _criar_cliente(cenario) as client:
+        funcao = _chamada(client, cenario)
+        _cronometrar(funcao)  # aquecimento (conexão, imports tardios)
+        inicio = time.perf_counter()
+        medidas = [_cronometrar(funcao) for _ in range(cenario["requests"])]
+        return medidas, time.perf_counter() - inicio
+
+
+def _executar_threads(cenario):
+    with _criar_cliente(cenario) as client:
+        funcao = _chamada(client, cenario)
+        _cronometrar(funcao)
+        with ThreadPoolExecutor(max_workers=cenario["concurrency"]) as executor:
+            inicio = time.perf_counter()
+            medidas = list(executor.map(lambda _: _cronometrar(funcao), range(cenario["requests"])))
+            return medidas, time.perf_counter() - inicio
+
+
+async def _executar_async(cenario):
+    from validator_api import AsyncItiClient
+
+    async with AsyncItiClient(
+        base_url=cenario["base_url"],
+        max_connections=cenario["concurrency"],
+        max_keepalive_connections=cenario["concurrency"],
+        rate_limiter=None if cenario["rate_limiter"] else False,
+        retry=None if cenario["retry"] else False,
+    ) as client:
+        semaforo = asyncio.Semaphore(cenario["concurrency"])
+
+        async def cronometrar():
+            async with semaforo:
+                inicio = time.perf_counter()
+                try:
+                    status = (await client.validate_pdf(cenario["pdf_path"])).get("status", "unknown")
+                except Exception:
+                    status = "exception"
+                return time.perf_counter() - inicio, status
+
+        await cronometrar()
+        inicio = time.perf_counter()
+        medidas = await asyncio.gather(*(cronometrar() for _ in range(cenario["requests"])))
+        return medidas, time.perf_counter() - inicio
+
+
+def executar_cenario(cenario):
+    """
+    Executa um cenário (no processo atual) e resume as medidas.
+    Args:
+        cenario: dict com operation, mode, file_size, requests, concurrency,
+            base_url, pdf_path, relatorio, rate_limiter e retry
+    Returns:
+        dict com vazão, latências, contagem por status e RSS
+    """
+    import validator_api  # noqa: F401  (imports fora do RSS de base)
+
+    rss_base = pico_rss()
+    if cenario["mode"] == "sequential":
+        medidas, elapsed = _executar_sequencial(cenario)
+    elif cenario["mode"] == "thread":
+        medidas, elapsed = _executar_threads(cenario)
+    else:
+        medidas, elapsed = asyncio.run(_executar_async(cenario))
+    rss_pico = pico_rss()
+
+    latencias = sorted(duracao for duracao, _ in medidas)
+    status = {}
+    for _, s in medidas:
+        status[s] = status.get(s, 0) + 1
+    erros = sum(n for s, n in status.items() if s in ("error", "exception", "unknown"))
+
+    return {
+        "operation": cenario["operation"],
+        "mode": cenario["mode"],
+        "file_size": cenario["file_size"],
+        "requests": len(medidas),
+        "concurrency": 1 if cenario["mode"] == "sequential" else cenario["concurrency"],
+        "elapsed_s": elapsed,
+        "throughput_rps": len(medidas) / elapsed if elapsed > 0 else None,
+        "throughput_bytes_per_s": len(medidas) * cenario["file_size"] / elapsed if elapsed > 0 else None,
+        "latency_ms": {
+            "min": latencias[0] * 1000,
+            "mean": sum(latencias) / len(latencias) * 1000,
+            "p50": percentil(latencias, 50) * 1000,
+            "p95": percentil(latencias, 95) * 1000,
+            "p99": percentil(latencias, 99) * 1000,
+            "max": latencias[-1] * 1000,
+        },
+        "status": status,
+        "errors": erros,
+        "peak_rss_bytes": rss_pico,
+        "peak_rss_delta_bytes": rss_pico - rss_base if rss_pico is not None else None,
+    }
+
+
+def _executar_isolado(cenario):
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as executor:
+        return executor.submit(executar_cenario, cenario).result()
+
+
+def chave_cenario(resultado):
+    return (resultado["operation"], resultado["mode"], resultado["file_size"])
+
+
+def _commit_atual():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def comparar(resultados, anterior_path):
+    """Mostra a variação de vazão e p95 em relação a um JSON de execução anterior."""
+    with open(anterior_path, encoding="utf-8") as f:
+        anteriores = {chave_cenario(r): r for r in json.load(f)["results"]}
+
+    print(f"\nComparação com {anterior_path}:", file=sys.stderr)
+    for resultado in resultados:
+        anterior = anteriores.get(chave_cenario(resultado))
+        if anterior is None or not anterior.get("throughput_rps"):
+            continue
+        vazao = resultado["throughput_rps"] / anterior["throughput_rps"] - 1
+        p95 = resultado["latency_ms"]["p95"] / anterior["latency_ms"]["p95"] - 1
+        alerta = "⚠️ " if vazao < -0.1 or p95 > 0.1 else "   "
+        print(f"{alerta}{_rotulo(resultado):55} vazão {vazao:+7.1%}  p95 {p95:+7.1%}", file=sys.stderr)
+
+
+def _rotulo(resultado):
+    return f"{resultado['operation']} [{resultado['mode']}, {resultado['file_size']:,} B]"
+
+
+def criar_parser():
+    parser = argparse.ArgumentParser(description="Benchmarks do validator_api contra um ITI falso local")
+    parser.add_argument("-o", "--output", default="benchmark-results.json", help="Arquivo JSON de resultados")
+    parser.add_argument("--operations", default=",".join(OPERACOES), help="Operações, separadas por vírgula")
+    parser.add_argument("--modes", default=",".join(MODOS), help="Modos, separados por vírgula")
+    parser.add_argument("--sizes", default=TAMANHOS_PADRAO,
+                        help="Tamanhos de arquivo (ex.: 100k,1m,10m); em download_relatorio_pdf, o tamanho do PDF do relatório")
+    parser.add_argument("-n", "--requests", type=int, default=50, help="Requisições medidas por cenário")
+    parser.add_argument("-c", "--concurrency", type=int, default=8, help="Concorrência dos modos thread e async")
+    parser.add_argument("--latency", type=float, default=0.02, help="Latência do ITI falso (segundos)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Variação aleatória da latência")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fração de respostas HTTP 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fração de respostas HTTP 429")
+    parser.add_argument("--retry-after", type=float, default=None, help="Retry-After das respostas 429")
+    parser.add_argument("--signatures", type=int, default=1, help="Assinaturas por relatório")
+    parser.add_argument("--rate-limiter", action="store_true", help="Usa o limitador de taxa adaptativo")
+    parser.add_argument("--no-retry", action="store_true", help="Desativa novas tentativas")
+    parser.add_argument("--compare", metavar="ANTERIOR.json", help="Compara com uma execução anterior")
+    return parser
+
+
+def main(argv=None):
+    args = criar_parser().parse_args(argv)
+    operacoes = [o.strip() for o in args.operations.split(",") if o.strip()]
+    modos = [m.strip() for m in args.modes.split(",") if m.strip()]
+    tamanhos = [parse_tamanho(t) for t in args.sizes.split(",") if t.strip()]
+    for valor, validos in ((operacoes, OPERACOES), (modos, MODOS)):
+        invalidos = set(valor) - set(validos)
+        if invalidos:
+            raise SystemExit(f"Valores inválidos: {sorted(invalidos)}. Use {validos}")
+
+    config = FakeItiConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        signatures=args.signatures,
+    )
+    servidor = FakeItiServer(config).start()
+    print(f"ITI falso em {servidor.base_url}", file=sys.stderr)
+
+    resultados = []
+    with tempfile.TemporaryDirectory(prefix="validador-bench-") as tmp:
+        for operacao in operacoes:
+            for tamanho in tamanhos:
+                pdf_path = None
+                if operacao == "download_relatorio_pdf":
+                    config.pdf_size = tamanho
+                else:
+                    pdf_path = str(gerar_pdf(os.path.join(tmp, f"doc-{tamanho}.pdf"), tamanho))
+                for modo in modos:
+                    if modo == "async" and operacao not in OPERACOES_ASYNC:
+                        continue
+                    cenario = {
+                        "operation": operacao,
+                        "mode": modo,
+                        "file_size": tamanho,
+                        "requests": args.requests,
+                        "concurrency": args.concurrency,
+                        "base_url": servidor.base_url,
+                        "pdf_path": pdf_path,
+                        "relatorio": relatorio_falso(args.signatures),
+                        "rate_limiter": args.rate_limiter,
+                        "retry": not args.no_retry,
+            "json_backend": json_backend.BACKEND,
+                    }
+                    resultado = _executar_isolado(cenario)
+                    resultados.append(resultado)
+                    latencia = resultado["latency_ms"]
+                    print(
+                        f"✓ {_rotulo(resultado):55} {resultado['throughput_rps']:8.1f} req/s"
+                        f"  p50 {latencia['p50']:7.1f} ms  p95 {latencia['p95']:7.1f} ms"
+                        f"  p99 {latencia['p99']:7.1f} ms  erros {resultado['errors']}",
+                        file=sys.stderr,
+                    )
+    servidor.stop()
+
+    servidor_config = asdict(config)
+    servidor_config.pop("contadores")
+    servidor_config.pop("pdf_size")
+    saida = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "commit": _commit_atual(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "requests_per_scenario": args.requests,
+            "concurrency": args.concurrency,
+            "rate_limiter": args.rate_limiter,
+            "retry": not args.no_retry,
+            "json_backend": json_backend.BACKEND,
+            "server": servidor_config,
+        },
+        "results": resultados,
+    }
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(saida, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+    print(f"\nResultados salvos em {output}", file=sys.stderr)
+
+    if args.compare:
+        comparar(resultados, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
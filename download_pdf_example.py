@@ -179,28 +179,31 @@ def validar_e_baixar_relatorio_pdf(pdf_path, output_path=None, language="pt-br",
         print("📥 [3/3] Baixando PDF do relatório...")
 
     try:
-        response_pdf = requests.post(
+        # stream=True: o PDF é gravado em blocos, sem ficar inteiro na memória
+        with requests.post(
             url_download_pdf,
             headers=headers_download,
             json=request_body,
-            timeout=60
-        )
-
-        if verbose:
-            print(f"   Status: {response_pdf.status_code}")
-
-        if response_pdf.status_code != 200:
-            return {
-                "status": "error",
-                "error": f"Erro HTTP {response_pdf.status_code} em /downloadPdf",
-                "details": response_pdf.text
-            }
-
-        # Salva o PDF
-        with open(output_path, 'wb') as f:
-            f.write(response_pdf.content)
-
-        file_size = len(response_pdf.content)
+            timeout=60,
+            stream=True
+        ) as response_pdf:
+
+            if verbose:
+                print(f"   Status: {response_pdf.status_code}")
+
+            if response_pdf.status_code != 200:
+                return {
+                    "status": "error",
+                    "error": f"Erro HTTP {response_pdf.status_code} em /downloadPdf",
+                    "details": response_pdf.text
+                }
+
+            # Salva o PDF
+            file_size = 0
+            with open(output_path, 'wb') as f:
+                for bloco in response_pdf.iter_content(64 * 1024):
+                    f.write(bloco)
+                    file_size += len(bloco)
 
         if verbose:
             print(f"   ✓ PDF salvo: {output_path}")
@@ -1,44 +1,355 @@
 """
 Interface Gráfica Tkinter para Validador de Assinaturas PDF - ITI
 Permite validar assinaturas digitais em PDFs através de uma interface gráfica amigável.
+
+Vários arquivos (ou pastas inteiras) entram em uma fila atendida por um pool
+fixo de workers que compartilham um ItiClient. Os workers nunca tocam nos
+widgets: publicam eventos em uma fila que a thread da interface consome a
+cada INTERVALO_ATUALIZACAO ms, de modo que a janela continua respondendo
+enquanto a tabela é preenchida linha a linha.
+
+A tabela é virtualizada: os resultados ficam em um índice em memória
+(IndiceResultados, com ordenação e filtro) e a Treeview só contém as linhas
+da janela visível, recriadas a cada rolagem. Os detalhes de um documento
+(assinaturas, erro) só são montados quando a linha é expandida.
 """
 
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox, scrolledtext
+from tkinter import ttk, filedialog, messagebox
+from collections import Counter
 from pathlib import Path
+import itertools
+import queue
 import threading
-from validator_api import validate_pdf
+import time
+from validator_api import ItiClient
+from validator_api.batch import listar_documentos
+from validator_api.client import base_url_padrao
+
+
+# Validações simultâneas (e conexões no pool do cliente)
+WORKERS_GUI = 4
+# Intervalo (ms) em que a interface consome os eventos dos workers
+INTERVALO_ATUALIZACAO = 100
+# Eventos aplicados por atualização (o restante fica para a próxima)
+EVENTOS_POR_ATUALIZACAO = 1000
+# Intervalo mínimo (segundos) entre reordenações causadas por resultados novos
+INTERVALO_REINDEXACAO = 0.5
+# Espera (ms) depois da última tecla antes de aplicar o filtro de texto
+ESPERA_FILTRO = 250
+# Linhas roladas por movimento da roda do mouse
+LINHAS_POR_ROLAGEM = 3
+
+ESTADOS = {
+    'pendente': "• pendente",
+    'fila': "⏳ na fila",
+    'validando': "🔄 validando",
+    'valid': "✅ válido",
+    'invalid': "❌ inválido",
+    'error': "⚠️ erro",
+    'cancelado': "⛔ cancelado",
+}
+ESTADOS_FINAIS = ('valid', 'invalid', 'error', 'cancelado')
+FILTRO_TODOS = "Todos"
+
+# Colunas da tabela (#0 = nome do arquivo, com o botão de expandir)
+COLUNAS = ("status", "assinaturas", "detalhe")
+TITULOS = {"#0": "Arquivo", "status": "Status", "assinaturas": "Assinaturas", "detalhe": "Detalhe"}
+
+_PARAR = object()
+
+
+class FilaValidacao:
+    """
+    Pool persistente de workers que valida os arquivos de uma fila.
+
+    Os workers publicam em `eventos` tuplas (item_id, estado, resultado), com
+    estado 'validando' ao começar e o status do resultado ao terminar.
+    Itens cancelados são descartados sem evento (a interface já os marcou).
+
+    Args:
+        client: ItiClient compartilhado pelos workers
+        workers: Número de workers
+    """
+
+    def __init__(self, client, workers=WORKERS_GUI):
+        self.client = client
+        self.eventos = queue.Queue()
+        self._tarefas = queue.Queue()
+        self._cancelados = set()
+        self._lock = threading.Lock()
+        self._threads = [
+            threading.Thread(target=self._trabalhar, name=f"gui-worker-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def adicionar(self, item_id, path):
+        """Coloca um arquivo na fila."""
+        with self._lock:
+            self._cancelados.discard(item_id)
+        self._tarefas.put((item_id, path))
+
+    def cancelar(self, item_ids):
+        """Cancela itens na fila; os que já estão em validação têm o resultado descartado."""
+        with self._lock:
+            self._cancelados.update(item_ids)
+
+    def _cancelado(self, item_id):
+        with self._lock:
+            return item_id in self._cancelados
+
+    def encerrar(self):
+        """Cancela o que está na fila e encerra os workers (sem esperar as validações em andamento)."""
+        while True:
+            try:
+                self._tarefas.get_nowait()
+            except queue.Empty:
+                break
+        for _ in self._threads:
+            self._tarefas.put(_PARAR)
+
+    def _trabalhar(self):
+        while True:
+            tarefa = self._tarefas.get()
+            if tarefa is _PARAR:
+                return
+            item_id, path = tarefa
+            if self._cancelado(item_id):
+                continue
+            self.eventos.put((item_id, 'validando', None))
+            try:
+                resultado = self.client.validate_document(path)
+            except Exception as e:
+                resultado = {"status": "error", "error": str(e)}
+            if not self._cancelado(item_id):
+                self.eventos.put((item_id, resultado.get('status', 'error'), resultado))
+
+
+class Linha:
+    """Documento da tabela: caminho, estado e os campos exibidos."""
+
+    __slots__ = ('id', 'path', 'nome', 'estado', 'resultado', 'assinaturas', 'detalhe')
+
+    def __init__(self, item_id, path):
+        self.id = item_id
+        self.path = path
+        self.nome = path.name
+        self.estado = 'pendente'
+        self.resultado = None
+        self.assinaturas = ""
+        self.detalhe = str(path.parent)
+
+    def valores(self):
+        """Valores das colunas de COLUNAS."""
+        return (ESTADOS.get(self.estado, self.estado), self.assinaturas, self.detalhe)
+
+
+def _resumo(estado, resultado):
+    """Texto da coluna Detalhe para um documento concluído."""
+    if resultado is None:
+        return "Validação cancelada"
+    if estado == 'valid':
+        return ", ".join(a.get('assinado_por', 'N/A') for a in resultado.get('assinaturas', []))
+    return resultado.get('error', 'Erro desconhecido durante a validação')
+
+
+def detalhes_resultado(resultado):
+    """
+    Linhas de detalhe de um documento, montadas quando a linha é expandida.
+    Returns:
+        Lista de tuplas (texto, status, assinaturas, detalhe)
+    """
+    status = resultado.get('status', 'unknown')
+    if status != 'valid':
+        titulo = "Motivo" if status == 'invalid' else "Erro"
+        linhas = [(titulo, "", "", resultado.get('error', 'Erro desconhecido durante a validação'))]
+        if resultado.get('details'):
+            linhas.append(("Detalhes", "", "", str(resultado['details'])))
+        return linhas
+
+    linhas = []
+    doc = resultado.get('documento')
+    if doc:
+        linhas.append(("📄 Documento", "", "",
+                       f"Hash: {doc.get('hash', 'N/A')} · Validado em: {doc.get('data_validacao', 'N/A')}"))
+    for i, assinatura in enumerate(resultado.get('assinaturas', []), 1):
+        carimbo = "Sim ✓" if assinatura.get('possui_carimbo_tempo', False) else "Não ✗"
+        linhas.append((
+            f"✍️ Assinatura {i}",
+            assinatura.get('status', 'N/A'),
+            "",
+            f"{assinatura.get('assinado_por', 'N/A')} · CPF: {assinatura.get('cpf', 'N/A')} · "
+            f"{assinatura.get('certificadora', 'N/A')} · Nº Série: {assinatura.get('numero_serie_certificado', 'N/A')} · "
+            f"Data: {assinatura.get('data_assinatura', 'N/A')} · Carimbo de Tempo: {carimbo}"
+        ))
+    return linhas
+
+
+ORDEM_ESTADOS = {estado: posicao for posicao, estado in enumerate(ESTADOS)}
+
+CHAVES_ORDENACAO = {
+    "#0": lambda linha: linha.nome.lower(),
+    "status": lambda linha: ORDEM_ESTADOS.get(linha.estado, len(ORDEM_ESTADOS)),
+    "assinaturas": lambda linha: linha.assinaturas if isinstance(linha.assinaturas, int) else -1,
+    "detalhe": lambda linha: linha.detalhe.lower(),
+}
+# Colunas cujo valor muda quando um resultado chega
+COLUNAS_MUTAVEIS = ("status", "assinaturas", "detalhe")
+
+
+class IndiceResultados:
+    """
+    Índice em memória das linhas da tabela, com ordenação e filtro.
+
+    `visiveis` é a lista de ids que passam pelo filtro, na ordem escolhida; a
+    interface exibe apenas uma janela dela. Quando um resultado pode mudar a
+    posição ou a visibilidade de uma linha, o índice fica `sujo` até a
+    próxima chamada de reindexar().
+    """
+
+    def __init__(self):
+        self.linhas = {}
+        self.visiveis = []
+        self.contagem = Counter()
+        self.coluna = None
+        self.decrescente = False
+        self.texto = ""
+        self.estado = None
+        self.sujo = False
+        self._caminhos = set()
+        self._ids = itertools.count()
+
+    def __len__(self):
+        return len(self.linhas)
+
+    def adicionar(self, caminhos):
+        """
+        Adiciona documentos como pendentes, ignorando os já listados.
+        Returns:
+            Lista com os ids das linhas novas
+        """
+        novos = []
+        for path in caminhos:
+            path = Path(path)
+            if path in self._caminhos:
+                continue
+            self._caminhos.add(path)
+            linha = Linha(next(self._ids), path)
+            self.linhas[linha.id] = linha
+            novos.append(linha.id)
+        self.contagem['pendente'] += len(novos)
+        if self.coluna is None and not self.texto and self.estado in (None, 'pendente'):
+            self.visiveis.extend(novos)
+        elif novos:
+            self.sujo = True
+        return novos
+
+    def alterar(self, item_id, estado, resultado=None):
+        """Muda o estado de uma linha (e preenche as colunas, se o estado for final)."""
+        linha = self.linhas[item_id]
+        self.contagem[linha.estado] -= 1
+        self.contagem[estado] += 1
+        linha.estado = estado
+        if estado in ESTADOS_FINAIS:
+            linha.resultado = resultado
+            linha.assinaturas = resultado.get('total_assinaturas', "") if resultado else ""
+            linha.detalhe = _resumo(estado, resultado)
+        if self.estado is not None or self.texto or self.coluna in COLUNAS_MUTAVEIS:
+            self.sujo = True
+
+    def limpar(self):
+        """Remove todas as linhas."""
+        self.linhas.clear()
+        self.visiveis = []
+        self.contagem.clear()
+        self._caminhos.clear()
+        self.sujo = False
+
+    def ordenar(self, coluna):
+        """Ordena por uma coluna; a mesma coluna de novo inverte a ordem."""
+        self.decrescente = not self.decrescente if coluna == self.coluna else False
+        self.coluna = coluna
+        self.reindexar()
+
+    def filtrar(self, texto="", estado=None):
+        """
+        Args:
+            texto: Trecho procurado no nome, no caminho e no detalhe (sem diferenciar maiúsculas)
+            estado: Estado exibido (chave de ESTADOS), ou None para todos
+        """
+        self.texto = texto.strip().lower()
+        self.estado = estado
+        self.reindexar()
+
+    def _passa(self, linha):
+        if self.estado is not None and linha.estado != self.estado:
+            return False
+        if self.texto:
+            return (self.texto in linha.nome.lower() or self.texto in linha.detalhe.lower()
+                    or self.texto in str(linha.path).lower())
+        return True
+
+    def reindexar(self):
+        """Recalcula `visiveis` com o filtro e a ordem atuais."""
+        if self.estado is None and not self.texto:
+            visiveis = list(self.linhas)
+        else:
+            visiveis = [item_id for item_id, linha in self.linhas.items() if self._passa(linha)]
+        if self.coluna is not None:
+            chave = CHAVES_ORDENACAO[self.coluna]
+            linhas = self.linhas
+            # O id (ordem de inclusão) desempata
+            visiveis.sort(key=lambda item_id: (chave(linhas[item_id]), item_id), reverse=self.decrescente)
+        self.visiveis = visiveis
+        self.sujo = False
 
 
 class ValidadorGUI:
     """Interface gráfica para validação de assinaturas PDF."""
-    
-    def __init__(self, root):
+
+    def __init__(self, root, client=None, workers=WORKERS_GUI):
         self.root = root
         self.root.title("Validador de Assinaturas PDF - ITI")
-        self.root.geometry("800x600")
+        self.root.geometry("900x650")
         self.root.resizable(True, True)
-        
-        # Variáveis
-        self.arquivo_selecionado = tk.StringVar()
-        self.validando = False
-        
+
+        # Um cliente (e um pool de conexões) para todas as validações; a tabela
+        # só usa os campos extraídos, então os relatórios brutos não são mantidos
+        self.client = client or ItiClient(base_url=base_url_padrao(), pool_maxsize=workers, retention="none")
+        self.fila = FilaValidacao(self.client, workers)
+
+        # Índice das linhas e estado da janela visível da tabela
+        self.indice = IndiceResultados()
+        self.inicio = 0
+        self.fim = 0
+        self.altura = 20
+        self.selecionados = set()
+        self.expandidos = set()
+        self.enviados = 0
+        self.concluidos = 0
+        self._ultima_reindexacao = 0.0
+        self._filtro_agendado = None
+
         # Configurar interface
         self.criar_widgets()
-        
+        self.root.protocol("WM_DELETE_WINDOW", self.fechar)
+        self.root.after(INTERVALO_ATUALIZACAO, self.processar_eventos)
+
     def criar_widgets(self):
         """Cria todos os widgets da interface."""
-        
+
         # Frame principal com padding
         main_frame = ttk.Frame(self.root, padding="10")
         main_frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
-        
+
         # Configurar grid para redimensionamento
         self.root.columnconfigure(0, weight=1)
         self.root.rowconfigure(0, weight=1)
         main_frame.columnconfigure(0, weight=1)
         main_frame.rowconfigure(3, weight=1)
-        
+
         # Título
         titulo = ttk.Label(
             main_frame,
@@ -46,71 +357,124 @@ class ValidadorGUI:
             font=("Arial", 16, "bold")
         )
         titulo.grid(row=0, column=0, columnspan=3, pady=(0, 20))
-        
-        # Frame de seleção de arquivo
-        arquivo_frame = ttk.LabelFrame(main_frame, text="Arquivo PDF", padding="10")
+
+        # Frame de seleção de arquivos
+        arquivo_frame = ttk.LabelFrame(main_frame, text="Arquivos", padding="10")
         arquivo_frame.grid(row=1, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(0, 10))
-        arquivo_frame.columnconfigure(1, weight=1)
-        
-        # Label do arquivo
-        ttk.Label(arquivo_frame, text="Arquivo:").grid(row=0, column=0, sticky=tk.W, padx=(0, 5))
-        
-        # Entry do caminho do arquivo
-        self.entry_arquivo = ttk.Entry(arquivo_frame, textvariable=self.arquivo_selecionado, state="readonly")
-        self.entry_arquivo.grid(row=0, column=1, sticky=(tk.W, tk.E), padx=(0, 5))
-        
-        # Botão selecionar arquivo
+        arquivo_frame.columnconfigure(3, weight=1)
+
+        # Botões de seleção (vários arquivos ou uma pasta inteira)
         self.btn_selecionar = ttk.Button(
             arquivo_frame,
-            text="Selecionar PDF",
-            command=self.selecionar_arquivo
+            text="Adicionar Arquivos",
+            command=self.selecionar_arquivos
+        )
+        self.btn_selecionar.grid(row=0, column=0, padx=(0, 5))
+
+        self.btn_pasta = ttk.Button(
+            arquivo_frame,
+            text="Adicionar Pasta",
+            command=self.selecionar_pasta
         )
-        self.btn_selecionar.grid(row=0, column=2)
-        
+        self.btn_pasta.grid(row=0, column=1, padx=5)
+
+        # Botão limpar
+        self.btn_limpar = ttk.Button(
+            arquivo_frame,
+            text="Limpar",
+            command=self.limpar_resultados
+        )
+        self.btn_limpar.grid(row=0, column=2, padx=5)
+
+        self.label_contagem = ttk.Label(arquivo_frame, text="Nenhum arquivo selecionado")
+        self.label_contagem.grid(row=0, column=3, sticky=tk.E)
+
         # Frame de ações
         acoes_frame = ttk.Frame(main_frame)
         acoes_frame.grid(row=2, column=0, columnspan=3, pady=(0, 10))
-        
+
         # Botão validar
         self.btn_validar = ttk.Button(
             acoes_frame,
-            text="Validar Assinatura",
-            command=self.validar_arquivo,
+            text="Validar Assinaturas",
+            command=self.validar_arquivos,
             state="disabled"
         )
         self.btn_validar.grid(row=0, column=0, padx=5)
-        
-        # Botão limpar
-        self.btn_limpar = ttk.Button(
+
+        # Botão cancelar (selecionados, ou todos se nenhum estiver selecionado)
+        self.btn_cancelar = ttk.Button(
             acoes_frame,
-            text="Limpar",
-            command=self.limpar_resultados
+            text="Cancelar",
+            command=self.cancelar,
+            state="disabled"
         )
-        self.btn_limpar.grid(row=0, column=1, padx=5)
-        
+        self.btn_cancelar.grid(row=0, column=1, padx=5)
+
         # Progress bar
-        self.progress = ttk.Progressbar(acoes_frame, mode='indeterminate', length=200)
+        self.progress = ttk.Progressbar(acoes_frame, mode='determinate', length=250)
         self.progress.grid(row=0, column=2, padx=5)
-        
-        # Frame de resultados
+
+        self.label_progresso = ttk.Label(acoes_frame, text="")
+        self.label_progresso.grid(row=0, column=3, padx=5)
+
+        # Frame de resultados: filtros e tabela (uma linha por documento)
         resultados_frame = ttk.LabelFrame(main_frame, text="Resultados", padding="10")
         resultados_frame.grid(row=3, column=0, columnspan=3, sticky=(tk.W, tk.E, tk.N, tk.S))
         resultados_frame.columnconfigure(0, weight=1)
-        resultados_frame.rowconfigure(0, weight=1)
-        
-        # Área de texto para resultados com scroll
-        self.texto_resultados = scrolledtext.ScrolledText(
-            resultados_frame,
-            wrap=tk.WORD,
-            width=80,
-            height=20,
-            font=("Courier", 10)
+        resultados_frame.rowconfigure(1, weight=1)
+
+        filtro_frame = ttk.Frame(resultados_frame)
+        filtro_frame.grid(row=0, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(0, 5))
+        filtro_frame.columnconfigure(1, weight=1)
+
+        ttk.Label(filtro_frame, text="Filtrar:").grid(row=0, column=0, padx=(0, 5))
+        self.texto_filtro = tk.StringVar()
+        self.texto_filtro.trace_add("write", self.agendar_filtro)
+        ttk.Entry(filtro_frame, textvariable=self.texto_filtro).grid(row=0, column=1, sticky=(tk.W, tk.E))
+
+        ttk.Label(filtro_frame, text="Status:").grid(row=0, column=2, padx=(10, 5))
+        self.estado_filtro = tk.StringVar(value=FILTRO_TODOS)
+        combo = ttk.Combobox(
+            filtro_frame,
+            textvariable=self.estado_filtro,
+            values=[FILTRO_TODOS, *ESTADOS.values()],
+            state="readonly",
+            width=14
         )
-        self.texto_resultados.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
-        
-        # Adicionar mensagem inicial
-        self.mostrar_mensagem_inicial()
-        
+        combo.grid(row=0, column=3)
+        combo.bind("<<ComboboxSelected>>", self.aplicar_filtro)
+
+        self.label_exibidos = ttk.Label(filtro_frame, text="")
+        self.label_exibidos.grid(row=0, column=4, padx=(10, 0))
+
+        self.tabela = ttk.Treeview(resultados_frame, columns=COLUNAS, show="tree headings")
+        for coluna in ("#0", *COLUNAS):
+            self.tabela.heading(coluna, text=TITULOS[coluna], command=lambda c=coluna: self.ordenar(c))
+        self.tabela.column("#0", width=260)
+        self.tabela.column("status", width=120, stretch=False)
+        self.tabela.column("assinaturas", width=90, anchor=tk.CENTER, stretch=False)
+        self.tabela.column("detalhe", width=340)
+        self.tabela.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+
+        # A barra de rolagem percorre o índice, não a Treeview (que só tem a janela visível)
+        self.scroll = ttk.Scrollbar(resultados_frame, orient=tk.VERTICAL, command=self.rolar)
+        self.scroll.grid(row=1, column=1, sticky=(tk.N, tk.S))
+
+        self.tabela.bind("<<TreeviewSelect>>", self.atualizar_selecao)
+        self.tabela.bind("<<TreeviewOpen>>", self.expandir)
+        self.tabela.bind("<<TreeviewClose>>", self.recolher)
+        self.tabela.bind("<Configure>", self.redimensionar)
+        self.tabela.bind("<MouseWheel>", self.rolar_roda)
+        self.tabela.bind("<Button-4>", self.rolar_roda)
+        self.tabela.bind("<Button-5>", self.rolar_roda)
+        self.tabela.bind("<Up>", lambda e: self.mover_foco(-1))
+        self.tabela.bind("<Down>", lambda e: self.mover_foco(1))
+        self.tabela.bind("<Prior>", lambda e: self.rolar("scroll", -1, "pages"))
+        self.tabela.bind("<Next>", lambda e: self.rolar("scroll", 1, "pages"))
+        self.tabela.bind("<Home>", lambda e: self.rolar("moveto", 0))
+        self.tabela.bind("<End>", lambda e: self.rolar("moveto", 1))
+
         # Rodapé com informações
         rodape = ttk.Label(
             main_frame,
@@ -119,171 +483,265 @@ class ValidadorGUI:
             foreground="gray"
         )
         rodape.grid(row=4, column=0, columnspan=3, pady=(10, 0))
-        
-    def mostrar_mensagem_inicial(self):
-        """Mostra mensagem inicial na área de resultados."""
-        mensagem = """╔══════════════════════════════════════════════════════════════════════════╗
-║                  BEM-VINDO AO VALIDADOR DE ASSINATURAS PDF                ║
-╚══════════════════════════════════════════════════════════════════════════╝
-
-Como usar:
-
-1. Clique em "Selecionar PDF" para escolher um arquivo PDF
-2. Clique em "Validar Assinatura" para verificar as assinaturas digitais
-3. Os resultados serão exibidos nesta área
-
-Funcionalidades:
-✓ Validação através da API oficial do ITI
-✓ Informações detalhadas sobre assinaturas
-✓ Dados de certificados digitais
-✓ Status de validade
-
-Aguardando seleção de arquivo...
-"""
-        self.texto_resultados.delete(1.0, tk.END)
-        self.texto_resultados.insert(1.0, mensagem)
-        
-    def selecionar_arquivo(self):
-        """Abre diálogo para selecionar arquivo PDF."""
-        arquivo = filedialog.askopenfilename(
-            title="Selecione um arquivo PDF",
+
+    def selecionar_arquivos(self):
+        """Abre diálogo para selecionar um ou mais arquivos."""
+        arquivos = filedialog.askopenfilenames(
+            title="Selecione os arquivos PDF",
             filetypes=[("Arquivos PDF", "*.pdf"), ("Todos os arquivos", "*.*")]
         )
-        
-        if arquivo:
-            self.arquivo_selecionado.set(arquivo)
+        self.adicionar_arquivos(arquivos)
+
+    def selecionar_pasta(self):
+        """Abre diálogo para selecionar uma pasta (os PDFs são buscados recursivamente)."""
+        pasta = filedialog.askdirectory(title="Selecione uma pasta com PDFs")
+        if pasta:
+            self.adicionar_arquivos(listar_documentos([pasta]))
+
+    def adicionar_arquivos(self, caminhos):
+        """Adiciona arquivos à tabela como pendentes (ignorando os já listados)."""
+        if self.indice.adicionar(caminhos):
             self.btn_validar.config(state="normal")
-            self.texto_resultados.delete(1.0, tk.END)
-            self.texto_resultados.insert(1.0, f"✓ Arquivo selecionado: {Path(arquivo).name}\n\n")
-            self.texto_resultados.insert(tk.END, "Clique em 'Validar Assinatura' para iniciar a validação.")
-            
-    def validar_arquivo(self):
-        """Inicia a validação do arquivo em uma thread separada."""
-        if not self.arquivo_selecionado.get():
-            messagebox.showwarning("Aviso", "Selecione um arquivo PDF primeiro!")
+            if self.indice.sujo:
+                self.indice.reindexar()
+            self.renderizar()
+        self.atualizar_contagem()
+
+    def atualizar_contagem(self):
+        """Atualiza o resumo da seleção."""
+        total = len(self.indice)
+        pendentes = self.indice.contagem['pendente']
+        texto = f"{total} arquivo(s), {pendentes} pendente(s)" if total else "Nenhum arquivo selecionado"
+        self.label_contagem.config(text=texto)
+
+    def validar_arquivos(self):
+        """Coloca os arquivos pendentes na fila dos workers."""
+        pendentes = [item_id for item_id, linha in self.indice.linhas.items() if linha.estado == 'pendente']
+        if not pendentes:
+            messagebox.showwarning("Aviso", "Adicione arquivos PDF primeiro!")
             return
-            
-        # Desabilitar botões durante validação
+
+        # Uma nova rodada de progresso quando a anterior já terminou
+        if self.concluidos >= self.enviados:
+            self.enviados = self.concluidos = 0
+        for item_id in pendentes:
+            self.indice.alterar(item_id, 'fila')
+            self.fila.adicionar(item_id, self.indice.linhas[item_id].path)
+        self.enviados += len(pendentes)
+
         self.btn_validar.config(state="disabled")
-        self.btn_selecionar.config(state="disabled")
-        self.btn_limpar.config(state="disabled")
-        
-        # Iniciar progress bar
-        self.progress.start(10)
-        self.validando = True
-        
-        # Limpar resultados anteriores
-        self.texto_resultados.delete(1.0, tk.END)
-        self.texto_resultados.insert(1.0, "⏳ Validando arquivo...\n")
-        self.texto_resultados.insert(tk.END, "📤 Enviando para API do ITI...\n\n")
-        
-        # Executar validação em thread separada
-        thread = threading.Thread(target=self.executar_validacao)
-        thread.daemon = True
-        thread.start()
-        
-    def executar_validacao(self):
-        """Executa a validação e atualiza a interface."""
+        self.btn_cancelar.config(state="normal")
+        self.atualizar_tabela(forcar=True)
+        self.atualizar_progresso()
+        self.atualizar_contagem()
+
+    def cancelar(self):
+        """Cancela os arquivos selecionados na tabela (ou todos, se nenhum estiver selecionado)."""
+        linhas = self.indice.linhas
+        selecionados = self.selecionados or linhas
+        cancelaveis = [i for i in selecionados if i in linhas and linhas[i].estado in ('fila', 'validando')]
+        self.fila.cancelar(cancelaveis)
+        for item_id in cancelaveis:
+            self.indice.alterar(item_id, 'cancelado')
+        self.concluidos += len(cancelaveis)
+        self.atualizar_tabela(forcar=True)
+        self.atualizar_progresso()
+
+    def processar_eventos(self):
+        """Aplica os eventos publicados pelos workers (executado na thread da interface)."""
+        janela = set(self.indice.visiveis[self.inicio:self.fim])
+        mudou_janela = False
         try:
-            # Validar PDF
-            resultado = validate_pdf(self.arquivo_selecionado.get(), verbose=False)
-            
-            # Atualizar interface na thread principal
-            self.root.after(0, self.mostrar_resultado, resultado)
-            
-        except Exception as e:
-            self.root.after(0, self.mostrar_erro, str(e))
-        finally:
-            # Parar progress bar e reabilitar botões
-            self.root.after(0, self.finalizar_validacao)
-            
-    def mostrar_resultado(self, resultado):
-        """Mostra o resultado da validação na interface."""
-        self.texto_resultados.delete(1.0, tk.END)
-        
-        # Cabeçalho
-        self.texto_resultados.insert(1.0, "═" * 76 + "\n")
-        self.texto_resultados.insert(tk.END, " " * 20 + "RESULTADO DA VALIDAÇÃO\n")
-        self.texto_resultados.insert(tk.END, "═" * 76 + "\n\n")
-        
-        status = resultado.get('status', 'unknown')
-        
-        if status == 'valid':
-            # Documento válido
-            self.texto_resultados.insert(tk.END, "✅ STATUS: VÁLIDO\n\n", "sucesso")
-            
-            # Informações do documento
-            if 'documento' in resultado:
-                doc = resultado['documento']
-                self.texto_resultados.insert(tk.END, "📄 INFORMAÇÕES DO DOCUMENTO:\n")
-                self.texto_resultados.insert(tk.END, "─" * 76 + "\n")
-                self.texto_resultados.insert(tk.END, f"   Nome: {doc.get('nome_arquivo', 'N/A')}\n")
-                self.texto_resultados.insert(tk.END, f"   Hash: {doc.get('hash', 'N/A')}\n")
-                self.texto_resultados.insert(tk.END, f"   Data Validação: {doc.get('data_validacao', 'N/A')}\n\n")
-            
-            # Assinaturas
-            total = resultado.get('total_assinaturas', 0)
-            self.texto_resultados.insert(tk.END, f"✍️  ASSINATURAS ENCONTRADAS: {total}\n")
-            self.texto_resultados.insert(tk.END, "─" * 76 + "\n\n")
-            
-            for i, assinatura in enumerate(resultado.get('assinaturas', []), 1):
-                self.texto_resultados.insert(tk.END, f"[Assinatura {i}]\n")
-                self.texto_resultados.insert(tk.END, f"   👤 Assinado por: {assinatura.get('assinado_por', 'N/A')}\n")
-                self.texto_resultados.insert(tk.END, f"   🆔 CPF: {assinatura.get('cpf', 'N/A')}\n")
-                self.texto_resultados.insert(tk.END, f"   🏢 Certificadora: {assinatura.get('certificadora', 'N/A')}\n")
-                self.texto_resultados.insert(tk.END, f"   🔢 Nº Série: {assinatura.get('numero_serie_certificado', 'N/A')}\n")
-                self.texto_resultados.insert(tk.END, f"   📅 Data: {assinatura.get('data_assinatura', 'N/A')}\n")
-                self.texto_resultados.insert(tk.END, f"   ⚡ Status: {assinatura.get('status', 'N/A')}\n")
-                carimbo = "Sim ✓" if assinatura.get('possui_carimbo_tempo', False) else "Não ✗"
-                self.texto_resultados.insert(tk.END, f"   ⏱️  Carimbo de Tempo: {carimbo}\n\n")
-                
-        elif status == 'invalid':
-            # Documento inválido
-            self.texto_resultados.insert(tk.END, "❌ STATUS: INVÁLIDO\n\n", "erro")
-            erro_msg = resultado.get('error', 'Documento sem assinatura ou inválido')
-            self.texto_resultados.insert(tk.END, f"Motivo: {erro_msg}\n\n")
-            
+            for _ in range(EVENTOS_POR_ATUALIZACAO):
+                item_id, estado, resultado = self.fila.eventos.get_nowait()
+                linha = self.indice.linhas.get(item_id)
+                # Linha removida (Limpar) ou cancelada depois do início da validação
+                if linha is None or linha.estado in ESTADOS_FINAIS:
+                    continue
+                self.indice.alterar(item_id, estado if estado in ESTADOS else 'error', resultado)
+                if estado != 'validando':
+                    self.concluidos += 1
+                mudou_janela = mudou_janela or item_id in janela
+        except queue.Empty:
+            pass
+        if mudou_janela or self.indice.sujo:
+            self.atualizar_tabela()
+        self.atualizar_progresso()
+        self.root.after(INTERVALO_ATUALIZACAO, self.processar_eventos)
+
+    def atualizar_tabela(self, forcar=False):
+        """Reindexa (no máximo a cada INTERVALO_REINDEXACAO, salvo se forcar) e redesenha a janela."""
+        agora = time.monotonic()
+        if self.indice.sujo and (forcar or agora - self._ultima_reindexacao >= INTERVALO_REINDEXACAO):
+            self.indice.reindexar()
+            self._ultima_reindexacao = agora
+        self.renderizar()
+
+    def renderizar(self):
+        """Recria na Treeview apenas as linhas da janela visível do índice."""
+        tabela = self.tabela
+        visiveis = self.indice.visiveis
+        linhas = self.indice.linhas
+        total = len(visiveis)
+        self.inicio = max(0, min(self.inicio, total - self.altura))
+
+        foco = tabela.focus()
+        tabela.delete(*tabela.get_children())
+        vagas = self.altura
+        fim = self.inicio
+        while fim < total and vagas > 0:
+            linha = linhas[visiveis[fim]]
+            iid = str(linha.id)
+            aberta = linha.id in self.expandidos and linha.resultado is not None
+            tabela.insert("", tk.END, iid=iid, text=linha.nome, values=linha.valores(), open=aberta)
+            if aberta:
+                detalhes = detalhes_resultado(linha.resultado)
+                for n, (texto, *valores) in enumerate(detalhes):
+                    tabela.insert(iid, tk.END, iid=f"{iid}/{n}", text=texto, values=valores)
+                vagas -= len(detalhes)
+            elif linha.resultado is not None:
+                # Filho provisório: mostra o botão de expandir sem montar os detalhes
+                tabela.insert(iid, tk.END, iid=f"{iid}/", text="…")
+            vagas -= 1
+            fim += 1
+        self.fim = fim
+
+        selecao = [str(i) for i in visiveis[self.inicio:fim] if i in self.selecionados]
+        if selecao:
+            tabela.selection_set(selecao)
+        if foco and tabela.exists(foco):
+            tabela.focus(foco)
+        if total:
+            self.scroll.set(self.inicio / total, fim / total)
+        else:
+            self.scroll.set(0, 1)
+        self.label_exibidos.config(text=f"{total} de {len(self.indice)} exibido(s)")
+
+    def redimensionar(self, event):
+        """Recalcula quantas linhas cabem na tabela."""
+        altura_linha = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        # Descontando o cabeçalho (aproximadamente uma linha)
+        altura = max(1, event.height // altura_linha - 1)
+        if altura != self.altura:
+            self.altura = altura
+            self.renderizar()
+
+    def rolar(self, operacao, valor, unidade=None):
+        """Comando da barra de rolagem: desloca a janela sobre o índice."""
+        total = len(self.indice.visiveis)
+        if operacao == "moveto":
+            self.inicio = int(float(valor) * total)
+        elif unidade == "pages":
+            self.inicio += int(valor) * self.altura
         else:
-            # Erro
-            self.texto_resultados.insert(tk.END, "⚠️  STATUS: ERRO\n\n", "aviso")
-            erro_msg = resultado.get('error', 'Erro desconhecido durante a validação')
-            self.texto_resultados.insert(tk.END, f"Erro: {erro_msg}\n\n")
-        
-        # Rodapé
-        self.texto_resultados.insert(tk.END, "─" * 76 + "\n")
-        self.texto_resultados.insert(tk.END, "Validação concluída.\n")
-        
-        # Configurar tags de cor
-        self.texto_resultados.tag_config("sucesso", foreground="green", font=("Courier", 10, "bold"))
-        self.texto_resultados.tag_config("erro", foreground="red", font=("Courier", 10, "bold"))
-        self.texto_resultados.tag_config("aviso", foreground="orange", font=("Courier", 10, "bold"))
-        
-    def mostrar_erro(self, mensagem_erro):
-        """Mostra mensagem de erro."""
-        self.texto_resultados.delete(1.0, tk.END)
-        self.texto_resultados.insert(1.0, "═" * 76 + "\n")
-        self.texto_resultados.insert(tk.END, " " * 30 + "ERRO\n")
-        self.texto_resultados.insert(tk.END, "═" * 76 + "\n\n")
-        self.texto_resultados.insert(tk.END, "⚠️  Ocorreu um erro durante a validação:\n\n")
-        self.texto_resultados.insert(tk.END, f"{mensagem_erro}\n\n")
-        self.texto_resultados.insert(tk.END, "Verifique se:\n")
-        self.texto_resultados.insert(tk.END, "  • O arquivo é um PDF válido\n")
-        self.texto_resultados.insert(tk.END, "  • Você tem conexão com a internet\n")
-        self.texto_resultados.insert(tk.END, "  • O arquivo não está corrompido\n")
-        
-    def finalizar_validacao(self):
-        """Finaliza a validação e reabilita botões."""
-        self.progress.stop()
-        self.validando = False
-        self.btn_validar.config(state="normal")
-        self.btn_selecionar.config(state="normal")
-        self.btn_limpar.config(state="normal")
-        
+            self.inicio += int(valor)
+        self.renderizar()
+        return "break"
+
+    def rolar_roda(self, event):
+        """Roda do mouse (event.delta no Windows/macOS, Button-4/5 no X11)."""
+        if event.num == 4 or event.delta > 0:
+            return self.rolar("scroll", -LINHAS_POR_ROLAGEM, "units")
+        return self.rolar("scroll", LINHAS_POR_ROLAGEM, "units")
+
+    def mover_foco(self, passo):
+        """Setas: nas bordas da janela, rola o índice em vez de parar na última linha exibida."""
+        foco = self.tabela.focus()
+        topo = self.tabela.get_children()
+        if not topo or foco not in topo or foco != topo[0 if passo < 0 else -1]:
+            return None
+        posicao = self.inicio + topo.index(foco) + passo
+        visiveis = self.indice.visiveis
+        if not 0 <= posicao < len(visiveis):
+            return "break"
+        self.selecionados = {visiveis[posicao]}
+        self.rolar("scroll", passo, "units")
+        iid = str(visiveis[posicao])
+        if self.tabela.exists(iid):
+            self.tabela.focus(iid)
+            self.tabela.see(iid)
+        return "break"
+
+    def atualizar_selecao(self, event=None):
+        """Guarda a seleção por id (as linhas fora da janela continuam selecionadas)."""
+        janela = set(self.indice.visiveis[self.inicio:self.fim])
+        marcados = {int(iid) for iid in self.tabela.selection() if '/' not in iid}
+        self.selecionados = (self.selecionados - janela) | marcados
+
+    def _linha_do_evento(self):
+        iid = self.tabela.focus()
+        if not iid or '/' in iid:
+            return None
+        return int(iid)
+
+    def expandir(self, event=None):
+        """Monta os detalhes do documento expandido."""
+        item_id = self._linha_do_evento()
+        if item_id is not None:
+            self.expandidos.add(item_id)
+            self.renderizar()
+
+    def recolher(self, event=None):
+        """Descarta os detalhes do documento recolhido."""
+        item_id = self._linha_do_evento()
+        if item_id is not None:
+            self.expandidos.discard(item_id)
+            self.renderizar()
+
+    def ordenar(self, coluna):
+        """Ordena a tabela pela coluna clicada (de novo: ordem inversa)."""
+        self.indice.ordenar(coluna)
+        seta = " ▼" if self.indice.decrescente else " ▲"
+        for c, titulo in TITULOS.items():
+            self.tabela.heading(c, text=titulo + (seta if c == coluna else ""))
+        self.inicio = 0
+        self.renderizar()
+
+    def agendar_filtro(self, *args):
+        """Aplica o filtro de texto quando a digitação para por ESPERA_FILTRO ms."""
+        if self._filtro_agendado is not None:
+            self.root.after_cancel(self._filtro_agendado)
+        self._filtro_agendado = self.root.after(ESPERA_FILTRO, self.aplicar_filtro)
+
+    def aplicar_filtro(self, event=None):
+        """Filtra a tabela pelo texto e pelo status escolhidos."""
+        self._filtro_agendado = None
+        rotulo = self.estado_filtro.get()
+        estado = next((e for e, r in ESTADOS.items() if r == rotulo), None)
+        self.indice.filtrar(self.texto_filtro.get(), estado)
+        self.inicio = 0
+        self.renderizar()
+
+    def atualizar_progresso(self):
+        """Atualiza a barra de progresso e reabilita os botões ao final."""
+        self.progress.config(maximum=max(self.enviados, 1), value=self.concluidos)
+        if self.enviados:
+            self.label_progresso.config(text=f"{self.concluidos}/{self.enviados}")
+        if self.concluidos >= self.enviados:
+            self.btn_cancelar.config(state="disabled")
+            if self.indice.contagem['pendente']:
+                self.btn_validar.config(state="normal")
+
     def limpar_resultados(self):
-        """Limpa a seleção e resultados."""
-        self.arquivo_selecionado.set("")
+        """Cancela o que estiver em andamento e limpa a tabela."""
+        self.fila.cancelar(tuple(self.indice.linhas))
+        self.indice.limpar()
+        self.selecionados.clear()
+        self.expandidos.clear()
+        self.inicio = 0
+        self.enviados = self.concluidos = 0
+        self.progress.config(value=0)
+        self.label_progresso.config(text="")
         self.btn_validar.config(state="disabled")
-        self.mostrar_mensagem_inicial()
+        self.btn_cancelar.config(state="disabled")
+        self.atualizar_contagem()
+        self.renderizar()
+
+    def fechar(self):
+        """Encerra os workers, fecha as conexões e a janela."""
+        self.fila.encerrar()
+        self.client.close()
+        self.root.destroy()
 
 
 def main():
@@ -0,0 +1,92 @@
+"""
+Módulo para validação de assinaturas PDF via API do ITI (sem Selenium).
+Função principal: validate_pdf(pdf_path, verbose=False) → dict
+"""
+
+from .async_client import AsyncItiClient, validate_many, validate_pdf_async
+from .cache import (
+    DirectoryCache,
+    MemoryCache,
+    RelatorioPdfCache,
+    ResultCache,
+    SQLiteCache,
+    TieredCache,
+    hash_arquivo,
+)
+from .client import (
+    BASE_URL,
+    BASE_URL_HOMOLOGACAO,
+    ItiClient,
+    download_relatorio_pdf,
+    download_relatorio_pdfs,
+    get_conformidade_report,
+    get_default_client,
+    set_default_client,
+    validate_document,
+    validate_full,
+    validate_pdf,
+    validate_url,
+)
+from .formatos import ParDocumento, detectar_formato, parear_destacados
+from .metrics import MetricsHook, OpenTelemetryHook, PrometheusExporter, Span
+from .pipeline import Pipeline, preparar_documento
+from .preflight import inspecionar_pdf
+from .ratelimit import AdaptiveRateLimiter, RetryPolicy, get_default_rate_limiter
+from .relatorio import DocumentInfo, SignatureInfo, ValidationResult, parse_relatorio, process_relatorio
+from .retencao import RETENCOES, RawStore, aplicar_retencao
+from .servidor import ServicoValidacao, ServidorValidacao
+from .singleflight import FileLockSingleFlight, SingleFlight, SingleFlightAsync
+from .watch import EstadoArquivos, ObservadorDiretorio
+
+__all__ = [
+    "AdaptiveRateLimiter",
+    "AsyncItiClient",
+    "BASE_URL",
+    "BASE_URL_HOMOLOGACAO",
+    "DirectoryCache",
+    "DocumentInfo",
+    "EstadoArquivos",
+    "FileLockSingleFlight",
+    "ItiClient",
+    "MemoryCache",
+    "MetricsHook",
+    "ObservadorDiretorio",
+    "OpenTelemetryHook",
+    "ParDocumento",
+    "Pipeline",
+    "PrometheusExporter",
+    "RETENCOES",
+    "RawStore",
+    "RelatorioPdfCache",
+    "ResultCache",
+    "RetryPolicy",
+    "SQLiteCache",
+    "ServicoValidacao",
+    "ServidorValidacao",
+    "SignatureInfo",
+    "SingleFlight",
+    "SingleFlightAsync",
+    "Span",
+    "TieredCache",
+    "ValidationResult",
+    "aplicar_retencao",
+    "detectar_formato",
+    "download_relatorio_pdf",
+    "download_relatorio_pdfs",
+    "get_conformidade_report",
+    "get_default_client",
+    "get_default_rate_limiter",
+    "hash_arquivo",
+    "inspecionar_pdf",
+    "parear_destacados",
+    "parse_relatorio",
+    "preparar_documento",
+    "process_relatorio",
+    "set_default_client",
+    "validate_document",
+    "validate_full",
+    "validate_many",
+    "validate_pdf",
+    "validate_pdf_async",
+    "validate_url",
+]
@@ -0,0 +1,246 @@
+"""
+Linha de comando do validador.
+
+Uso:
+    python -m validator_api batch <dir|glob|lista.txt|arquivo.pdf>... [-o saida.jsonl]
+    python -m validator_api batch --urls <url|urls.txt>... [-o saida.jsonl]
+    python -m validator_api serve [--host 127.0.0.1] [--port 8765] [-w 8]
+    python -m validator_api watch <dir> [-o saida.jsonl | --sidecar] [--state estado.db]
+"""
+
+import argparse
+import sys
+
+from .batch import MODOS_BATCH, run_batch
+from .cache import RelatorioPdfCache, SQLiteCache, TieredCache
+from .client import ItiClient, base_url_padrao
+from .metrics import PrometheusExporter
+from .retencao import RETENCOES
+from .servidor import HOST_PADRAO, PORTA_PADRAO, ServicoValidacao, ServidorValidacao
+from .watch import DEBOUNCE_PADRAO, INTERVALO_VARREDURA, NOME_ESTADO, ObservadorDiretorio
+
+
+def _criar_cliente(args, pool_maxsize, metricas=False, single_flight=None):
+    cache = None
+    if args.cache:
+        cache = SQLiteCache(args.cache, ttl=args.cache_ttl)
+        if args.memory_cache:
+            cache = TieredCache(cache, memory_bytes=int(args.memory_cache * 1024 * 1024))
+    pdf_cache = RelatorioPdfCache(args.pdf_cache) if args.pdf_cache else None
+    hooks = PrometheusExporter() if args.metrics_file or metricas else None
+    return ItiClient(base_url=args.base_url, pool_maxsize=pool_maxsize, cache=cache, hooks=hooks,
+                     retention=args.retention, raw_store=args.raw_store, preflight=not args.no_preflight,
+                     single_flight=single_flight, pdf_cache=pdf_cache)
+
+
+def _gravar_metricas(args, client):
+    if args.metrics_file:
+        for hook in client.hooks:
+            hook.write(args.metrics_file)
+
+
+def _adicionar_opcoes_cliente(parser):
+    parser.add_argument("--base-url", default=base_url_padrao(),
+                        help="URL base da API do ITI (padrão: ITI_BASE_URL ou produção)")
+    parser.add_argument("--cache", metavar="ARQUIVO.db",
+                        help="Cache SQLite de resultados por hash do conteúdo")
+    parser.add_argument("--cache-ttl", type=float, default=None, metavar="SEGUNDOS",
+                        help="Validade dos itens do cache")
+    parser.add_argument("--memory-cache", type=float, default=None, metavar="MB",
+                        help="Camada LRU em memória na frente de --cache, com este orçamento")
+    parser.add_argument("--pdf-cache", metavar="DIRETORIO",
+                        help="Cache em disco dos PDFs de relatório (por relatório e idioma)")
+    parser.add_argument("--retention", choices=RETENCOES, default="always",
+                        help="Mantém relatorio_completo/json_bruto nos resultados: sempre, nunca, "
+                             "só em erros, ou gravados em --raw-store (padrão: always)")
+    parser.add_argument("--raw-store", metavar="DIRETORIO",
+                        help="Diretório dos dados brutos com --retention spill")
+    parser.add_argument("--no-preflight", action="store_true",
+                        help="Envia ao ITI também os PDFs sem /ByteRange nem /Sig (sem verificação local)")
+    parser.add_argument("--metrics-file", metavar="ARQUIVO.prom",
+                        help="Grava métricas por etapa no formato de texto do Prometheus ao final")
+
+
+def comando_batch(args):
+    if args.retention == "spill" and not args.raw_store:
+        print("--retention spill requer --raw-store", file=sys.stderr)
+        return 2
+    client = _criar_cliente(args, pool_maxsize=args.workers)
+
+    def progresso(path, resultado, contadores):
+        if not args.quiet:
+            print(f"[{contadores['total']}] {resultado.get('status', 'unknown'):8} {path}", file=sys.stderr)
+
+    try:
+        contadores = run_batch(
+            args.entradas,
+            output=args.output,
+            manifest=args.manifest,
+            workers=args.workers,
+            mode=args.mode,
+            client=client,
+            retry_errors=not args.no_retry_errors,
+            pattern=args.pattern,
+            progress=progresso,
+            process_workers=args.process_workers,
+            detached=args.detached,
+            urls=args.urls,
+        )
+    except KeyboardInterrupt:
+        print("\nInterrompido. Execute o mesmo comando para retomar.", file=sys.stderr)
+        return 130
+    finally:
+        _gravar_metricas(args, client)
+        client.close()
+
+    resumo = ", ".join(f"{k}={v}" for k, v in contadores.items() if k not in ("total", "elapsed"))
+    print(f"✓ {contadores['total']} documento(s) em {contadores['elapsed']:.1f}s ({resumo})", file=sys.stderr)
+    return 1 if contadores.get("error") else 0
+
+
+def comando_serve(args):
+    if args.retention == "spill" and not args.raw_store:
+        print("--retention spill requer --raw-store", file=sys.stderr)
+        return 2
+    # Um cliente para todos os workers: um pool de conexões, um cache e
+    # coalescência de jobs simultâneos do mesmo documento
+    client = _criar_cliente(args, pool_maxsize=args.workers, metricas=True, single_flight=True)
+    servico = ServicoValidacao(client, workers=args.workers, queue_size=args.queue_size, job_ttl=args.job_ttl)
+    try:
+        servidor = ServidorValidacao(servico, host=args.host, port=args.port,
+                                     max_upload=int(args.max_upload_mb * 1024 * 1024), verbose=not args.quiet)
+    except OSError as e:
+        print(f"Não foi possível escutar em {args.host}:{args.port}: {e}", file=sys.stderr)
+        client.close()
+        return 1
+
+    servico.start()
+    print(f"✓ Servindo em {servidor.base_url} ({args.workers} workers, fila de {args.queue_size})", file=sys.stderr)
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print("\nEncerrando: aguardando os jobs em andamento...", file=sys.stderr)
+    finally:
+        servidor.server_close()
+        servico.stop()
+        _gravar_metricas(args, client)
+        client.close()
+    return 0
+
+
+def comando_watch(args):
+    if args.retention == "spill" and not args.raw_store:
+        print("--retention spill requer --raw-store", file=sys.stderr)
+        return 2
+    client = _criar_cliente(args, pool_maxsize=args.workers)
+
+    def progresso(path, resultado, contadores):
+        if not args.quiet:
+            print(f"[{contadores['total']}] {resultado.get('status', 'unknown'):8} {path}", file=sys.stderr)
+
+    try:
+        observador = ObservadorDiretorio(
+            args.diretorio,
+            client=client,
+            output=args.output,
+            sidecar=args.sidecar,
+            state=args.state,
+            pattern=args.pattern,
+            recursive=not args.no_recursive,
+            debounce=args.debounce,
+            workers=args.workers,
+            polling=args.polling,
+            interval=args.interval,
+            progress=progresso,
+        )
+    except (NotADirectoryError, ValueError) as e:
+        print(e, file=sys.stderr)
+        client.close()
+        return 2
+
+    print(f"✓ Observando {args.diretorio} ({'polling' if observador.polling else 'watchdog'}, "
+          f"Ctrl+C para encerrar)", file=sys.stderr)
+    try:
+        contadores = observador.run()
+    except KeyboardInterrupt:
+        observador.stop()
+        contadores = observador.contadores
+    finally:
+        _gravar_metricas(args, client)
+        client.close()
+
+    resumo = ", ".join(f"{k}={v}" for k, v in contadores.items() if k != "total")
+    print(f"\n✓ {contadores['total']} documento(s) validado(s) ({resumo})", file=sys.stderr)
+    return 0
+
+
+def criar_parser():
+    parser = argparse.ArgumentParser(prog="python -m validator_api",
+                                     description="Validador de assinaturas digitais via API do ITI")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    batch = subparsers.add_parser("batch", help="Valida um lote de documentos (saída JSONL)")
+    batch.add_argument("entradas", nargs="+",
+                       help="Diretórios, padrões glob, PDFs ou listas de arquivos ('-' = stdin)")
+    batch.add_argument("-o", "--output", help="Arquivo JSONL de saída (padrão: saída padrão)")
+    batch.add_argument("--manifest", help="Manifesto para retomar execuções (padrão: <output>.manifest)")
+    batch.add_argument("-w", "--workers", type=int, default=8, help="Validações simultâneas (padrão: 8)")
+    batch.add_argument("--mode", choices=MODOS_BATCH, default="thread", help="Tipo de pool de workers")
+    batch.add_argument("--process-workers", type=int, default=None, metavar="N",
+                       help="Processos de hash/verificação local no modo pipeline (padrão: núcleos da CPU)")
+    batch.add_argument("--pattern", default=None,
+                       help="Padrão de busca em diretórios (padrão: *.pdf, ou * com --detached)")
+    batch.add_argument("--detached", action="store_true",
+                       help="Pareia assinaturas destacadas (.p7s, .p7m, .jws) com os documentos originais")
+    batch.add_argument("--urls", action="store_true",
+                       help="As entradas são URLs (ou listas de URLs) validadas via /url, sem download")
+    batch.add_argument("--no-retry-errors", action="store_true",
+                       help="Ao retomar, não refaz documentos que terminaram com erro")
+    batch.add_argument("-q", "--quiet", action="store_true", help="Não mostra o progresso por documento")
+    _adicionar_opcoes_cliente(batch)
+    batch.set_defaults(func=comando_batch)
+
+    serve = subparsers.add_parser("serve", help="Serviço local de validação (API HTTP/JSON com fila de jobs)")
+    serve.add_argument("--host", default=HOST_PADRAO, help=f"Endereço de escuta (padrão: {HOST_PADRAO})")
+    serve.add_argument("--port", type=int, default=PORTA_PADRAO, help=f"Porta (padrão: {PORTA_PADRAO})")
+    serve.add_argument("-w", "--workers", type=int, default=8, help="Jobs executados ao mesmo tempo (padrão: 8)")
+    serve.add_argument("--queue-size", type=int, default=1000, metavar="N",
+                       help="Jobs aguardando na fila; acima disso a API responde 503 (padrão: 1000)")
+    serve.add_argument("--max-upload-mb", type=float, default=100, metavar="MB",
+                       help="Tamanho máximo de um documento enviado (padrão: 100)")
+    serve.add_argument("--job-ttl", type=float, default=3600, metavar="SEGUNDOS",
+                       help="Tempo em que o resultado de um job fica disponível (padrão: 3600)")
+    serve.add_argument("-q", "--quiet", action="store_true", help="Não registra cada requisição")
+    _adicionar_opcoes_cliente(serve)
+    serve.set_defaults(func=comando_serve)
+
+    watch = subparsers.add_parser("watch", help="Valida os documentos novos ou alterados em um diretório")
+    watch.add_argument("diretorio", help="Diretório observado")
+    watch.add_argument("-o", "--output", help="Arquivo JSONL de saída (padrão: saída padrão, exceto com --sidecar)")
+    watch.add_argument("--sidecar", action="store_true",
+                       help="Grava o resultado ao lado de cada documento (<arquivo>.iti.json)")
+    watch.add_argument("--state", metavar="ARQUIVO.db",
+                       help=f"Índice do estado dos arquivos (padrão: <diretorio>/{NOME_ESTADO})")
+    watch.add_argument("--pattern", default="*.pdf", help="Padrão dos nomes validados (padrão: *.pdf)")
+    watch.add_argument("--no-recursive", action="store_true", help="Não observa os subdiretórios")
+    watch.add_argument("--debounce", type=float, default=DEBOUNCE_PADRAO, metavar="SEGUNDOS",
+                       help=f"Espera sem mudanças antes de validar um arquivo (padrão: {DEBOUNCE_PADRAO})")
+    watch.add_argument("--polling", action="store_true",
+                       help="Varre o diretório periodicamente em vez de usar o watchdog")
+    watch.add_argument("--interval", type=float, default=INTERVALO_VARREDURA, metavar="SEGUNDOS",
+                       help=f"Intervalo da varredura periódica (padrão: {INTERVALO_VARREDURA})")
+    watch.add_argument("-w", "--workers", type=int, default=4, help="Validações simultâneas (padrão: 4)")
+    watch.add_argument("-q", "--quiet", action="store_true", help="Não mostra o progresso por documento")
+    _adicionar_opcoes_cliente(watch)
+    watch.set_defaults(func=comando_watch)
+
+    return parser
+
+
+def main(argv=None):
+    args = criar_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,471 @@
+"""
+API assíncrona (asyncio) para validar muitos PDFs em paralelo.
+
+Usa httpx.AsyncClient, de modo que um único processo mantém dezenas de
+uploads em andamento sem uma thread por documento. O formato dos resultados é
+exatamente o mesmo de validate_pdf (saída de process_relatorio).
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+
+from .cache import resultado_cacheavel
+from .formatos import PDF, ParDocumento, abrir_formatado
+from .client import (
+    HEADERS_ARQUIVO,
+    HEADERS_SIMPLES,
+    HEADERS_URL,
+    anotar_preflight,
+    anotar_url,
+    base_url_padrao,
+    carregar_json_bruto,
+    chave_cache,
+    corpo_arquivo,
+    eh_url,
+    lista_destacados,
+    montar_headers_navegador,
+    nome_da_url,
+    rebobinar_corpo,
+    resultado_falha_arquivo,
+    resultado_simples,
+    url_recusada,
+    verificar_preflight,
+    verificar_url,
+)
+from .json_backend import como_bytes, dumps
+from .metrics import contar, medir, normalizar_hooks, registrar_span, tamanho_requisicao
+from .preflight import inspecionar_pdf
+from .ratelimit import RetryPolicy, deve_repetir, get_default_rate_limiter, parse_retry_after
+from .retencao import RawStore, aplicar_retencao, validar_retencao
+from .singleflight import SingleFlightAsync, chave_voo
+from .upload import LIMITE_SPOOL_MEMORIA, TAMANHO_BLOCO_UPLOAD, DocumentoUpload, MultipartStream, abrir_documento
+
+try:
+    import httpx
+except ImportError:  # dependência opcional, necessária apenas para a API assíncrona
+    httpx = None
+
+
+class AsyncItiClient:
+    """
+    Cliente assíncrono da API do ITI com pool de conexões keep-alive.
+
+    Deve ser criado e usado dentro do mesmo event loop.
+
+    Args:
+        base_url: URL base da API (padrão: ITI_BASE_URL ou produção)
+        max_connections: Máximo de conexões simultâneas
+        max_keepalive_connections: Conexões ociosas mantidas abertas
+        timeout: Timeout (segundos) de cada requisição
+        cache: ResultCache compartilhado com os clientes síncronos (opcional)
+        rate_limiter: AdaptiveRateLimiter (padrão: o compartilhado pelo
+            processo; False desativa)
+        retry: RetryPolicy (padrão: RetryPolicy(); False desativa)
+        hooks: MetricsHook ou lista de hooks de instrumentação (ver metrics)
+        retention: Política de retenção dos dados brutos (ver ItiClient)
+        raw_store: RawStore ou diretório usado pela política 'spill'
+        preflight: Verificação local de assinaturas antes do upload (ver ItiClient)
+        single_flight: Coalescência de validações simultâneas do mesmo
+            documento: True (SingleFlightAsync do cliente), uma instância de
+            SingleFlightAsync ou None (padrão: desativada)
+    """
+
+    def __init__(self, base_url=None, max_connections=20, max_keepalive_connections=20, timeout=60,
+                 cache=None, rate_limiter=None, retry=None, hooks=None, retention="always", raw_store=None,
+                 preflight=True, single_flight=None):
+        if httpx is None:
+            raise ImportError("A API assíncrona requer o pacote httpx: pip install httpx")
+
+        if base_url is None:
+            base_url = base_url_padrao()
+        self.base_url = base_url.rstrip('/')
+        self.cache = cache
+        self.preflight = preflight
+        self.single_flight = SingleFlightAsync() if single_flight is True else (single_flight or None)
+        self.hooks = normalizar_hooks(hooks)
+        self.retention = validar_retencao(retention)
+        self.raw_store = RawStore(raw_store) if isinstance(raw_store, (str, os.PathLike)) else raw_store
+        if retention == "spill" and self.raw_store is None:
+            raise ValueError("A política 'spill' requer raw_store")
+        self.rate_limiter = get_default_rate_limiter() if rate_limiter is None else (rate_limiter or None)
+        self.retry = RetryPolicy() if retry is None else (retry or None)
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers=montar_headers_navegador(self.base_url),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections
+            ),
+            timeout=timeout
+        )
+        self._timeout = timeout
+        self._cliente_download = None
+
+    def __repr__(self):
+        return f"AsyncItiClient(base_url={self.base_url!r})"
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+    async def aclose(self):
+        """Fecha todas as conexões do pool."""
+        await self.client.aclose()
+        if self._cliente_download is not None:
+            await self._cliente_download.aclose()
+
+    async def post(self, endpoint, **kwargs):
+        """
+        Executa um POST no endpoint, com limitador de taxa e novas tentativas
+        (ver ItiClient.post).
+        """
+        endpoint = endpoint.lstrip('/')
+        if self.retry is not None:
+            self.retry.registrar_requisicao(endpoint)
+
+        tentativa = 0
+        while True:
+            if self.rate_limiter is not None:
+                espera = self.rate_limiter.reservar()
+                if espera > 0:
+                    await asyncio.sleep(espera)
+            if tentativa:
+                rebobinar_corpo(kwargs)
+            try:
+                with medir(self.hooks, 'http', endpoint=endpoint, tentativa=tentativa) as span:
+                    response = await self.client.post(f'/{endpoint}', **kwargs)
+                    span.definir(status_code=response.status_code)
+            except httpx.TransportError:
+                if self.rate_limiter is not None:
+                    self.rate_limiter.registrar(None)
+                tentativa += 1
+                if self.retry is None or not self.retry.pode_repetir(endpoint, tentativa):
+                    raise
+                await asyncio.sleep(self.retry.atraso(tentativa))
+                continue
+
+            if self.hooks:
+                contar(self.hooks, 'bytes_enviados', tamanho_requisicao(response.request.headers), endpoint=endpoint)
+                contar(self.hooks, 'bytes_recebidos', len(response.content), endpoint=endpoint)
+
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            if self.rate_limiter is not None:
+                self.rate_limiter.registrar(response.status_code, retry_after)
+            if deve_repetir(response.status_code) and self.retry is not None:
+                tentativa += 1
+                if self.retry.pode_repetir(endpoint, tentativa):
+                    await response.aclose()
+                    await asyncio.sleep(self.retry.atraso(tentativa, retry_after))
+                    continue
+            return response
+
+    async def post_arquivo(self, pdf_path, filename=None, detached=()):
+        """Envia o PDF (e as assinaturas destacadas em detached) para /arquivo, em streaming."""
+        documento = abrir_documento(pdf_path, filename)
+        try:
+            corpo = MultipartStream([('signature_files[]', documento)]
+                                    + [('detached_files[]', destacado) for destacado in detached])
+            response = await self.post('arquivo', headers={**HEADERS_ARQUIVO, **corpo.headers},
+                                       content=corpo.assincrono())
+            if self.hooks and corpo.enviado_em is not None:
+                registrar_span(self.hooks, 'upload', corpo.iniciado_em, corpo.enviado_em,
+                               endpoint='arquivo', bytes=corpo.tamanho)
+                registrar_span(self.hooks, 'espera_resposta', corpo.enviado_em, time.perf_counter(),
+                               endpoint='arquivo', status_code=response.status_code)
+            return response
+        finally:
+            if documento is not pdf_path:
+                documento.close()
+
+    async def post_url(self, url):
+        """Pede ao ITI que baixe e analise o documento da URL (ver ItiClient.post_url)."""
+        return await self.post('url', headers=HEADERS_URL, content=dumps({"url": url}))
+
+    async def post_simples(self, json_bruto):
+        """Envia o json_bruto de /arquivo (dict ou os bytes originais) para /simples."""
+        return await self.post('simples', headers=HEADERS_SIMPLES, content=como_bytes(json_bruto))
+
+    async def _preflight(self, documento):
+        """Verificação local do documento, fora do event loop (None se desativada; reaproveita uma já feita)."""
+        if not self.preflight:
+            return None
+        if documento.preflight is None:
+            with medir(self.hooks, 'preflight') as span:
+                documento.preflight = await asyncio.to_thread(inspecionar_pdf, documento)
+                span.definir(assinaturas=documento.preflight['assinaturas'])
+        return documento.preflight
+
+    async def _coalescer(self, documento, fabrica, destacados=()):
+        """Executa fabrica() pelo single-flight do cliente (ver ItiClient._coalescer)."""
+        if self.single_flight is None:
+            return await fabrica()
+        chave = chave_voo(await asyncio.to_thread(chave_cache, documento, destacados), 'simples')
+        resultado, compartilhado = await self.single_flight.executar(chave, fabrica)
+        if not compartilhado:
+            return resultado
+        contar(self.hooks, 'chamadas_coalescidas', 1, endpoint='simples')
+        return resultado
+
+    async def _cache_set(self, digest, resultado):
+        if digest is not None and resultado_cacheavel('simples', resultado):
+            # SQLite/diretório: E/S de disco e travas fora do event loop
+            await asyncio.to_thread(self.cache.set, digest, 'simples', resultado)
+        return resultado
+
+    async def validate_pdf(self, pdf_path, filename=None, retention=None):
+        """
+        Valida assinaturas de PDF (versão assíncrona de validate_pdf).
+        Args:
+            pdf_path: Caminho para o arquivo PDF, bytes ou objeto com read()
+            filename: Nome do documento (padrão: nome do arquivo/stream)
+            retention: Política de retenção dos dados brutos (padrão: a do cliente)
+        Returns:
+            dict com resultado da validação
+        """
+        documento = abrir_documento(pdf_path, filename)
+        try:
+            with medir(self.hooks, 'validate_pdf') as span:
+                verificacao = await self._preflight(documento)
+                resultado = verificar_preflight(verificacao)
+                if resultado is None:
+                    resultado = await self._coalescer(documento, lambda: self._validate_documento(documento))
+                    resultado = anotar_preflight(resultado, verificacao)
+                span.definir(status=resultado.get('status'))
+            return aplicar_retencao(resultado, retention or self.retention, self.raw_store)
+        finally:
+            if documento is not pdf_path:
+                documento.close()
+
+    async def validate_document(self, signed, detached=None, filename=None, retention=None):
+        """
+        Valida um documento assinado (PDF, XML, P7S ou JSON), com assinaturas
+        destacadas opcionais (versão assíncrona de validate_document).
+        Args:
+            signed: Documento assinado ou original: caminho, bytes, objeto com read() ou DocumentoUpload
+            detached: Assinatura destacada ou lista delas
+            filename: Nome do documento (padrão: nome do arquivo/stream)
+            retention: Política de retenção dos dados brutos (padrão: a do cliente)
+        Returns:
+            dict com resultado da validação
+        """
+        detached = lista_destacados(detached)
+        documento = None
+        destacados = []
+        try:
+            documento = await asyncio.to_thread(abrir_formatado, signed, filename)
+            for fonte in detached:
+                destacados.append(await asyncio.to_thread(abrir_formatado, fonte, None, True))
+            with medir(self.hooks, 'validate_document', destacados=len(destacados)) as span:
+                verificacao = None
+                if not destacados and documento.content_type == PDF.content_type:
+                    verificacao = await self._preflight(documento)
+                resultado = verificar_preflight(verificacao)
+                if resultado is None:
+                    resultado = await self._coalescer(
+                        documento, lambda: self._validate_documento(documento, destacados), destacados
+                    )
+                    resultado = anotar_preflight(resultado, verificacao)
+                span.definir(status=resultado.get('status'))
+            return aplicar_retencao(resultado, retention or self.retention, self.raw_store)
+        except FileNotFoundError as e:
+            return {
+                "status": "error",
+                "error": str(e)
+            }
+        finally:
+            for aberto, fonte in zip([documento, *destacados], [signed, *detached]):
+                if aberto is not None and aberto is not fonte:
+                    aberto.close()
+
+    async def _validate_documento(self, documento, destacados=()):
+        digest = None
+        if self.cache is not None:
+            with medir(self.hooks, 'cache', endpoint='simples') as span:
+                digest = await asyncio.to_thread(chave_cache, documento, destacados)
+                em_cache = await asyncio.to_thread(self.cache.get, digest, 'simples')
+                span.definir(hit=em_cache is not None)
+            if em_cache is not None:
+                return em_cache
+
+        try:
+            response = await self.post_arquivo(documento, detached=destacados)
+            falha = resultado_falha_arquivo(response)
+            if falha is not None:
+                return await self._cache_set(digest, falha)
+            json_bruto = corpo_arquivo(response)
+        except Exception as e:
+            return {
+                "status": "error",
+                "error": str(e)
+            }
+
+        try:
+            response_simples = await self.post_simples(json_bruto)
+            return await self._cache_set(digest, resultado_simples(response_simples, json_bruto, documento.nome, self.hooks))
+        except Exception as e:
+            return {
+                "status": "error",
+                "error": f"Erro ao processar /simples: {str(e)}",
+                "json_bruto": carregar_json_bruto(json_bruto, self.hooks)
+            }
+
+    async def validate_url(self, url, fallback=True, filename=None, retention=None):
+        """
+        Valida um documento publicado em uma URL via /url (versão assíncrona de
+        ItiClient.validate_url, com o mesmo download em streaming quando o ITI
+        recusa a URL).
+        """
+        verificar_url(url)
+        nome = filename or nome_da_url(url)
+        with medir(self.hooks, 'validate_url') as span:
+            response = None
+            try:
+                response = await self.post_url(url)
+                resultado = resultado_falha_arquivo(response)
+                if resultado is None:
+                    json_bruto = corpo_arquivo(response)
+            except ValueError as e:
+                # Resposta 200 que não é JSON: tratada como recusa (response fica
+                # None se o próprio post_url levantou)
+                resultado = {"status": "error", "error": str(e)}
+            except Exception as e:
+                resultado = {"status": "error", "error": str(e)}
+
+            if resultado is None:
+                try:
+                    response_simples = await self.post_simples(json_bruto)
+                    resultado = resultado_simples(response_simples, json_bruto, nome, self.hooks)
+                except Exception as e:
+                    resultado = {
+                        "status": "error",
+                        "error": f"Erro ao processar /simples: {str(e)}",
+                        "json_bruto": carregar_json_bruto(json_bruto, self.hooks)
+                    }
+                resultado = anotar_url(resultado, url, 'url')
+            elif fallback and response is not None and (url_recusada(response) or response.status_code == 200):
+                resultado = anotar_url(await self._validate_download(url, nome), url, 'download',
+                                       url_status=response.status_code)
+            else:
+                resultado = anotar_url(resultado, url, 'url')
+            span.definir(status=resultado.get('status'), origem=resultado['origem'])
+        return aplicar_retencao(resultado, retention or self.retention, self.raw_store)
+
+    async def _validate_download(self, url, nome):
+        """Baixa o documento em streaming (cliente HTTP próprio) e o valida por /arquivo."""
+        if self._cliente_download is None:
+            self._cliente_download = httpx.AsyncClient(timeout=self._timeout, follow_redirects=True)
+        arquivo = tempfile.SpooledTemporaryFile(max_size=LIMITE_SPOOL_MEMORIA)
+        try:
+            try:
+                async with self._cliente_download.stream('GET', url) as response:
+                    if response.status_code != 200:
+                        return {
+                            "status": "error",
+                            "error": f"Erro HTTP {response.status_code} ao baixar o documento",
+                        }
+                    async for bloco in response.aiter_bytes(TAMANHO_BLOCO_UPLOAD):
+                        # Acima de LIMITE_SPOOL_MEMORIA a escrita vai para o disco
+                        await asyncio.to_thread(arquivo.write, bloco)
+            except httpx.HTTPError as e:
+                return {
+                    "status": "error",
+                    "error": f"Erro ao baixar o documento: {str(e)}"
+                }
+            arquivo.seek(0)
+            # A retenção é aplicada uma única vez, em validate_url
+            return await self.validate_document(DocumentoUpload(arquivo, filename=nome), retention="always")
+        finally:
+            arquivo.close()
+
+    async def validate_many(self, paths, concurrency=10):
+        """
+        Valida vários PDFs com no máximo `concurrency` documentos em andamento.
+
+        Os resultados são entregues à medida que cada documento termina (não na
+        ordem de entrada). Arquivos inexistentes geram resultado 'error'.
+
+        Args:
+            paths: Iterável de caminhos (pode ser um gerador); itens ParDocumento
+                (ver formatos.parear_destacados) são validados com validate_document
+                e URLs http(s), com validate_url
+            concurrency: Número máximo de validações simultâneas
+        Yields:
+            Tuplas (caminho, resultado)
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency deve ser >= 1")
+
+        caminhos = iter(paths)
+        resultados = asyncio.Queue(maxsize=concurrency)
+        fim = object()
+
+        async def worker():
+            for path in caminhos:
+                try:
+                    if isinstance(path, ParDocumento):
+                        resultado = await self.validate_document(path.assinado, path.destacados)
+                    elif eh_url(path):
+                        resultado = await self.validate_url(path)
+                    else:
+                        resultado = await self.validate_pdf(path)
+                except Exception as e:
+                    resultado = {"status": "error", "error": str(e)}
+                await resultados.put((path, resultado))
+            await resultados.put(fim)
+
+        workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+        ativos = len(workers)
+        try:
+            while ativos:
+                item = await resultados.get()
+                if item is fim:
+                    ativos -= 1
+                    continue
+                yield item
+        finally:
+            for w in workers:
+                w.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+
+async def validate_pdf_async(pdf_path, client=None):
+    """
+    Valida assinaturas de PDF de forma assíncrona.
+    Args:
+        pdf_path: Caminho para o arquivo PDF
+        client: AsyncItiClient a reutilizar (se None, usa um cliente temporário)
+    Returns:
+        dict com resultado da validação
+    """
+    if client is not None:
+        return await client.validate_pdf(pdf_path)
+    async with AsyncItiClient() as client:
+        return await client.validate_pdf(pdf_path)
+
+
+async def validate_many(paths, concurrency=10, client=None):
+    """
+    Valida vários PDFs em paralelo, entregando cada resultado assim que fica pronto.
+
+    Exemplo:
+        async for caminho, resultado in validate_many(pdfs, concurrency=32):
+            print(caminho, resultado['status'])
+
+    Args:
+        paths: Iterável de caminhos
+        concurrency: Número máximo de validações simultâneas
+        client: AsyncItiClient a reutilizar (se None, cria um dimensionado para `concurrency`)
+    Yields:
+        Tuplas (caminho, resultado)
+    """
+    if client is not None:
+        async for item in client.validate_many(paths, concurrency=concurrency):
+            yield item
+        return
+    async with AsyncItiClient(max_connections=concurrency, max_keepalive_connections=concurrency) as client:
+        async for item in client.validate_many(paths, concurrency=concurrency):
+            yield item
@@ -0,0 +1,368 @@
+"""
+Validação em lote com pool de workers, saída JSONL e manifesto retomável.
+
+Cada documento concluído gera imediatamente uma linha no JSONL de saída e uma
+linha no manifesto. Se a execução for interrompida, rodar o mesmo comando de
+novo pula os arquivos já concluídos (os que terminaram com status 'error' são
+tentados novamente, a menos que retry_errors=False). Linhas da saída gravadas
+depois da última registrada no manifesto (interrupção entre as duas escritas)
+são descartadas na retomada, e o documento é processado de novo.
+
+Com detached=True, as assinaturas destacadas do lote (.p7s, .p7m, .jws) são
+pareadas com os documentos originais e enviadas junto com eles (ver
+formatos.parear_destacados). Com urls=True, as entradas são URLs validadas
+via /url (ver ItiClient.validate_url), sem baixar os documentos.
+"""
+
+import asyncio
+import glob
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from .client import ItiClient, base_url_padrao, eh_url
+from .formatos import EXTENSOES_ASSINADO, EXTENSOES_DESTACADO, ParDocumento, parear_destacados
+from .json_backend import dumps, loads
+from .pipeline import Pipeline
+
+
+MODOS_BATCH = ("thread", "async", "pipeline")
+
+# Arquivos passados diretamente como entrada (outras extensões = lista de arquivos)
+EXTENSOES_DOCUMENTO = tuple(sorted(set(EXTENSOES_ASSINADO) | set(EXTENSOES_DESTACADO)))
+
+
+def abrir_jsonl(path):
+    """
+    Abre um arquivo JSONL para acrescentar linhas.
+
+    Se a última linha ficou incompleta (execução interrompida no meio de uma
+    escrita), inicia uma nova linha antes de continuar.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    arquivo = path.open('a', encoding='utf-8')
+    if arquivo.tell():
+        with path.open('rb') as f:
+            f.seek(-1, 2)
+            if f.read(1) != b'\n':
+                arquivo.write('\n')
+    return arquivo
+
+
+def listar_documentos(entradas, pattern="*.pdf"):
+    """
+    Expande as entradas do lote em caminhos de PDF, sem repetições.
+
+    Cada entrada pode ser:
+    - um diretório (busca recursiva por `pattern`)
+    - um padrão glob (ex.: "entrada/**/*.pdf")
+    - um documento (.pdf, .xml, .p7s, .p7m, .jws ou .json)
+    - uma lista de arquivos (texto, um caminho por linha; "-" lê da entrada padrão)
+
+    Args:
+        entradas: Lista de entradas
+        pattern: Padrão usado na busca em diretórios
+    Yields:
+        Path de cada documento, na ordem encontrada
+    """
+    vistos = set()
+
+    def novos(caminhos):
+        for caminho in caminhos:
+            caminho = Path(caminho)
+            chave = str(caminho)
+            if chave not in vistos:
+                vistos.add(chave)
+                yield caminho
+
+    for entrada in entradas:
+        if entrada == '-':
+            yield from novos(linha.strip() for linha in sys.stdin if linha.strip())
+            continue
+        caminho = Path(entrada)
+        if caminho.is_dir():
+            yield from novos(sorted(p for p in caminho.rglob(pattern) if p.is_file()))
+        elif glob.has_magic(entrada):
+            yield from novos(sorted(glob.glob(entrada, recursive=True)))
+        elif caminho.suffix.lower() in EXTENSOES_DOCUMENTO:
+            yield from novos([caminho])
+        else:
+            with caminho.open(encoding='utf-8') as f:
+                yield from novos([linha.strip() for linha in f if linha.strip()])
+
+
+def listar_urls(entradas):
+    """
+    Expande as entradas do lote em URLs, sem repetições.
+
+    Cada entrada pode ser uma URL http(s) ou uma lista de URLs (texto, uma
+    por linha; "-" lê da entrada padrão).
+
+    Args:
+        entradas: Lista de entradas
+    Yields:
+        str com cada URL, na ordem encontrada
+    Raises:
+        ValueError: Se uma linha de uma lista não for uma URL http(s)
+    """
+    vistas = set()
+
+    def novas(linhas, origem):
+        for linha in linhas:
+            url = linha.strip()
+            if not url or url in vistas:
+                continue
+            if not eh_url(url):
+                raise ValueError(f"URL inválida em {origem}: {url}")
+            vistas.add(url)
+            yield url
+
+    for entrada in entradas:
+        if eh_url(entrada):
+            yield from novas([entrada], "argumentos")
+        elif entrada == '-':
+            yield from novas(sys.stdin, "entrada padrão")
+        else:
+            with open(entrada, encoding='utf-8') as f:
+                yield from novas(f, entrada)
+
+
+class Manifesto:
+    """
+    Registro append-only dos documentos já processados (uma linha JSON por
+    documento), usado para retomar lotes interrompidos.
+
+    Cada linha pode trazer o tamanho do JSONL de saída logo depois da linha do
+    documento ('saida'); fim_saida é o último desses tamanhos (ver
+    truncar_saida).
+
+    Args:
+        path: Caminho do arquivo de manifesto
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.status = {}
+        self.fim_saida = None
+        if self.path.exists():
+            with self.path.open('rb') as f:
+                for linha in f:
+                    try:
+                        item = loads(linha)
+                    except ValueError:
+                        # Última linha truncada por uma interrupção
+                        continue
+                    self.status[item['path']] = item['status']
+                    if item.get('saida') is not None:
+                        self.fim_saida = item['saida']
+        self._arquivo = abrir_jsonl(self.path)
+
+    def concluido(self, path, retry_errors=True):
+        """Indica se o documento já foi processado em uma execução anterior."""
+        status = self.status.get(str(path))
+        if status is None:
+            return False
+        return not (retry_errors and status == 'error')
+
+    def registrar(self, path, status, saida=None):
+        """
+        Marca o documento como processado.
+        Args:
+            path: Documento
+            status: Status do resultado
+            saida: Tamanho (bytes) do JSONL de saída depois da linha do documento
+        """
+        self.status[str(path)] = status
+        item = {"path": str(path), "status": status}
+        if saida is not None:
+            item["saida"] = saida
+        self._arquivo.write(dumps(item).decode('utf-8') + '\n')
+        self._arquivo.flush()
+
+    def truncar_saida(self, output):
+        """
+        Descarta as linhas do JSONL de saída gravadas depois da última
+        registrada no manifesto (o documento volta a ser processado).
+        Returns:
+            int com o número de bytes descartados
+        """
+        if self.fim_saida is None:
+            return 0
+        try:
+            tamanho = os.path.getsize(output)
+        except OSError:
+            return 0
+        if tamanho <= self.fim_saida:
+            return 0
+        os.truncate(output, self.fim_saida)
+        return tamanho - self.fim_saida
+
+    def close(self):
+        self._arquivo.close()
+
+
+def _validar(client, path):
+    try:
+        if isinstance(path, ParDocumento):
+            return client.validate_document(path.assinado, path.destacados)
+        if eh_url(path):
+            return client.validate_url(path)
+        return client.validate_pdf(path)
+    except Exception as e:
+        return {"status": "error", "error": str(e)}
+
+
+def _executar_threads(client, caminhos, workers):
+    """Valida com um pool de threads, entregando resultados à medida que ficam prontos."""
+    caminhos = iter(caminhos)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pendentes = {}
+        try:
+            while True:
+                # Mantém no máximo 2x workers tarefas enfileiradas
+                for path in caminhos:
+                    pendentes[executor.submit(_validar, client, path)] = path
+                    if len(pendentes) >= workers * 2:
+                        break
+                if not pendentes:
+                    return
+                prontos, _ = wait(pendentes, return_when=FIRST_COMPLETED)
+                for futuro in prontos:
+                    yield pendentes.pop(futuro), futuro.result()
+        finally:
+            for futuro in pendentes:
+                futuro.cancel()
+
+
+async def _executar_async(caminhos, workers, modelo, processar):
+    """
+    Valida com a API assíncrona, processando cada resultado assim que fica pronto.
+    O AsyncItiClient herda base_url, cache, hooks, retenção e preflight do cliente `modelo`.
+    """
+    from .async_client import AsyncItiClient
+
+    async with AsyncItiClient(base_url=modelo.base_url, max_connections=workers,
+                              max_keepalive_connections=workers, cache=modelo.cache, hooks=modelo.hooks,
+                              retention=modelo.retention, raw_store=modelo.raw_store,
+                              preflight=modelo.preflight) as client:
+        async for path, resultado in client.validate_many(caminhos, concurrency=workers):
+            processar(path, resultado)
+
+
+def run_batch(entradas, output=None, manifest=None, workers=8, mode="thread", client=None,
+              retry_errors=True, pattern=None, progress=None, process_workers=None, detached=False,
+              urls=False):
+    """
+    Valida um lote de documentos, escrevendo uma linha JSONL por documento.
+
+    Args:
+        entradas: Diretórios, globs, PDFs ou listas de arquivos (ver listar_documentos)
+        output: Caminho do JSONL de saída (acrescenta ao existente) ou objeto
+            com write(); None = saída padrão
+        manifest: Caminho do manifesto para retomar execuções (padrão:
+            "<output>.manifest" quando output é um caminho)
+        workers: Número de validações simultâneas
+        mode: "thread" (pool de threads), "async" (asyncio + httpx) ou "pipeline"
+            (hash e verificação local em processos, chamadas em threads; ver Pipeline)
+        client: ItiClient a usar (base_url, cache, hooks e retenção também valem no modo async)
+        retry_errors: Se True, documentos que terminaram em 'error' são refeitos
+        pattern: Padrão de busca em diretórios (padrão: "*.pdf", ou "*" com detached)
+        progress: Função chamada com (path, resultado, contadores) a cada documento
+        process_workers: Processos de preparação no modo "pipeline" (None = os.cpu_count())
+        detached: Se True, pareia as assinaturas destacadas com os originais e
+            valida cada documento com validate_document (formato detectado pelo conteúdo)
+        urls: Se True, as entradas são URLs ou listas de URLs (ver listar_urls),
+            validadas com validate_url (modos "thread" e "async")
+
+    Returns:
+        dict com contadores por status, 'skipped', 'total' e 'elapsed' (segundos)
+    """
+    if mode not in MODOS_BATCH:
+        raise ValueError(f"Modo inválido: {mode}. Use {MODOS_BATCH}")
+    if workers < 1:
+        raise ValueError("workers deve ser >= 1")
+    if urls and mode == "pipeline":
+        raise ValueError("O modo 'pipeline' prepara arquivos locais; com URLs use 'thread' ou 'async'")
+
+    # Só o manifesto padrão da saída registra (e corrige) o tamanho dela
+    manifesto_da_saida = manifest is None and isinstance(output, (str, Path))
+    if manifesto_da_saida:
+        manifest = f"{output}.manifest"
+    manifesto = Manifesto(manifest) if manifest else None
+
+    if pattern is None:
+        pattern = "*" if detached else "*.pdf"
+
+    contadores = {"skipped": 0, "total": 0}
+
+    def documentos():
+        if urls:
+            return listar_urls(entradas)
+        caminhos = listar_documentos(entradas, pattern=pattern)
+        if not detached:
+            return caminhos
+        # O pareamento precisa do lote inteiro; fora dele ficam arquivos de outros tipos
+        return parear_destacados(c for c in caminhos if c.suffix.lower() in EXTENSOES_DOCUMENTO)
+
+    def pendentes():
+        for path in documentos():
+            if manifesto is not None and manifesto.concluido(path, retry_errors=retry_errors):
+                contadores["skipped"] += 1
+                continue
+            yield path
+
+    if output is None:
+        saida, fechar = sys.stdout, False
+    elif isinstance(output, (str, Path)):
+        if manifesto_da_saida:
+            manifesto.truncar_saida(output)
+        saida, fechar = abrir_jsonl(output), True
+    else:
+        saida, fechar = output, False
+
+    def processar(path, resultado):
+        status = resultado.get('status', 'unknown')
+        # Resultados podem trazer relatórios completos: usa o backend rápido
+        linha = {"path": str(path)}
+        if isinstance(path, ParDocumento) and path.destacados:
+            linha["destacados"] = [str(d) for d in path.destacados]
+        saida.write(dumps({**linha, **resultado}).decode('utf-8') + '\n')
+        saida.flush()
+        if manifesto is not None:
+            # Saída primeiro: uma interrupção entre as escritas deixa uma linha
+            # sem registro, descartada por truncar_saida na retomada
+            manifesto.registrar(path, status, saida.tell() if manifesto_da_saida else None)
+        contadores[status] = contadores.get(status, 0) + 1
+        contadores["total"] += 1
+        if progress is not None:
+            progress(path, resultado, contadores)
+
+    # Cliente criado aqui é fechado ao fim do lote (sessão e caches)
+    fechar_cliente = client is None
+    if fechar_cliente:
+        client = ItiClient(base_url=base_url_padrao(), pool_maxsize=workers)
+
+    inicio = time.perf_counter()
+    try:
+        if mode == "thread":
+            for path, resultado in _executar_threads(client, pendentes(), workers):
+                processar(path, resultado)
+        elif mode == "pipeline":
+            with Pipeline(client, process_workers=process_workers, io_workers=workers) as pipeline:
+                for path, resultado in pipeline.run(pendentes()):
+                    processar(path, resultado)
+        else:
+            asyncio.run(_executar_async(pendentes(), workers, client, processar))
+    finally:
+        if manifesto is not None:
+            manifesto.close()
+        if fechar:
+            saida.close()
+        if fechar_cliente:
+            client.close()
+
+    contadores["elapsed"] = time.perf_counter() - inicio
+    return contadores
@@ -0,0 +1,784 @@
+"""
+Cache persistente de resultados indexado pelo conteúdo do documento.
+
+A chave é o SHA-256 dos bytes do arquivo somado ao endpoint ('simples' ou
+'conformidade'), de modo que reenvios do mesmo PDF (com qualquer nome) são
+respondidos localmente sem novo upload para o ITI.
+
+Backends disponíveis, com a mesma interface:
+- SQLiteCache: um único arquivo .db (recomendado para muitos itens)
+- DirectoryCache: um arquivo JSON por item em um diretório
+- MemoryCache: LRU em memória, limitado por bytes
+- TieredCache: MemoryCache na frente de um backend em disco
+
+Todos suportam TTL e despejo LRU por número de itens e por bytes.
+
+Os PDFs gerados por /downloadPdf ficam em RelatorioPdfCache, indexados pelo
+SHA-256 do relatório de conformidade e pelo idioma, com os bytes guardados
+por conteúdo (um PDF idêntico é gravado uma única vez).
+"""
+
+import hashlib
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+
+from .json_backend import dumps, loads
+
+
+TAMANHO_BLOCO_HASH = 1024 * 1024
+
+# Orçamento padrão da camada em memória de TieredCache e RelatorioPdfCache
+MEMORIA_PADRAO = 64 * 1024 * 1024
+
+# Apenas resultados determinísticos são guardados; erros de rede/HTTP não
+STATUS_CACHEAVEIS = {
+    'simples': ('valid', 'invalid'),
+    'conformidade': ('success', 'invalid'),
+}
+
+
+def hash_arquivo(path):
+    """
+    Calcula o SHA-256 do conteúdo de um arquivo, lendo em blocos.
+    Args:
+        path: Caminho do arquivo
+    Returns:
+        str com o hash em hexadecimal
+    """
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for bloco in iter(lambda: f.read(TAMANHO_BLOCO_HASH), b''):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def resultado_cacheavel(endpoint, resultado):
+    """Indica se um resultado do endpoint pode ser guardado no cache."""
+    return resultado.get('status') in STATUS_CACHEAVEIS.get(endpoint, ())
+
+
+class ResultCache(ABC):
+    """
+    Interface comum dos backends de cache.
+
+    Args:
+        ttl: Validade (segundos) de cada item. None = sem expiração
+        max_entries: Número máximo de itens. None = ilimitado
+        max_bytes: Tamanho máximo somado dos itens. None = ilimitado
+    """
+
+    def __init__(self, ttl=None, max_entries=None, max_bytes=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def chave(digest, endpoint):
+        """Monta a chave de um item a partir do hash do documento e do endpoint."""
+        return f"{endpoint}:{digest}"
+
+    def _expirado(self, criado_em, agora):
+        return self.ttl is not None and agora - criado_em > self.ttl
+
+    @abstractmethod
+    def get(self, digest, endpoint):
+        """
+        Busca um resultado.
+        Args:
+            digest: SHA-256 do documento (ver hash_arquivo)
+            endpoint: 'simples' ou 'conformidade'
+        Returns:
+            dict do resultado, ou None se ausente/expirado
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def set(self, digest, endpoint, resultado):
+        """Guarda um resultado e aplica o despejo LRU, se necessário."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def clear(self):
+        """Remove todos os itens."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def stats(self):
+        """Retorna dict com hits, misses, itens, bytes ocupados e despejos (itens removidos pelo LRU)."""
+        raise NotImplementedError
+
+    def close(self):
+        """Libera recursos do backend."""
+
+
+class SQLiteCache(ResultCache):
+    """
+    Cache em um banco SQLite.
+
+    Args:
+        path: Caminho do arquivo .db (criado se não existir)
+        ttl, max_entries, max_bytes: Ver ResultCache
+    """
+
+    def __init__(self, path, ttl=None, max_entries=None, max_bytes=None):
+        super().__init__(ttl=ttl, max_entries=max_entries, max_bytes=max_bytes)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS resultados ("
+            " chave TEXT PRIMARY KEY,"
+            " valor BLOB NOT NULL,"
+            " tamanho INTEGER NOT NULL,"
+            " criado_em REAL NOT NULL,"
+            " acessado_em REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_acessado_em ON resultados (acessado_em)")
+
+    def __repr__(self):
+        return f"SQLiteCache({str(self.path)!r})"
+
+    def get(self, digest, endpoint):
+        chave = self.chave(digest, endpoint)
+        agora = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT valor, criado_em FROM resultados WHERE chave = ?", (chave,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            if self._expirado(row[1], agora):
+                self._conn.execute("DELETE FROM resultados WHERE chave = ?", (chave,))
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE resultados SET acessado_em = ? WHERE chave = ?", (agora, chave))
+            self.hits += 1
+        return loads(row[0])
+
+    def set(self, digest, endpoint, resultado):
+        valor = dumps(resultado)
+        agora = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO resultados (chave, valor, tamanho, criado_em, acessado_em)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (self.chave(digest, endpoint), valor, len(valor), agora, agora)
+            )
+            self._despejar()
+
+    def _despejar(self):
+        if self.max_entries is not None:
+            cursor = self._conn.execute(
+                "DELETE FROM resultados WHERE chave IN ("
+                " SELECT chave FROM resultados ORDER BY acessado_em DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            self.evictions += max(cursor.rowcount, 0)
+        if self.max_bytes is not None:
+            total = self._conn.execute("SELECT COALESCE(SUM(tamanho), 0) FROM resultados").fetchone()[0]
+            if total > self.max_bytes:
+                excesso = total - self.max_bytes
+                removidos = []
+                for chave, tamanho in self._conn.execute(
+                    "SELECT chave, tamanho FROM resultados ORDER BY acessado_em"
+                ):
+                    if excesso <= 0:
+                        break
+                    removidos.append((chave,))
+                    excesso -= tamanho
+                self._conn.executemany("DELETE FROM resultados WHERE chave = ?", removidos)
+                self.evictions += len(removidos)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM resultados")
+
+    def stats(self):
+        with self._lock:
+            itens, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(tamanho), 0) FROM resultados"
+            ).fetchone()
+        return {"hits": self.hits, "misses": self.misses, "itens": itens, "bytes": total,
+                "despejos": self.evictions}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class DirectoryCache(ResultCache):
+    """
+    Cache em diretório: um arquivo JSON por item, distribuídos em
+    subdiretórios pelos dois primeiros caracteres do hash.
+
+    O horário de modificação de cada arquivo registra a gravação (TTL) e o
+    horário de acesso registra a última leitura (LRU).
+
+    Args:
+        directory: Diretório do cache (criado se não existir)
+        ttl, max_entries, max_bytes: Ver ResultCache
+    """
+
+    def __init__(self, directory, ttl=None, max_entries=None, max_bytes=None):
+        super().__init__(ttl=ttl, max_entries=max_entries, max_bytes=max_bytes)
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # chave -> [tamanho, criado_em, acessado_em]
+        self._indice = {}
+        self._bytes = 0
+        for arquivo in self.directory.glob('*/*.json'):
+            try:
+                chave = self._chave_do_arquivo(arquivo)
+            except ValueError:
+                # Arquivo alheio ao cache (nome fora de <digest>.<endpoint>.json)
+                continue
+            if self._arquivo(chave) != arquivo:
+                continue
+            try:
+                st = arquivo.stat()
+            except FileNotFoundError:
+                continue
+            self._indice[chave] = [st.st_size, st.st_mtime, st.st_atime]
+            self._bytes += st.st_size
+
+    def __repr__(self):
+        return f"DirectoryCache({str(self.directory)!r})"
+
+    def _arquivo(self, chave):
+        endpoint, digest = chave.split(':', 1)
+        return self.directory / digest[:2] / f"{digest}.{endpoint}.json"
+
+    @staticmethod
+    def _chave_do_arquivo(arquivo):
+        digest, endpoint, _ = arquivo.name.split('.', 2)
+        return f"{endpoint}:{digest}"
+
+    def _remover(self, chave):
+        meta = self._indice.pop(chave, None)
+        if meta is not None:
+            self._bytes -= meta[0]
+        try:
+            self._arquivo(chave).unlink()
+        except FileNotFoundError:
+            pass
+
+    def get(self, digest, endpoint):
+        chave = self.chave(digest, endpoint)
+        agora = time.time()
+        with self._lock:
+            meta = self._indice.get(chave)
+            if meta is None or self._expirado(meta[1], agora):
+                if meta is not None:
+                    self._remover(chave)
+                self.misses += 1
+                return None
+            arquivo = self._arquivo(chave)
+            try:
+                dados = arquivo.read_bytes()
+                # Só o atime muda: o mtime continua sendo o horário da gravação
+                os.utime(arquivo, (agora, meta[1]))
+            except FileNotFoundError:
+                # Removido por outro processo
+                self._remover(chave)
+                self.misses += 1
+                return None
+            meta[2] = agora
+            self.hits += 1
+        return loads(dados)
+
+    def set(self, digest, endpoint, resultado):
+        chave = self.chave(digest, endpoint)
+        valor = dumps(resultado)
+        arquivo = self._arquivo(chave)
+        arquivo.parent.mkdir(exist_ok=True)
+        # Escrita atômica: grava em temporário e renomeia
+        fd, tmp = tempfile.mkstemp(dir=arquivo.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(valor)
+            os.replace(tmp, arquivo)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        criado_em = os.stat(arquivo).st_mtime
+        with self._lock:
+            anterior = self._indice.get(chave)
+            if anterior is not None:
+                self._bytes -= anterior[0]
+            self._indice[chave] = [len(valor), criado_em, criado_em]
+            self._bytes += len(valor)
+            self._despejar()
+
+    def _despejar(self):
+        excesso_itens = 0
+        if self.max_entries is not None:
+            excesso_itens = len(self._indice) - self.max_entries
+        excesso_bytes = 0
+        if self.max_bytes is not None:
+            excesso_bytes = self._bytes - self.max_bytes
+        if excesso_itens <= 0 and excesso_bytes <= 0:
+            return
+        for chave, meta in sorted(self._indice.items(), key=lambda item: item[1][2]):
+            if excesso_itens <= 0 and excesso_bytes <= 0:
+                break
+            excesso_itens -= 1
+            excesso_bytes -= meta[0]
+            self._remover(chave)
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            for chave in list(self._indice):
+                self._remover(chave)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "itens": len(self._indice),
+                "bytes": self._bytes,
+                "despejos": self.evictions,
+            }
+
+
+class _MemoriaLRU:
+    """
+    LRU de bytes em memória, limitado por bytes e por número de itens.
+
+    Args:
+        max_bytes: Tamanho máximo somado dos valores. None = ilimitado
+        max_entries: Número máximo de itens. None = ilimitado
+    """
+
+    def __init__(self, max_bytes=MEMORIA_PADRAO, max_entries=None):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.bytes = 0
+        self.evictions = 0
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._itens)
+
+    def get(self, chave):
+        """Retorna (valor, criado_em) e marca o item como usado, ou None."""
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is not None:
+                self._itens.move_to_end(chave)
+            return item
+
+    def set(self, chave, valor, criado_em=None):
+        """Guarda o valor (bytes); valores maiores que max_bytes não são guardados."""
+        if self.max_bytes is not None and len(valor) > self.max_bytes:
+            return
+        with self._lock:
+            self._descartar(chave)
+            self._itens[chave] = (valor, time.time() if criado_em is None else criado_em)
+            self.bytes += len(valor)
+            while self._itens and (
+                (self.max_bytes is not None and self.bytes > self.max_bytes)
+                or (self.max_entries is not None and len(self._itens) > self.max_entries)
+            ):
+                _, (antigo, _) = self._itens.popitem(last=False)
+                self.bytes -= len(antigo)
+                self.evictions += 1
+
+    def remover(self, chave):
+        """Remove um item (sem contar como despejo)."""
+        with self._lock:
+            self._descartar(chave)
+
+    def _descartar(self, chave):
+        item = self._itens.pop(chave, None)
+        if item is not None:
+            self.bytes -= len(item[0])
+
+    def clear(self):
+        with self._lock:
+            self._itens.clear()
+            self.bytes = 0
+
+
+class MemoryCache(ResultCache):
+    """
+    Cache em memória (LRU), guardando cada resultado serializado.
+
+    Os resultados são guardados em bytes (o orçamento em max_bytes é exato e
+    quem recebe o dict pode alterá-lo sem afetar o cache).
+
+    Args:
+        ttl, max_entries: Ver ResultCache
+        max_bytes: Tamanho máximo somado dos itens (padrão: 64 MB)
+    """
+
+    def __init__(self, ttl=None, max_entries=None, max_bytes=MEMORIA_PADRAO):
+        super().__init__(ttl=ttl, max_entries=max_entries, max_bytes=max_bytes)
+        self._memoria = _MemoriaLRU(max_bytes=max_bytes, max_entries=max_entries)
+
+    def __repr__(self):
+        return f"MemoryCache(max_bytes={self.max_bytes})"
+
+    def get_bytes(self, digest, endpoint):
+        """Como get(), mas devolve o resultado serializado (bytes) e o horário de criação."""
+        chave = self.chave(digest, endpoint)
+        item = self._memoria.get(chave)
+        with self._lock:
+            if item is None or self._expirado(item[1], time.time()):
+                if item is not None:
+                    self._memoria.remover(chave)
+                self.misses += 1
+                return None
+            self.hits += 1
+        return item
+
+    def get(self, digest, endpoint):
+        item = self.get_bytes(digest, endpoint)
+        return None if item is None else loads(item[0])
+
+    def set(self, digest, endpoint, resultado, criado_em=None):
+        valor = resultado if isinstance(resultado, bytes) else dumps(resultado)
+        self._memoria.set(self.chave(digest, endpoint), valor, criado_em)
+
+    def clear(self):
+        self._memoria.clear()
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "itens": len(self._memoria),
+            "bytes": self._memoria.bytes,
+            "despejos": self._memoria.evictions,
+        }
+
+
+class TieredCache(ResultCache):
+    """
+    Cache em duas camadas: LRU em memória na frente de um backend em disco.
+
+    Leituras consultam a memória e, em caso de falta, o disco; itens lidos do
+    disco sobem para a memória. Escritas vão para as duas camadas. TTL e
+    limites do disco são os do backend.
+
+    Exemplo:
+        cache = TieredCache(SQLiteCache("cache.db", max_bytes=2 * 1024**3), memory_bytes=128 * 1024**2)
+
+    Args:
+        disco: Backend persistente (SQLiteCache ou DirectoryCache)
+        memory_bytes: Orçamento da camada em memória (padrão: 64 MB)
+        memory_entries: Número máximo de itens em memória. None = ilimitado
+    """
+
+    def __init__(self, disco, memory_bytes=MEMORIA_PADRAO, memory_entries=None):
+        super().__init__(ttl=disco.ttl, max_entries=disco.max_entries, max_bytes=disco.max_bytes)
+        self.disco = disco
+        self.memoria = MemoryCache(ttl=disco.ttl, max_entries=memory_entries, max_bytes=memory_bytes)
+
+    def __repr__(self):
+        return f"TieredCache({self.disco!r}, memory_bytes={self.memoria.max_bytes})"
+
+    def get(self, digest, endpoint):
+        item = self.memoria.get_bytes(digest, endpoint)
+        if item is not None:
+            with self._lock:
+                self.hits += 1
+            return loads(item[0])
+        resultado = self.disco.get(digest, endpoint)
+        with self._lock:
+            if resultado is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        # Na memória o TTL recomeça na promoção (o item pode durar até 2x ttl)
+        self.memoria.set(digest, endpoint, resultado)
+        return resultado
+
+    def set(self, digest, endpoint, resultado):
+        valor = dumps(resultado)
+        self.memoria.set(digest, endpoint, valor)
+        self.disco.set(digest, endpoint, resultado)
+
+    def clear(self):
+        self.memoria.clear()
+        self.disco.clear()
+
+    def stats(self):
+        disco = self.disco.stats()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "itens": disco["itens"],
+            "bytes": disco["bytes"],
+            "despejos": disco.get("despejos", 0),
+            "memoria": self.memoria.stats(),
+            "disco": disco,
+        }
+
+    def close(self):
+        self.memoria.close()
+        self.disco.close()
+
+
+def digest_relatorio(relatorio_serializado):
+    """SHA-256 do relatório de conformidade serializado (str ou bytes), chave dos PDFs."""
+    if isinstance(relatorio_serializado, str):
+        relatorio_serializado = relatorio_serializado.encode('utf-8')
+    return hashlib.sha256(relatorio_serializado).hexdigest()
+
+
+class RelatorioPdfCache:
+    """
+    Cache dos PDFs de relatório (/downloadPdf) em memória e em disco.
+
+    Cada PDF é indexado por (SHA-256 do relatório de conformidade, idioma).
+    No disco, os bytes ficam em objetos/<2 primeiros caracteres>/<sha256 do
+    PDF>.pdf (endereçados pelo conteúdo) e cada chave é um arquivo em refs/
+    que aponta para o objeto. O despejo LRU por bytes remove objetos (e as
+    chaves que apontam para eles); o horário de modificação do objeto
+    registra o último acesso.
+
+    Args:
+        directory: Diretório do cache (criado se não existir)
+        max_bytes: Tamanho máximo somado dos PDFs no disco. None = ilimitado
+        memory_bytes: Orçamento da camada em memória (padrão: 64 MB; 0 = sem camada em memória)
+    """
+
+    def __init__(self, directory, max_bytes=None, memory_bytes=MEMORIA_PADRAO):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._objetos_dir = self.directory / "objetos"
+        self._refs_dir = self.directory / "refs"
+        self._objetos_dir.mkdir(parents=True, exist_ok=True)
+        self._refs_dir.mkdir(parents=True, exist_ok=True)
+        self.memoria = _MemoriaLRU(max_bytes=memory_bytes) if memory_bytes else None
+        self.hits = 0
+        self.memory_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        # sha256 do PDF -> [tamanho, acessado_em]; chave -> sha256; sha256 -> chaves
+        self._objetos = {}
+        self._refs = {}
+        self._chaves_do_objeto = {}
+        self._bytes = 0
+        # Temporários de gravações interrompidas
+        for arquivo in self.directory.glob('*/*/*.tmp'):
+            arquivo.unlink(missing_ok=True)
+        for arquivo in self._objetos_dir.glob('*/*.pdf'):
+            st = arquivo.stat()
+            self._objetos[arquivo.stem] = [st.st_size, st.st_mtime]
+            self._bytes += st.st_size
+        for arquivo in self._refs_dir.glob('*/*.ref'):
+            sha = arquivo.read_text(encoding='ascii').strip()
+            if sha in self._objetos:
+                self._associar(arquivo.stem, sha)
+            else:
+                arquivo.unlink(missing_ok=True)
+
+    def __repr__(self):
+        return f"RelatorioPdfCache({str(self.directory)!r})"
+
+    @staticmethod
+    def chave(digest, language):
+        return f"{digest}.{language}"
+
+    def _objeto(self, sha):
+        return self._objetos_dir / sha[:2] / f"{sha}.pdf"
+
+    def _ref(self, chave):
+        return self._refs_dir / chave[:2] / f"{chave}.ref"
+
+    def _associar(self, chave, sha):
+        self._refs[chave] = sha
+        self._chaves_do_objeto.setdefault(sha, set()).add(chave)
+
+    def _remover_objeto(self, sha):
+        meta = self._objetos.pop(sha, None)
+        if meta is not None:
+            self._bytes -= meta[0]
+        self._objeto(sha).unlink(missing_ok=True)
+        for chave in self._chaves_do_objeto.pop(sha, ()):
+            self._refs.pop(chave, None)
+            self._ref(chave).unlink(missing_ok=True)
+            if self.memoria is not None:
+                self.memoria.remover(chave)
+
+    def get(self, digest, language):
+        """
+        Busca um PDF.
+        Args:
+            digest: SHA-256 do relatório de conformidade (ver digest_relatorio)
+            language: Idioma do relatório
+        Returns:
+            bytes do PDF, ou None se ausente
+        """
+        chave = self.chave(digest, language)
+        if self.memoria is not None:
+            item = self.memoria.get(chave)
+            if item is not None:
+                with self._lock:
+                    self.hits += 1
+                    self.memory_hits += 1
+                    meta = self._objetos.get(self._refs.get(chave))
+                    if meta is not None:
+                        meta[1] = time.time()
+                return item[0]
+
+        agora = time.time()
+        with self._lock:
+            sha = self._refs.get(chave)
+            if sha is None:
+                self.misses += 1
+                return None
+            arquivo = self._objeto(sha)
+            try:
+                dados = arquivo.read_bytes()
+                os.utime(arquivo, (agora, agora))
+            except FileNotFoundError:
+                # Removido por outro processo
+                self._remover_objeto(sha)
+                self.misses += 1
+                return None
+            self._objetos[sha][1] = agora
+            self.hits += 1
+        if self.memoria is not None:
+            self.memoria.set(chave, dados)
+        return dados
+
+    def set(self, digest, language, pdf_bytes):
+        """
+        Guarda um PDF e aplica o despejo LRU, se necessário.
+        Returns:
+            str com o SHA-256 do PDF
+        """
+        sha = hashlib.sha256(pdf_bytes).hexdigest()
+        self._registrar(digest, language, sha, len(pdf_bytes), lambda f: f.write(pdf_bytes))
+        if self.memoria is not None and sha in self._objetos:
+            self.memoria.set(self.chave(digest, language), pdf_bytes)
+        return sha
+
+    def set_arquivo(self, digest, language, path):
+        """
+        Como set(), copiando o PDF de um arquivo em blocos (sem lê-lo
+        inteiro na memória; usado nos downloads em modo stream).
+        """
+        sha = hash_arquivo(path)
+
+        def copiar(f):
+            with open(path, 'rb') as entrada:
+                shutil.copyfileobj(entrada, f, TAMANHO_BLOCO_HASH)
+
+        self._registrar(digest, language, sha, os.path.getsize(path), copiar)
+        return sha
+
+    def _registrar(self, digest, language, sha, tamanho, escrever):
+        """
+        Grava o objeto e a chave em temporários fora da trava; com a trava,
+        apenas renomeia e atualiza o índice.
+        """
+        chave = self.chave(digest, language)
+        objeto = self._objeto(sha)
+        ref = self._ref(chave)
+        # Lidos sem a trava: no pior caso um temporário é gravado e descartado
+        tmp_objeto = _temporario(objeto, escrever) if sha not in self._objetos else None
+        tmp_ref = _temporario(ref, lambda f: f.write(sha.encode('ascii'))) if self._refs.get(chave) != sha else None
+        agora = time.time()
+        with self._lock:
+            if sha not in self._objetos:
+                if tmp_objeto is None:
+                    # Removido por um despejo depois da verificação
+                    tmp_objeto = _temporario(objeto, escrever)
+                os.replace(tmp_objeto, objeto)
+                tmp_objeto = None
+                self._objetos[sha] = [tamanho, agora]
+                self._bytes += tamanho
+            else:
+                self._objetos[sha][1] = agora
+            anterior = self._refs.get(chave)
+            if anterior != sha:
+                if anterior is not None:
+                    self._chaves_do_objeto.get(anterior, set()).discard(chave)
+                if tmp_ref is None:
+                    tmp_ref = _temporario(ref, lambda f: f.write(sha.encode('ascii')))
+                os.replace(tmp_ref, ref)
+                tmp_ref = None
+                self._associar(chave, sha)
+            self._despejar()
+        for tmp in (tmp_objeto, tmp_ref):
+            if tmp is not None:
+                os.unlink(tmp)
+
+    def _despejar(self):
+        if self.max_bytes is None or self._bytes <= self.max_bytes:
+            return
+        for sha, _ in sorted(self._objetos.items(), key=lambda item: item[1][1]):
+            if self._bytes <= self.max_bytes:
+                break
+            self._remover_objeto(sha)
+            self.evictions += 1
+
+    def clear(self):
+        """Remove todos os PDFs."""
+        with self._lock:
+            for sha in list(self._objetos):
+                self._remover_objeto(sha)
+        if self.memoria is not None:
+            self.memoria.clear()
+
+    def stats(self):
+        """Retorna dict com hits (e os atendidos pela memória), misses, itens, objetos, bytes e despejos."""
+        with self._lock:
+            dados = {
+                "hits": self.hits,
+                "hits_memoria": self.memory_hits,
+                "misses": self.misses,
+                "itens": len(self._refs),
+                "objetos": len(self._objetos),
+                "bytes": self._bytes,
+                "despejos": self.evictions,
+            }
+        if self.memoria is not None:
+            dados["memoria"] = {"itens": len(self.memoria), "bytes": self.memoria.bytes,
+                                "despejos": self.memoria.evictions}
+        return dados
+
+    def close(self):
+        """Libera recursos do cache."""
+
+
+def _temporario(destino, escrever):
+    """
+    Grava um temporário no diretório de destino (para um os.replace posterior).
+    Args:
+        destino: Caminho final
+        escrever: Função que recebe o arquivo aberto em modo binário
+    Returns:
+        str com o caminho do temporário
+    """
+    destino.parent.mkdir(exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=destino.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            escrever(f)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return tmp
@@ -0,0 +1,1464 @@
+"""
+Cliente HTTP para a API do ITI com conexões keep-alive reutilizáveis.
+
+Todas as chamadas (/arquivo, /simples, /conformidade, /downloadPdf) passam por
+um único requests.Session, de modo que validações sucessivas reaproveitam as
+conexões TLS já abertas em vez de refazer o handshake a cada requisição.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import unquote, urlsplit
+from requests.adapters import HTTPAdapter
+
+from .cache import digest_relatorio, resultado_cacheavel
+from .formatos import PDF, abrir_formatado
+from .json_backend import como_bytes, dumps, json_ou_texto, loads
+from .metrics import contar, medir, normalizar_hooks, registrar_span, tamanho_requisicao
+from .preflight import inspecionar_pdf, resultado_sem_assinatura
+from .ratelimit import RetryPolicy, deve_repetir, get_default_rate_limiter, parse_retry_after
+from .relatorio import process_relatorio
+from .retencao import RawStore, aplicar_retencao, validar_retencao
+from .singleflight import SingleFlight, chave_voo
+from .upload import TAMANHO_BLOCO_UPLOAD, DocumentoUpload, MultipartStream, abrir_documento
+
+
+BASE_URL = "https://validar.iti.gov.br"
+BASE_URL_HOMOLOGACAO = "https://h-validar.iti.gov.br"
+
+USER_AGENT = 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36'
+
+IDIOMAS_RELATORIO = ("pt-br", "en", "es")
+
+TAMANHO_BLOCO_DOWNLOAD = 64 * 1024
+
+ETAPAS_VALIDACAO_COMPLETA = ("simples", "conformidade", "pdf")
+
+# Headers específicos de cada endpoint (somados aos headers do navegador)
+HEADERS_ARQUIVO = {
+    'Accept': '*/*',
+}
+HEADERS_SIMPLES = {
+    'Accept': 'application/json, text/plain, */*',
+    'Content-Type': 'application/json',
+}
+HEADERS_JSON = {
+    'Accept': 'application/json',
+    'Content-Type': 'application/json',
+}
+HEADERS_URL = {
+    'Accept': '*/*',
+    'Content-Type': 'application/json',
+}
+
+ESQUEMAS_URL = ("http", "https")
+
+
+def base_url_padrao():
+    """Retorna a URL base padrão: ITI_BASE_URL, se definida, ou produção."""
+    return os.environ.get("ITI_BASE_URL", BASE_URL)
+
+
+def montar_headers_navegador(base_url=BASE_URL):
+    """
+    Monta os headers do Chrome replicados pelo módulo.
+    Args:
+        base_url: URL base da API (define Referer e Origin)
+    Returns:
+        dict com os headers comuns a todas as requisições
+    """
+    base_url = base_url.rstrip('/')
+    return {
+        'Referer': f'{base_url}/',
+        'User-Agent': USER_AGENT,
+        'sec-ch-ua': '"Chromium";v="142", "Google Chrome";v="142", "Not_A Brand";v="99"',
+        'sec-ch-ua-mobile': '?0',
+        'sec-ch-ua-platform': '"Linux"',
+        'Origin': base_url,
+        'Sec-Fetch-Site': 'same-origin',
+        'Sec-Fetch-Mode': 'cors',
+        'Sec-Fetch-Dest': 'empty',
+    }
+
+
+def rebobinar_corpo(kwargs):
+    """Volta ao início o corpo de uma requisição (streams/arquivos) antes de reenviá-la."""
+    for chave in ('data', 'content'):
+        if hasattr(kwargs.get(chave), 'seek'):
+            kwargs[chave].seek(0)
+    files = kwargs.get('files')
+    if not files:
+        return
+    partes = files.values() if isinstance(files, dict) else (parte for _, parte in files)
+    for parte in partes:
+        arquivo = parte[1] if isinstance(parte, tuple) else parte
+        if hasattr(arquivo, 'seek'):
+            arquivo.seek(0)
+
+
+def resultado_falha_arquivo(response, erro_http="Erro HTTP {status}"):
+    """
+    Interpreta respostas de /arquivo diferentes de 200.
+    Args:
+        response: Resposta HTTP (requests ou httpx)
+        erro_http: Mensagem de erro para status inesperados
+    Returns:
+        dict de resultado 'invalid'/'error', ou None se a resposta for 200
+    """
+    if response.status_code == 400:
+        return {
+            "status": "invalid",
+            "error": "Documento sem assinatura ou inválido",
+            "details": loads(response.content) if response.content else None
+        }
+    if response.status_code != 200:
+        return {
+            "status": "error",
+            "error": erro_http.format(status=response.status_code),
+            "details": response.text
+        }
+    return None
+
+
+def decodificar_json(response, endpoint, hooks=()):
+    """Decodifica o JSON da resposta (backend de json_backend), medindo a etapa 'json_decode'."""
+    with medir(hooks, 'json_decode', endpoint=endpoint):
+        return loads(response.content)
+
+
+def corpo_arquivo(response):
+    """
+    Corpo da resposta de /arquivo em bytes, repassado sem decodificação ao
+    /simples e ao /conformidade (só é decodificado se for para o resultado).
+    Raises:
+        ValueError: Se o corpo não for um objeto/lista JSON
+    """
+    corpo = response.content
+    if corpo.lstrip()[:1] not in (b'{', b'['):
+        raise ValueError(f"Resposta de /arquivo não é JSON: {corpo[:80]!r}")
+    return corpo
+
+
+def carregar_json_bruto(json_bruto, hooks=()):
+    """json_bruto no formato dos resultados (decodificado, se repassado em bytes)."""
+    if isinstance(json_bruto, (bytes, bytearray, memoryview)):
+        with medir(hooks, 'json_decode', endpoint='arquivo'):
+            return json_ou_texto(json_bruto)
+    return json_bruto
+
+
+def resultado_simples(response, json_bruto, filename, hooks=()):
+    """
+    Converte a resposta de /simples no dict de resultado da validação.
+    Args:
+        response: Resposta HTTP (requests ou httpx)
+        json_bruto: JSON enviado ao /simples, decodificado ou em bytes (incluído em caso de erro)
+        filename: Nome do arquivo original
+        hooks: Hooks de instrumentação (ver metrics)
+    Returns:
+        dict estruturado com resultado
+    """
+    if response.status_code != 200:
+        return {
+            "status": "error",
+            "error": f"Erro no /simples: {response.status_code}",
+            "json_bruto": carregar_json_bruto(json_bruto, hooks),
+            "details": response.text
+        }
+    relatorio = decodificar_json(response, 'simples', hooks)
+    with medir(hooks, 'process_relatorio'):
+        return process_relatorio(relatorio, filename)
+
+
+def resultado_conformidade(response, json_bruto, hooks=()):
+    """
+    Converte a resposta de /conformidade no dict de resultado.
+    Args:
+        response: Resposta HTTP (requests ou httpx)
+        json_bruto: JSON enviado ao /conformidade, decodificado ou em bytes
+        hooks: Hooks de instrumentação (ver metrics)
+    Returns:
+        dict com status 'success' (e relatorio_conformidade) ou 'error'
+    """
+    if response.status_code != 200:
+        return {
+            "status": "error",
+            "error": f"Erro HTTP {response.status_code} em /conformidade",
+            "json_bruto": carregar_json_bruto(json_bruto, hooks),
+            "details": response.text
+        }
+    return {
+        "status": "success",
+        "relatorio_conformidade": decodificar_json(response, 'conformidade', hooks),
+        "json_bruto": carregar_json_bruto(json_bruto, hooks)
+    }
+
+
+def relatorio_serializado(relatorio_conformidade):
+    """Relatório de conformidade como str JSON (o campo 'data' de /downloadPdf)."""
+    if isinstance(relatorio_conformidade, RelatorioSerializado):
+        return relatorio_conformidade.texto
+    if isinstance(relatorio_conformidade, str):
+        return relatorio_conformidade
+    return bytes(como_bytes(relatorio_conformidade)).decode('utf-8')
+
+
+class RelatorioSerializado:
+    """
+    Relatório de conformidade serializado uma única vez para vários downloads.
+
+    O campo 'data' de /downloadPdf é o relatório stringificado, que ainda é
+    escapado como string JSON no corpo; os dois passos são feitos aqui, e o
+    corpo de cada idioma é apenas a concatenação com o idioma.
+
+    Args:
+        relatorio_conformidade: dict, ou JSON já serializado (str/bytes)
+    """
+
+    __slots__ = ('texto', 'dados', '_digest')
+
+    def __init__(self, relatorio_conformidade):
+        self.texto = relatorio_serializado(relatorio_conformidade)
+        self.dados = dumps(self.texto)
+        self._digest = None
+
+    def digest(self):
+        """SHA-256 do relatório (chave de RelatorioPdfCache), calculado uma vez."""
+        if self._digest is None:
+            self._digest = digest_relatorio(self.texto)
+        return self._digest
+
+    def corpo(self, language):
+        """Corpo JSON de /downloadPdf para um idioma (igual a dumps({'data': ..., 'language': ...}))."""
+        return b'{"data":' + self.dados + b',"language":' + dumps(language) + b'}'
+
+
+def chave_cache(documento, destacados=()):
+    """
+    Chave do cache de um envio: o SHA-256 do documento ou, com assinaturas
+    destacadas, o SHA-256 da combinação dos hashes de todos os arquivos.
+    """
+    digest = documento.sha256()
+    if not destacados:
+        return digest
+    combinado = ":".join([digest, *(d.sha256() for d in destacados)])
+    return hashlib.sha256(combinado.encode('ascii')).hexdigest()
+
+
+def eh_url(valor):
+    """Indica se o valor é uma URL http(s) (e não um caminho local)."""
+    return isinstance(valor, str) and urlsplit(valor).scheme.lower() in ESQUEMAS_URL
+
+
+def verificar_url(url):
+    """Levanta ValueError se a URL não for http(s)."""
+    if not eh_url(url):
+        raise ValueError(f"URL inválida (use http:// ou https://): {url}")
+    return url
+
+
+def nome_da_url(url):
+    """Nome do documento a partir do caminho da URL (None se não houver)."""
+    return unquote(urlsplit(url).path.rstrip('/').rpartition('/')[2]) or None
+
+
+def url_recusada(response):
+    """
+    Indica se o ITI recusou a URL (4xx, exceto 429), caso em que baixar o
+    documento e enviá-lo por /arquivo pode funcionar. Erros 5xx e 429 indicam
+    problema no próprio ITI e não justificam o download.
+    """
+    return 400 <= response.status_code < 500 and response.status_code != 429
+
+
+def anotar_url(resultado, url, origem, **extras):
+    """Cópia do resultado com a URL e a origem do conteúdo ('url' ou 'download')."""
+    return {**resultado, "url": url, "origem": origem, **extras}
+
+
+def lista_destacados(detached):
+    """Normaliza o argumento detached (None, uma fonte ou um iterável de fontes) em lista."""
+    if detached is None:
+        return []
+    if isinstance(detached, (str, os.PathLike, bytes, bytearray, DocumentoUpload)) or hasattr(detached, 'read'):
+        return [detached]
+    return list(detached)
+
+
+def verificar_preflight(verificacao, verbose=False):
+    """
+    Interpreta a verificação local (ver preflight.inspecionar_pdf).
+    Returns:
+        dict de resultado 'invalid' se o PDF não tem assinatura, ou None
+    """
+    if verificacao is None:
+        return None
+    if verificacao['sem_assinatura']:
+        if verbose:
+            print("⛔ Nenhuma assinatura encontrada localmente (/ByteRange, /Sig); upload dispensado\n")
+        return resultado_sem_assinatura(verificacao)
+    if verbose and verificacao['pdf']:
+        print(f"🔎 Verificação local: {verificacao['assinaturas']} assinatura(s)")
+    return None
+
+
+def anotar_preflight(resultado, verificacao):
+    """Cópia do resultado com a verificação local em 'preflight' (se houver)."""
+    if verificacao is None or 'preflight' in resultado:
+        return resultado
+    return {**resultado, "preflight": verificacao}
+
+
+def salvar_resposta_stream(response, save_as=None, sink=None, tamanho_bloco=TAMANHO_BLOCO_DOWNLOAD):
+    """
+    Grava o corpo de uma resposta em streaming, sem mantê-lo na memória.
+
+    Com save_as, os blocos vão para um arquivo temporário no mesmo diretório,
+    renomeado atomicamente ao final (um download interrompido nunca deixa um
+    PDF incompleto no destino). Com sink, os blocos são passados a sink.write().
+
+    Args:
+        response: requests.Response obtida com stream=True
+        save_as: Caminho de destino
+        sink: Objeto com write() (alternativa a save_as)
+        tamanho_bloco: Tamanho dos blocos lidos da conexão
+    Returns:
+        int com o número de bytes gravados
+    """
+    tamanho = 0
+    if sink is not None:
+        for bloco in response.iter_content(tamanho_bloco):
+            sink.write(bloco)
+            tamanho += len(bloco)
+        return tamanho
+
+    save_path = Path(save_as)
+    save_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=save_path.parent, prefix=f".{save_path.name}.", suffix=".part")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for bloco in response.iter_content(tamanho_bloco):
+                f.write(bloco)
+                tamanho += len(bloco)
+        os.replace(tmp, save_path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return tamanho
+
+
+class _RespostaEmMemoria:
+    """Adapta bytes à interface usada por salvar_resposta_stream (iter_content)."""
+
+    def __init__(self, dados):
+        self.dados = dados
+
+    def iter_content(self, tamanho_bloco):
+        for inicio in range(0, len(self.dados), tamanho_bloco):
+            yield self.dados[inicio:inicio + tamanho_bloco]
+
+
+class ItiClient:
+    """
+    Cliente da API do ITI com pool de conexões keep-alive.
+
+    Uma instância pode ser compartilhada entre threads: o pool do urllib3 é
+    thread-safe e limita o número de conexões abertas por host.
+
+    Args:
+        base_url: URL base da API (produção, homologação ou servidor local)
+        pool_connections: Quantidade de pools (hosts distintos) mantidos em cache
+        pool_maxsize: Máximo de conexões simultâneas por host
+        pool_block: Se True, aguarda uma conexão livre ao atingir pool_maxsize
+            em vez de abrir conexões extras descartáveis
+        timeout: Timeout (segundos) de cada requisição
+        session: requests.Session já configurada (opcional)
+        cache: ResultCache (SQLiteCache/DirectoryCache) para evitar reenviar
+            documentos já validados (opcional)
+        rate_limiter: AdaptiveRateLimiter (padrão: o compartilhado pelo
+            processo; False desativa)
+        retry: RetryPolicy (padrão: RetryPolicy(); False desativa)
+        hooks: MetricsHook ou lista de hooks que recebem spans por etapa e
+            contadores de bytes (ver metrics; padrão: nenhum)
+        retention: Política de retenção de relatorio_completo/json_bruto nos
+            resultados: 'always' (padrão), 'none', 'on_error' ou 'spill' (ver retencao)
+        raw_store: RawStore ou diretório onde 'spill' grava os dados brutos
+        preflight: Se True (padrão), procura /ByteRange e /Sig no PDF antes do
+            upload: PDFs sem assinatura recebem 'invalid' sem chamar o ITI e os
+            demais resultados trazem a contagem local em 'preflight'
+        single_flight: Coalescência de chamadas simultâneas para o mesmo
+            documento em validate_pdf, validate_document e
+            get_conformidade_report: True (SingleFlight do cliente), uma
+            instância de SingleFlight/FileLockSingleFlight (compartilhada entre
+            clientes ou processos) ou None (padrão: desativada)
+        pdf_cache: RelatorioPdfCache para servir localmente PDFs de relatório
+            já baixados (mesmo relatório de conformidade e idioma; opcional)
+    """
+
+    def __init__(self, base_url=BASE_URL, pool_connections=10, pool_maxsize=10,
+                 pool_block=False, timeout=60, session=None, cache=None,
+                 rate_limiter=None, retry=None, hooks=None, retention="always", raw_store=None,
+                 preflight=True, single_flight=None, pdf_cache=None):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.cache = cache
+        self.pdf_cache = pdf_cache
+        self.preflight = preflight
+        self.single_flight = SingleFlight() if single_flight is True else (single_flight or None)
+        self.hooks = normalizar_hooks(hooks)
+        self.retention = validar_retencao(retention)
+        self.raw_store = RawStore(raw_store) if isinstance(raw_store, (str, os.PathLike)) else raw_store
+        if retention == "spill" and self.raw_store is None:
+            raise ValueError("A política 'spill' requer raw_store")
+        self.rate_limiter = get_default_rate_limiter() if rate_limiter is None else (rate_limiter or None)
+        self.retry = RetryPolicy() if retry is None else (retry or None)
+        self.session = session if session is not None else requests.Session()
+
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update(montar_headers_navegador(self.base_url))
+        self._sessao_download = None
+        self._lock_download = threading.Lock()
+
+    def __repr__(self):
+        return f"ItiClient(base_url={self.base_url!r})"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """Fecha todas as conexões do pool."""
+        self.session.close()
+        if self._sessao_download is not None:
+            self._sessao_download.close()
+
+    def _download(self):
+        """
+        Sessão dos downloads de validate_url: separada da sessão do ITI, para
+        não enviar os headers do navegador a outros servidores.
+        """
+        if self._sessao_download is None:
+            with self._lock_download:
+                if self._sessao_download is None:
+                    self._sessao_download = requests.Session()
+        return self._sessao_download
+
+    def url(self, endpoint):
+        """Retorna a URL completa de um endpoint (ex.: 'arquivo')."""
+        return f"{self.base_url}/{endpoint.lstrip('/')}"
+
+    def post(self, endpoint, **kwargs):
+        """
+        Executa um POST no endpoint usando a sessão compartilhada.
+
+        Passa pelo limitador de taxa e repete a chamada (com backoff) em falhas
+        de conexão, timeouts, 429 e 5xx, conforme a política de retry.
+
+        Args:
+            endpoint: Nome do endpoint (ex.: 'simples')
+            **kwargs: Repassados para requests.Session.post
+        Returns:
+            requests.Response (a última, se todas as tentativas falharem)
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        endpoint = endpoint.lstrip('/')
+        url = self.url(endpoint)
+        if self.retry is not None:
+            self.retry.registrar_requisicao(endpoint)
+
+        tentativa = 0
+        while True:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            if tentativa:
+                rebobinar_corpo(kwargs)
+            try:
+                with medir(self.hooks, 'http', endpoint=endpoint, tentativa=tentativa) as span:
+                    response = self.session.post(url, **kwargs)
+                    span.definir(status_code=response.status_code)
+            except (requests.ConnectionError, requests.Timeout):
+                if self.rate_limiter is not None:
+                    self.rate_limiter.registrar(None)
+                tentativa += 1
+                if self.retry is None or not self.retry.pode_repetir(endpoint, tentativa):
+                    raise
+                time.sleep(self.retry.atraso(tentativa))
+                continue
+
+            if self.hooks:
+                contar(self.hooks, 'bytes_enviados', tamanho_requisicao(response.request.headers), endpoint=endpoint)
+                if not kwargs.get('stream'):
+                    contar(self.hooks, 'bytes_recebidos', len(response.content), endpoint=endpoint)
+
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            if self.rate_limiter is not None:
+                self.rate_limiter.registrar(response.status_code, retry_after)
+            if deve_repetir(response.status_code) and self.retry is not None:
+                tentativa += 1
+                if self.retry.pode_repetir(endpoint, tentativa):
+                    response.close()
+                    time.sleep(self.retry.atraso(tentativa, retry_after))
+                    continue
+            return response
+
+    # ========================================
+    # Chamadas de baixo nível
+    # ========================================
+
+    def post_arquivo(self, pdf_path, filename=None, detached=()):
+        """
+        Envia o PDF para /arquivo (multipart/form-data em streaming).
+        Args:
+            pdf_path: Caminho, bytes, objeto com read() ou DocumentoUpload
+            filename: Nome do documento (padrão: nome do arquivo)
+            detached: DocumentoUploads enviados em detached_files[] (ver abrir_formatado)
+        """
+        documento = abrir_documento(pdf_path, filename)
+        try:
+            corpo = MultipartStream([('signature_files[]', documento)]
+                                    + [('detached_files[]', destacado) for destacado in detached])
+            response = self.post('arquivo', headers={**HEADERS_ARQUIVO, **corpo.headers}, data=corpo)
+            if self.hooks and corpo.enviado_em is not None:
+                registrar_span(self.hooks, 'upload', corpo.iniciado_em, corpo.enviado_em,
+                               endpoint='arquivo', bytes=corpo.tamanho)
+                registrar_span(self.hooks, 'espera_resposta', corpo.enviado_em, time.perf_counter(),
+                               endpoint='arquivo', status_code=response.status_code)
+            return response
+        finally:
+            if documento is not pdf_path:
+                documento.close()
+
+    def post_url(self, url):
+        """Pede ao ITI que baixe e analise o documento da URL (resposta no formato de /arquivo)."""
+        return self.post('url', headers=HEADERS_URL, data=dumps({"url": url}))
+
+    def post_simples(self, json_bruto):
+        """Envia o json_bruto de /arquivo (dict ou os bytes originais) para /simples."""
+        return self.post('simples', headers=HEADERS_SIMPLES, data=como_bytes(json_bruto))
+
+    def post_conformidade(self, json_bruto):
+        """Envia o json_bruto de /arquivo (dict ou os bytes originais) para /conformidade."""
+        return self.post('conformidade', headers=HEADERS_JSON, data=como_bytes(json_bruto))
+
+    def post_download_pdf(self, relatorio_conformidade, language="pt-br", stream=False):
+        """
+        Solicita o PDF do relatório a /downloadPdf (stream=True não lê o corpo).
+
+        relatorio_conformidade pode ser o dict, o JSON já serializado (str
+        ou bytes), que é repassado sem nova serialização, ou um
+        RelatorioSerializado (reaproveitado entre idiomas).
+        """
+        # O endpoint espera o JSON stringificado
+        if not isinstance(relatorio_conformidade, RelatorioSerializado):
+            relatorio_conformidade = RelatorioSerializado(relatorio_conformidade)
+        return self.post('downloadPdf', headers=HEADERS_JSON, data=relatorio_conformidade.corpo(language),
+                         stream=stream)
+
+    def _preflight(self, documento):
+        """Verificação local do documento (None se desativada; reaproveita uma já feita)."""
+        if not self.preflight:
+            return None
+        if documento.preflight is None:
+            with medir(self.hooks, 'preflight') as span:
+                documento.preflight = inspecionar_pdf(documento)
+                span.definir(assinaturas=documento.preflight['assinaturas'])
+        return documento.preflight
+
+    def _reter(self, resultado, retention):
+        """Aplica a política de retenção (a da chamada ou a do cliente)."""
+        return aplicar_retencao(resultado, retention or self.retention, self.raw_store)
+
+    def _cache_get(self, documento, endpoint, destacados=()):
+        """Retorna (digest, resultado em cache ou None). digest é None sem cache."""
+        if self.cache is None:
+            return None, None
+        with medir(self.hooks, 'cache', endpoint=endpoint) as span:
+            digest = chave_cache(documento, destacados)
+            resultado = self.cache.get(digest, endpoint)
+            span.definir(hit=resultado is not None)
+        return digest, resultado
+
+    def _coalescer(self, documento, endpoint, funcao, verificacao=None, destacados=(), verbose=False):
+        """
+        Executa funcao() pelo single-flight do cliente: chamadas simultâneas
+        para o mesmo documento e endpoint compartilham um único resultado.
+        """
+        if self.single_flight is None or (verificacao is not None and verificacao['sem_assinatura']):
+            return funcao()
+        chave = chave_voo(chave_cache(documento, destacados), endpoint)
+        resultado, compartilhado = self.single_flight.executar(chave, funcao)
+        if not compartilhado:
+            return resultado
+        contar(self.hooks, 'chamadas_coalescidas', 1, endpoint=endpoint)
+        if verbose:
+            print(f"⏳ {documento.nome}: resultado compartilhado com uma chamada simultânea do mesmo documento\n")
+        return resultado
+
+    def _cache_set(self, digest, endpoint, resultado):
+        if digest is not None and resultado_cacheavel(endpoint, resultado):
+            self.cache.set(digest, endpoint, resultado)
+        return resultado
+
+    # ========================================
+    # Fluxos completos
+    # ========================================
+
+    def validate_pdf(self, pdf_path, verbose=False, filename=None, retention=None):
+        """
+        Valida assinaturas de PDF usando API direta do ITI.
+        Args:
+            pdf_path: Caminho para o arquivo PDF, bytes ou objeto com read()
+                (o conteúdo é enviado em streaming, sem carregá-lo na memória)
+            verbose: Se True, mostra mensagens de progresso
+            filename: Nome do documento (padrão: nome do arquivo/stream)
+            retention: Política de retenção dos dados brutos (padrão: a do cliente)
+        Returns:
+            dict com resultado da validação
+        """
+        documento = abrir_documento(pdf_path, filename)
+        try:
+            with medir(self.hooks, 'validate_pdf') as span:
+                verificacao = self._preflight(documento)
+                resultado = self._coalescer(
+                    documento, 'simples', lambda: self._validate_documento(documento, verbose, verificacao),
+                    verificacao, verbose=verbose
+                )
+                resultado = anotar_preflight(resultado, verificacao)
+                span.definir(status=resultado.get('status'))
+            return self._reter(resultado, retention)
+        finally:
+            if documento is not pdf_path:
+                documento.close()
+
+    def validate_document(self, signed, detached=None, verbose=False, filename=None, retention=None):
+        """
+        Valida um documento assinado em qualquer formato aceito por /arquivo
+        (PDF, XML, P7S ou JSON), com assinaturas destacadas opcionais.
+
+        O Content-Type de cada arquivo é detectado pelo conteúdo (ver
+        formatos.detectar_formato), não pela extensão. A verificação local
+        (preflight) só é feita em PDFs sem assinaturas destacadas.
+
+        Args:
+            signed: Documento assinado ou original: caminho, bytes, objeto com read() ou DocumentoUpload
+            detached: Assinatura destacada (.p7s, .jws, .xml, .p7m, .json) ou lista delas
+            verbose: Se True, mostra mensagens de progresso
+            filename: Nome do documento (padrão: nome do arquivo/stream)
+            retention: Política de retenção dos dados brutos (padrão: a do cliente)
+        Returns:
+            dict com resultado da validação (mesmo formato de validate_pdf)
+        """
+        detached = lista_destacados(detached)
+        documento = None
+        destacados = []
+        try:
+            documento = abrir_formatado(signed, filename)
+            for fonte in detached:
+                destacados.append(abrir_formatado(fonte, destacado=True))
+            with medir(self.hooks, 'validate_document', destacados=len(destacados)) as span:
+                verificacao = None
+                if not destacados and documento.content_type == PDF.content_type:
+                    verificacao = self._preflight(documento)
+                resultado = self._coalescer(
+                    documento, 'simples', lambda: self._validate_documento(documento, verbose, verificacao, destacados),
+                    verificacao, destacados, verbose
+                )
+                resultado = anotar_preflight(resultado, verificacao)
+                span.definir(status=resultado.get('status'))
+            return self._reter(resultado, retention)
+        except FileNotFoundError as e:
+            return {
+                "status": "error",
+                "error": str(e)
+            }
+        finally:
+            for aberto, fonte in zip([documento, *destacados], [signed, *detached]):
+                if aberto is not None and aberto is not fonte:
+                    aberto.close()
+
+    def _validate_documento(self, documento, verbose, verificacao=None, destacados=()):
+        if verbose:
+            print(f"\n{'='*60}")
+            print(f"Validando: {documento.nome}")
+            for destacado in destacados:
+                print(f"Assinatura destacada: {destacado.nome}")
+            print(f"{'='*60}\n")
+
+        sem_assinatura = verificar_preflight(verificacao, verbose)
+        if sem_assinatura is not None:
+            return sem_assinatura
+
+        digest, em_cache = self._cache_get(documento, 'simples', destacados)
+        if em_cache is not None:
+            if verbose:
+                print("⚡ Resultado obtido do cache local\n")
+            return em_cache
+
+        if verbose:
+            print("📤 Enviando PDF para /arquivo...")
+
+        try:
+            response = self.post_arquivo(documento, detached=destacados)
+
+            if verbose:
+                print(f"   Status: {response.status_code}")
+
+            falha = resultado_falha_arquivo(response)
+            if falha is not None:
+                return self._cache_set(digest, 'simples', falha)
+            json_bruto = corpo_arquivo(response)
+
+            if verbose:
+                print(f"   ✓ Resposta recebida ({len(json_bruto)} bytes)")
+
+        except Exception as e:
+            return {
+                "status": "error",
+                "error": str(e)
+            }
+
+        if verbose:
+            print("📥 Processando com /simples...")
+
+        try:
+            response_simples = self.post_simples(json_bruto)
+
+            if verbose:
+                print(f"   Status: {response_simples.status_code}")
+
+            # Processar e estruturar resultado
+            resultado = resultado_simples(response_simples, json_bruto, documento.nome, self.hooks)
+
+            if verbose and response_simples.status_code == 200:
+                print(f"   ✓ Relatório recebido\n")
+                print(f"{'='*60}")
+                print(f"Status: {resultado['status'].upper()}")
+                if resultado['status'] == 'valid':
+                    print(f"Assinaturas: {resultado['total_assinaturas']}")
+                    for i, assinatura in enumerate(resultado['assinaturas'], 1):
+                        print(f"  {i}. {assinatura.get('assinado_por', 'N/A')}")
+                print(f"{'='*60}\n")
+
+            return self._cache_set(digest, 'simples', resultado)
+
+        except Exception as e:
+            return {
+                "status": "error",
+                "error": f"Erro ao processar /simples: {str(e)}",
+                "json_bruto": carregar_json_bruto(json_bruto, self.hooks)
+            }
+
+    def validate_url(self, url, verbose=False, fallback=True, filename=None, retention=None):
+        """
+        Valida um documento publicado em uma URL, sem baixá-lo: o ITI busca o
+        arquivo (/url) e o json_bruto segue para /simples e process_relatorio,
+        como em validate_pdf.
+
+        Se o ITI recusar a URL (4xx) e fallback=True, o documento é baixado em
+        streaming (em memória até 8 MB, depois em arquivo temporário) e
+        validado por /arquivo com validate_document. O cache local não é
+        usado com /url (o conteúdo da URL pode mudar), apenas no download.
+
+        Args:
+            url: URL http(s) do documento
+            verbose: Se True, mostra mensagens de progresso
+            fallback: Se True, baixa e envia o documento quando /url é recusado
+            filename: Nome do documento (padrão: o último trecho da URL)
+            retention: Política de retenção dos dados brutos (padrão: a do cliente)
+        Returns:
+            dict com resultado da validação, mais 'url' e 'origem' ('url' ou
+            'download'; no download, 'url_status' traz o status recusado por /url)
+        """
+        verificar_url(url)
+        with medir(self.hooks, 'validate_url') as span:
+            resultado = self._validate_url(url, verbose, fallback, filename or nome_da_url(url))
+            span.definir(status=resultado.get('status'), origem=resultado['origem'])
+        return self._reter(resultado, retention)
+
+    def _validate_url(self, url, verbose, fallback, nome):
+        if verbose:
+            print(f"\n{'='*60}")
+            print(f"Validando URL: {url}")
+            print(f"{'='*60}\n")
+            print("🌐 Enviando URL para /url...")
+
+        response = None
+        try:
+            response = self.post_url(url)
+
+            if verbose:
+                print(f"   Status: {response.status_code}")
+
+            falha = resultado_falha_arquivo(response)
+            if falha is None:
+                json_bruto = corpo_arquivo(response)
+        except ValueError as e:
+            # Resposta 200 que não é JSON: tratada como recusa (response fica
+            # None se o próprio post_url levantou, ex.: requests.InvalidURL)
+            falha = {"status": "error", "error": str(e)}
+        except Exception as e:
+            return anotar_url({"status": "error", "error": str(e)}, url, 'url')
+
+        if falha is not None:
+            if fallback and response is not None and (url_recusada(response) or response.status_code == 200):
+                if verbose:
+                    print("   ↩️  URL recusada pelo ITI; baixando o documento para enviar por /arquivo...")
+                return anotar_url(self._validate_download(url, nome, verbose), url, 'download',
+                                  url_status=response.status_code)
+            return anotar_url(falha, url, 'url')
+
+        if verbose:
+            print(f"   ✓ Resposta recebida ({len(json_bruto)} bytes)")
+            print("📥 Processando com /simples...")
+
+        try:
+            response_simples = self.post_simples(json_bruto)
+            resultado = resultado_simples(response_simples, json_bruto, nome, self.hooks)
+        except Exception as e:
+            resultado = {
+                "status": "error",
+                "error": f"Erro ao processar /simples: {str(e)}",
+                "json_bruto": carregar_json_bruto(json_bruto, self.hooks)
+            }
+
+        if verbose:
+            print(f"   Status: {resultado['status'].upper()}\n")
+        return anotar_url(resultado, url, 'url')
+
+    def _validate_download(self, url, nome, verbose):
+        """Baixa o documento em streaming e o valida por /arquivo (ver validate_url)."""
+        try:
+            with self._download().get(url, stream=True, timeout=self.timeout) as response:
+                if response.status_code != 200:
+                    return {
+                        "status": "error",
+                        "error": f"Erro HTTP {response.status_code} ao baixar o documento",
+                    }
+                documento = DocumentoUpload(response.iter_content(TAMANHO_BLOCO_UPLOAD), filename=nome)
+        except requests.RequestException as e:
+            return {
+                "status": "error",
+                "error": f"Erro ao baixar o documento: {str(e)}"
+            }
+        try:
+            if verbose:
+                print(f"   ✓ Documento baixado ({documento.tamanho} bytes)")
+            # A retenção é aplicada uma única vez, em validate_url
+            return self.validate_document(documento, verbose=verbose, retention="always")
+        finally:
+            documento.close()
+
+    def get_conformidade_report(self, pdf_path, verbose=False, filename=None, retention=None):
+        """
+        Obtém o relatório de conformidade completo do ITI (necessário para gerar PDF).
+
+        Args:
+            pdf_path: Caminho para o arquivo PDF, bytes ou objeto com read()
+            verbose: Se True, mostra mensagens de progresso
+            filename: Nome do documento (padrão: nome do arquivo/stream)
+            retention: Política de retenção do json_bruto (padrão: a do cliente;
+                relatorio_conformidade é sempre mantido)
+
+        Returns:
+            dict contendo:
+            - status: 'success', 'invalid' ou 'error'
+            - relatorio_conformidade: JSON completo (se sucesso)
+            - json_bruto: Resposta da primeira chamada /arquivo
+            - error: Mensagem de erro (se houver)
+        """
+        try:
+            documento = abrir_documento(pdf_path, filename)
+        except FileNotFoundError as e:
+            return {
+                "status": "error",
+                "error": str(e)
+            }
+        try:
+            with medir(self.hooks, 'get_conformidade_report') as span:
+                verificacao = self._preflight(documento)
+                resultado = self._coalescer(
+                    documento, 'conformidade', lambda: self._conformidade_documento(documento, verbose, verificacao),
+                    verificacao, verbose=verbose
+                )
+                resultado = anotar_preflight(resultado, verificacao)
+                span.definir(status=resultado.get('status'))
+            return self._reter(resultado, retention)
+        finally:
+            if documento is not pdf_path:
+                documento.close()
+
+    def _conformidade_documento(self, documento, verbose, verificacao=None):
+        if verbose:
+            print(f"\n{'='*60}")
+            print(f"Obtendo relatório de conformidade: {documento.nome}")
+            print(f"{'='*60}\n")
+
+        sem_assinatura = verificar_preflight(verificacao, verbose)
+        if sem_assinatura is not None:
+            return sem_assinatura
+
+        digest, em_cache = self._cache_get(documento, 'conformidade')
+        if em_cache is not None:
+            if verbose:
+                print("⚡ Relatório obtido do cache local\n")
+            return em_cache
+
+        # Etapa 1: Upload do arquivo
+        if verbose:
+            print("📤 Enviando PDF para /arquivo...")
+
+        try:
+            response = self.post_arquivo(documento)
+
+            if verbose:
+                print(f"   Status: {response.status_code}")
+
+            falha = resultado_falha_arquivo(response, "Erro HTTP {status} em /arquivo")
+            if falha is not None:
+                return self._cache_set(digest, 'conformidade', falha)
+
+            json_bruto = corpo_arquivo(response)
+
+            if verbose:
+                print(f"   ✓ Resposta recebida ({len(json_bruto)} bytes)")
+
+        except Exception as e:
+            return {
+                "status": "error",
+                "error": f"Erro ao chamar /arquivo: {str(e)}"
+            }
+
+        # Etapa 2: Obter relatório de conformidade
+        if verbose:
+            print("📥 Processando com /conformidade...")
+
+        try:
+            response_conformidade = self.post_conformidade(json_bruto)
+
+            if verbose:
+                print(f"   Status: {response_conformidade.status_code}")
+
+            resultado = resultado_conformidade(response_conformidade, json_bruto, self.hooks)
+
+            if verbose and resultado["status"] == "success":
+                print(f"   ✓ Relatório de conformidade recebido\n")
+                print(f"{'='*60}\n")
+
+            return self._cache_set(digest, 'conformidade', resultado)
+
+        except Exception as e:
+            return {
+                "status": "error",
+                "error": f"Erro ao processar /conformidade: {str(e)}",
+                "json_bruto": carregar_json_bruto(json_bruto, self.hooks)
+            }
+
+    def download_relatorio_pdf(self, relatorio_conformidade, language="pt-br", save_as=None, verbose=False,
+                               stream=False, sink=None):
+        """
+        Faz download do PDF do relatório de validação do ITI.
+
+        Args:
+            relatorio_conformidade: JSON retornado por get_conformidade_report()
+                (dict, ou já serializado em str/bytes)
+            language: Idioma do relatório - "pt-br", "en" ou "es" (padrão: "pt-br")
+            save_as: Caminho onde salvar o PDF. Se None, retorna apenas os bytes
+            verbose: Se True, mostra mensagens de progresso
+            stream: Se True, grava o PDF em save_as em blocos (via arquivo
+                temporário renomeado atomicamente) sem mantê-lo na memória
+            sink: Objeto com write() que recebe o PDF em blocos (implica stream)
+
+        Returns:
+            dict contendo:
+            - status: 'success' ou 'error'
+            - pdf_bytes: Bytes do PDF (se sucesso e sem stream/sink)
+            - pdf_path: Caminho do arquivo salvo (se save_as foi fornecido)
+            - file_size: Tamanho do PDF em bytes (modo stream/sink)
+            - error: Mensagem de erro (se houver)
+        """
+        if language not in IDIOMAS_RELATORIO:
+            return {
+                "status": "error",
+                "error": f"Idioma inválido: {language}. Use 'pt-br', 'en' ou 'es'"
+            }
+
+        stream = stream or sink is not None
+        if stream and sink is None and not save_as:
+            raise ValueError("O modo stream requer save_as ou sink")
+
+        with medir(self.hooks, 'download_relatorio_pdf', language=language) as span:
+            resultado = self._download_relatorio(relatorio_conformidade, language, save_as, verbose, stream, sink)
+            span.definir(status=resultado.get('status'))
+        return resultado
+
+    def _download_relatorio(self, relatorio_conformidade, language, save_as, verbose, stream, sink):
+        if verbose:
+            print(f"\n{'='*60}")
+            print(f"Download do PDF do relatório (idioma: {language})")
+            print(f"{'='*60}\n")
+
+        if verbose:
+            print("📥 Baixando PDF do relatório...")
+
+        try:
+            # Serializado uma única vez: chave do cache e corpo da requisição
+            serializado = relatorio_conformidade
+            if not isinstance(serializado, RelatorioSerializado):
+                serializado = RelatorioSerializado(relatorio_conformidade)
+            digest = None
+            if self.pdf_cache is not None:
+                with medir(self.hooks, 'cache', endpoint='downloadPdf') as span:
+                    digest = serializado.digest()
+                    pdf_bytes = self.pdf_cache.get(digest, language)
+                    span.definir(hit=pdf_bytes is not None)
+                if pdf_bytes is not None:
+                    if verbose:
+                        print(f"   ⚡ PDF obtido do cache local ({len(pdf_bytes)} bytes)")
+                    return self._entregar_pdf(pdf_bytes, save_as, verbose, stream, sink)
+
+            response = self.post_download_pdf(serializado, language, stream=stream)
+
+            if verbose:
+                print(f"   Status: {response.status_code}")
+
+            if response.status_code != 200:
+                details = response.text
+                response.close()
+                return {
+                    "status": "error",
+                    "error": f"Erro HTTP {response.status_code} em /downloadPdf",
+                    "details": details
+                }
+
+            if stream:
+                with response:
+                    file_size = salvar_resposta_stream(response, save_as=save_as, sink=sink)
+                contar(self.hooks, 'bytes_recebidos', file_size, endpoint='downloadPdf')
+                # Com sink os blocos não ficam em lugar nenhum: só save_as vai para o cache
+                if digest is not None and sink is None:
+                    self.pdf_cache.set_arquivo(digest, language, save_as)
+                result = {
+                    "status": "success",
+                    "file_size": file_size
+                }
+                if sink is None:
+                    result["pdf_path"] = str(Path(save_as))
+
+                if verbose:
+                    print(f"   ✓ PDF recebido ({file_size} bytes)")
+                    if sink is None:
+                        print(f"   ✓ Salvo em: {save_as}")
+                    print(f"{'='*60}\n")
+
+                return result
+
+            pdf_bytes = response.content
+
+            if verbose:
+                print(f"   ✓ PDF recebido ({len(pdf_bytes)} bytes)")
+
+            if digest is not None:
+                self.pdf_cache.set(digest, language, pdf_bytes)
+
+            return self._entregar_pdf(pdf_bytes, save_as, verbose, stream=False, sink=None)
+
+        except Exception as e:
+            return {
+                "status": "error",
+                "error": f"Erro ao baixar PDF: {str(e)}"
+            }
+
+    def _entregar_pdf(self, pdf_bytes, save_as, verbose, stream, sink):
+        """Monta o resultado de download_relatorio_pdf para um PDF já em memória."""
+        if stream:
+            if sink is not None:
+                sink.write(pdf_bytes)
+                result = {"status": "success", "file_size": len(pdf_bytes)}
+            else:
+                salvar_resposta_stream(_RespostaEmMemoria(pdf_bytes), save_as=save_as)
+                result = {"status": "success", "file_size": len(pdf_bytes), "pdf_path": str(Path(save_as))}
+        else:
+            result = {
+                "status": "success",
+                "pdf_bytes": pdf_bytes
+            }
+
+            # Salvar em arquivo se solicitado
+            if save_as:
+                save_path = Path(save_as)
+                save_path.parent.mkdir(parents=True, exist_ok=True)
+                save_path.write_bytes(pdf_bytes)
+                result["pdf_path"] = str(save_path)
+
+        if verbose:
+            if "pdf_path" in result:
+                print(f"   ✓ Salvo em: {result['pdf_path']}")
+            print(f"{'='*60}\n")
+
+        return result
+
+    def download_relatorio_pdfs(self, relatorio_conformidade, languages=IDIOMAS_RELATORIO, directory=None,
+                                filename="relatorio_{language}.pdf", verbose=False):
+        """
+        Faz download do PDF do relatório em vários idiomas ao mesmo tempo.
+
+        O relatório é serializado uma única vez e as requisições a
+        /downloadPdf (uma por idioma) são feitas em paralelo pelo pool de
+        conexões do cliente, de modo que o tempo total fica próximo ao de um
+        único download.
+
+        Args:
+            relatorio_conformidade: JSON retornado por get_conformidade_report()
+                (dict, ou já serializado em str/bytes)
+            languages: Idiomas desejados (padrão: "pt-br", "en" e "es")
+            directory: Diretório onde gravar os PDFs, em streaming (um arquivo
+                por idioma). Se None, os bytes são retornados em memória
+            filename: Nome de cada arquivo em directory; {language} é
+                substituído pelo idioma
+            verbose: Se True, mostra mensagens de progresso
+
+        Returns:
+            dict contendo:
+            - status: 'success' ou 'error' (se algum idioma falhou)
+            - pdfs: dict idioma -> resultado no formato de download_relatorio_pdf()
+            - error: Mensagem do primeiro erro (se houver)
+        """
+        languages = list(dict.fromkeys(languages))
+        invalidos = [idioma for idioma in languages if idioma not in IDIOMAS_RELATORIO]
+        if invalidos or not languages:
+            return {
+                "status": "error",
+                "error": f"Idioma inválido: {', '.join(invalidos) or 'nenhum'}. Use 'pt-br', 'en' ou 'es'"
+            }
+        if directory is not None:
+            Path(directory).mkdir(parents=True, exist_ok=True)
+
+        if verbose:
+            print(f"\n{'='*60}")
+            print(f"Download do PDF do relatório (idiomas: {', '.join(languages)})")
+            print(f"{'='*60}\n")
+
+        serializado = RelatorioSerializado(relatorio_conformidade)
+
+        def baixar(language):
+            save_as = None if directory is None else Path(directory) / filename.format(language=language)
+            with medir(self.hooks, 'download_relatorio_pdf', language=language) as span:
+                resultado = self._download_relatorio(serializado, language, save_as, False,
+                                                     stream=save_as is not None, sink=None)
+                span.definir(status=resultado.get('status'))
+            return resultado
+
+        with ThreadPoolExecutor(max_workers=len(languages)) as executor:
+            pdfs = dict(zip(languages, executor.map(baixar, languages)))
+
+        resultado = {"status": "success", "pdfs": pdfs}
+        erros = [r.get('error') for r in pdfs.values() if r['status'] == 'error']
+        if erros:
+            resultado['status'] = 'error'
+            resultado['error'] = erros[0]
+
+        if verbose:
+            for language, pdf in pdfs.items():
+                if pdf['status'] != 'success':
+                    print(f"   ❌ {language}: {pdf.get('error')}")
+                elif 'pdf_path' in pdf:
+                    print(f"   ✓ {language}: {pdf['pdf_path']} ({pdf['file_size']} bytes)")
+                else:
+                    print(f"   ✓ {language}: {len(pdf['pdf_bytes'])} bytes")
+            print(f"{'='*60}\n")
+
+        return resultado
+
+    def validate_full(self, pdf_path, want=ETAPAS_VALIDACAO_COMPLETA, language="pt-br", save_as=None, verbose=False,
+                      filename=None, retention=None):
+        """
+        Valida o PDF com um único upload para /arquivo e gera os relatórios pedidos.
+
+        O json_bruto de /arquivo é enviado em paralelo para /simples e
+        /conformidade; se 'pdf' for pedido, o PDF do relatório é baixado em
+        seguida a partir do relatório de conformidade.
+
+        Args:
+            pdf_path: Caminho para o arquivo PDF, bytes ou objeto com read()
+            want: Etapas desejadas, entre "simples", "conformidade" e "pdf"
+            language: Idioma do PDF do relatório - "pt-br", "en" ou "es"
+            save_as: Caminho onde salvar o PDF do relatório (opcional)
+            verbose: Se True, mostra mensagens de progresso
+            filename: Nome do documento (padrão: nome do arquivo/stream)
+            retention: Política de retenção dos dados brutos (padrão: a do cliente)
+
+        Returns:
+            dict contendo:
+            - status: 'success', 'invalid' (sem assinatura) ou 'error'
+            - simples: Resultado no formato de validate_pdf() (se pedido)
+            - conformidade: Resultado no formato de get_conformidade_report() (se pedido)
+            - pdf: Resultado no formato de download_relatorio_pdf() (se pedido)
+            - timings: Duração (segundos) de cada etapa e o total
+            - error: Mensagem de erro (se houver)
+        """
+        want = tuple(want)
+        desconhecidas = set(want) - set(ETAPAS_VALIDACAO_COMPLETA)
+        if desconhecidas:
+            raise ValueError(f"Etapas inválidas: {sorted(desconhecidas)}. Use {ETAPAS_VALIDACAO_COMPLETA}")
+        # O PDF do relatório é gerado a partir do relatório de conformidade
+        etapas_json = [e for e in ('simples', 'conformidade') if e in want or (e == 'conformidade' and 'pdf' in want)]
+
+        documento = abrir_documento(pdf_path, filename)
+        try:
+            with medir(self.hooks, 'validate_full') as span:
+                verificacao = self._preflight(documento)
+                resultado = self._validate_full_documento(documento, want, etapas_json, language, save_as, verbose,
+                                                          verificacao)
+                resultado = anotar_preflight(resultado, verificacao)
+                span.definir(status=resultado.get('status'))
+            return self._reter(resultado, retention)
+        finally:
+            if documento is not pdf_path:
+                documento.close()
+
+    def _validate_full_documento(self, documento, want, etapas_json, language, save_as, verbose, verificacao=None):
+        inicio = time.perf_counter()
+        timings = {}
+        resultado = {"status": "success", "timings": timings}
+
+        if verbose:
+            print(f"\n{'='*60}")
+            print(f"Validação completa: {documento.nome} ({', '.join(want)})")
+            print(f"{'='*60}\n")
+
+        sem_assinatura = verificar_preflight(verificacao, verbose)
+        if sem_assinatura is not None:
+            timings['total'] = time.perf_counter() - inicio
+            sem_assinatura["timings"] = timings
+            return sem_assinatura
+
+        # Etapas já presentes no cache não precisam do upload
+        digest = None
+        if self.cache is not None:
+            t = time.perf_counter()
+            digest = documento.sha256()
+            for etapa in etapas_json:
+                em_cache = self.cache.get(digest, etapa)
+                if em_cache is not None:
+                    resultado[etapa] = em_cache
+            timings['cache'] = time.perf_counter() - t
+        pendentes = [e for e in etapas_json if e not in resultado]
+
+        if pendentes:
+            if verbose:
+                print("📤 Enviando PDF para /arquivo...")
+            t = time.perf_counter()
+            try:
+                response = self.post_arquivo(documento)
+                timings['arquivo'] = time.perf_counter() - t
+
+                if verbose:
+                    print(f"   Status: {response.status_code}")
+
+                falha = resultado_falha_arquivo(response, "Erro HTTP {status} em /arquivo")
+                if falha is not None:
+                    for etapa in pendentes:
+                        self._cache_set(digest, etapa, falha)
+                    timings['total'] = time.perf_counter() - inicio
+                    # Novo dict: o guardado no cache não recebe os timings desta chamada
+                    return {**falha, "timings": timings}
+
+                json_bruto = corpo_arquivo(response)
+            except Exception as e:
+                timings['arquivo'] = time.perf_counter() - t
+                timings['total'] = time.perf_counter() - inicio
+                return {
+                    "status": "error",
+                    "error": f"Erro ao chamar /arquivo: {str(e)}",
+                    "timings": timings
+                }
+
+            def executar(etapa):
+                t = time.perf_counter()
+                try:
+                    if etapa == 'simples':
+                        return resultado_simples(self.post_simples(json_bruto), json_bruto, documento.nome, self.hooks)
+                    return resultado_conformidade(self.post_conformidade(json_bruto), json_bruto, self.hooks)
+                except Exception as e:
+                    return {
+                        "status": "error",
+                        "error": f"Erro ao processar /{etapa}: {str(e)}",
+                        "json_bruto": carregar_json_bruto(json_bruto, self.hooks)
+                    }
+                finally:
+                    timings[etapa] = time.perf_counter() - t
+
+            if verbose:
+                print(f"📥 Processando com {', '.join('/' + e for e in pendentes)}...")
+            if len(pendentes) == 1:
+                resultado[pendentes[0]] = executar(pendentes[0])
+            else:
+                with ThreadPoolExecutor(max_workers=len(pendentes)) as executor:
+                    for etapa, res in zip(pendentes, executor.map(executar, pendentes)):
+                        resultado[etapa] = res
+            for etapa in pendentes:
+                self._cache_set(digest, etapa, resultado[etapa])
+                if verbose:
+                    print(f"   /{etapa}: {resultado[etapa]['status']}")
+
+        if 'pdf' in want:
+            conformidade = resultado['conformidade']
+            if conformidade['status'] == 'success':
+                t = time.perf_counter()
+                resultado['pdf'] = self.download_relatorio_pdf(
+                    conformidade['relatorio_conformidade'], language=language, save_as=save_as, verbose=verbose
+                )
+                timings['downloadPdf'] = time.perf_counter() - t
+            else:
+                resultado['pdf'] = {
+                    "status": "error",
+                    "error": "Relatório de conformidade indisponível para gerar o PDF"
+                }
+            if 'conformidade' not in want:
+                del resultado['conformidade']
+
+        estados = [resultado[e]['status'] for e in want]
+        if 'error' in estados:
+            resultado['status'] = 'error'
+            resultado['error'] = next(resultado[e].get('error') for e in want if resultado[e]['status'] == 'error')
+        elif 'invalid' in estados:
+            resultado['status'] = 'invalid'
+
+        timings['total'] = time.perf_counter() - inicio
+        if verbose:
+            etapas = ', '.join(f"{k}={v:.3f}s" for k, v in timings.items())
+            print(f"{'='*60}")
+            print(f"Status: {resultado['status'].upper()} ({etapas})")
+            print(f"{'='*60}\n")
+        return resultado
+
+
+# ========================================
+# Cliente padrão usado pelas funções do módulo
+# ========================================
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_default_client():
+    """
+    Retorna o cliente compartilhado pelas funções do módulo.
+
+    É criado na primeira chamada. A variável de ambiente ITI_BASE_URL permite
+    apontá-lo para homologação ou para um servidor local.
+    """
+    global _default_client
+    if _default_client is None:
+        with _default_client_lock:
+            if _default_client is None:
+                _default_client = ItiClient(base_url=base_url_padrao())
+    return _default_client
+
+
+def set_default_client(client):
+    """
+    Substitui o cliente usado pelas funções do módulo.
+    Args:
+        client: ItiClient (ou None para recriar o padrão na próxima chamada)
+    Returns:
+        O cliente anterior (ou None)
+    """
+    global _default_client
+    with _default_client_lock:
+        anterior = _default_client
+        _default_client = client
+    return anterior
+
+
+def validate_pdf(pdf_path, verbose=False, filename=None, retention=None):
+    """
+    Valida assinaturas de PDF usando API direta do ITI.
+    Args:
+        pdf_path: Caminho para o arquivo PDF, bytes ou objeto com read()
+        verbose: Se True, mostra mensagens de progresso
+        filename: Nome do documento (padrão: nome do arquivo/stream)
+        retention: 'always', 'none', 'on_error' ou 'spill' (ver ItiClient)
+    Returns:
+        dict com resultado da validação
+    """
+    return get_default_client().validate_pdf(pdf_path, verbose=verbose, filename=filename, retention=retention)
+
+
+def validate_document(signed, detached=None, verbose=False, filename=None, retention=None):
+    """
+    Valida um documento assinado (PDF, XML, P7S ou JSON), com assinaturas destacadas opcionais.
+    Ver ItiClient.validate_document.
+    """
+    return get_default_client().validate_document(
+        signed, detached=detached, verbose=verbose, filename=filename, retention=retention
+    )
+
+
+def validate_url(url, verbose=False, fallback=True, filename=None, retention=None):
+    """
+    Valida um documento publicado em uma URL via /url (sem baixá-lo).
+    Ver ItiClient.validate_url.
+    """
+    return get_default_client().validate_url(
+        url, verbose=verbose, fallback=fallback, filename=filename, retention=retention
+    )
+
+
+def get_conformidade_report(pdf_path, verbose=False, filename=None, retention=None):
+    """
+    Obtém o relatório de conformidade completo do ITI (necessário para gerar PDF).
+    Ver ItiClient.get_conformidade_report.
+    """
+    return get_default_client().get_conformidade_report(
+        pdf_path, verbose=verbose, filename=filename, retention=retention
+    )
+
+
+def download_relatorio_pdf(relatorio_conformidade, language="pt-br", save_as=None, verbose=False,
+                           stream=False, sink=None):
+    """
+    Faz download do PDF do relatório de validação do ITI.
+    Ver ItiClient.download_relatorio_pdf.
+    """
+    return get_default_client().download_relatorio_pdf(
+        relatorio_conformidade, language=language, save_as=save_as, verbose=verbose,
+        stream=stream, sink=sink
+    )
+
+
+def download_relatorio_pdfs(relatorio_conformidade, languages=IDIOMAS_RELATORIO, directory=None,
+                            filename="relatorio_{language}.pdf", verbose=False):
+    """
+    Faz download do PDF do relatório em vários idiomas ao mesmo tempo.
+    Ver ItiClient.download_relatorio_pdfs.
+    """
+    return get_default_client().download_relatorio_pdfs(
+        relatorio_conformidade, languages=languages, directory=directory, filename=filename, verbose=verbose
+    )
+
+
+def validate_full(pdf_path, want=ETAPAS_VALIDACAO_COMPLETA, language="pt-br", save_as=None, verbose=False,
+                  filename=None, retention=None):
+    """
+    Valida o PDF com um único upload e gera os relatórios pedidos em `want`.
+    Ver ItiClient.validate_full.
+    """
+    return get_default_client().validate_full(
+        pdf_path, want=want, language=language, save_as=save_as, verbose=verbose, filename=filename,
+        retention=retention
+    )
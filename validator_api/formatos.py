@@ -0,0 +1,250 @@
+"""
+Formatos de documentos assinados aceitos por /arquivo e pareamento de
+assinaturas destacadas.
+
+O formato é detectado pelo conteúdo (magic bytes), não pela extensão:
+arquivos renomeados, sem extensão ou recebidos como bytes recebem o
+Content-Type correto e, quando o nome não tem uma extensão aceita pelo ITI,
+a extensão do formato detectado.
+
+Assinaturas destacadas (.p7s, .jws, .p7m...) vão em detached_files[], com o
+documento original em signature_files[]. Em lotes, parear_destacados
+encontra o original de cada assinatura pelo nome (contrato.pdf.p7s ->
+contrato.pdf, contrato.p7s -> contrato.*) ou, quando o nome não basta, pelo
+hash do conteúdo assinado (atributo messageDigest da assinatura CMS).
+"""
+
+import hashlib
+from collections import namedtuple
+from pathlib import Path
+
+from .upload import NOME_PADRAO, abrir_documento
+
+
+Formato = namedtuple('Formato', 'nome content_type extensao')
+
+PDF = Formato('pdf', 'application/pdf', '.pdf')
+XML = Formato('xml', 'application/xml', '.xml')
+JSON = Formato('json', 'application/json', '.json')
+CMS = Formato('p7s', 'application/pkcs7-signature', '.p7s')
+JWS = Formato('jws', 'application/jose', '.jws')
+DESCONHECIDO = Formato('desconhecido', 'application/octet-stream', '')
+
+# Extensões aceitas pelo ITI (ver API_ENDPOINTS_DOCUMENTATION.md)
+EXTENSOES_ASSINADO = ('.pdf', '.xml', '.p7s', '.json')
+EXTENSOES_DESTACADO = ('.p7s', '.jws', '.xml', '.p7m', '.json')
+
+# Assinaturas que, em um lote, são pareadas com o documento original
+EXTENSOES_PAREAVEIS = ('.p7s', '.p7m', '.jws')
+
+LIMITE_DETECCAO = 1024
+
+BOM_UTF8 = b'\xef\xbb\xbf'
+# OIDs em DER: pkcs7-signedData (1.2.840.113549.1.7.2) e messageDigest (1.2.840.113549.1.9.4)
+OID_SIGNED_DATA = bytes.fromhex('06092a864886f70d010702')
+OID_MESSAGE_DIGEST = bytes.fromhex('06092a864886f70d010904')
+CABECALHOS_PEM_CMS = (b'-----BEGIN PKCS7', b'-----BEGIN CMS')
+
+# Assinaturas destacadas são pequenas; o messageDigest fica nos atributos assinados
+LIMITE_LEITURA_CMS = 1024 * 1024
+ALGORITMOS_POR_TAMANHO = {20: 'sha1', 32: 'sha256', 48: 'sha384', 64: 'sha512'}
+
+
+def detectar_formato(dados):
+    """
+    Identifica o formato pelos primeiros bytes do conteúdo.
+    Args:
+        dados: Início do documento (LIMITE_DETECCAO bytes bastam)
+    Returns:
+        Formato (PDF, XML, JSON, CMS, JWS ou DESCONHECIDO)
+    """
+    # O cabeçalho do PDF pode vir depois de lixo inicial
+    if b'%PDF-' in dados[:LIMITE_DETECCAO]:
+        return PDF
+    if dados[:1] == b'\x30' and OID_SIGNED_DATA in dados[:64]:
+        return CMS
+    texto = dados[len(BOM_UTF8):] if dados.startswith(BOM_UTF8) else dados
+    texto = texto.lstrip()
+    if texto.startswith(CABECALHOS_PEM_CMS):
+        return CMS
+    if texto.startswith(b'<'):
+        return XML
+    if texto.startswith((b'{', b'[')):
+        return JSON
+    # JWS compacto: base64url de '{"' e três partes separadas por ponto
+    if texto.startswith(b'eyJ') and texto.count(b'.', 0, LIMITE_DETECCAO) >= 2:
+        return JWS
+    return DESCONHECIDO
+
+
+def _inicio(documento):
+    documento.rebobinar()
+    dados = documento.arquivo.read(min(LIMITE_DETECCAO, documento.tamanho))
+    documento.rebobinar()
+    return dados
+
+
+def _nome_para_envio(nome, formato, extensoes):
+    if nome == NOME_PADRAO and formato is not PDF and formato.extensao:
+        return Path(NOME_PADRAO).stem + formato.extensao
+    if Path(nome).suffix.lower() in extensoes or not formato.extensao:
+        return nome
+    return nome + formato.extensao
+
+
+def abrir_formatado(fonte, filename=None, destacado=False):
+    """
+    Abre a fonte como DocumentoUpload com Content-Type do formato detectado.
+
+    O nome só é alterado quando não foi informado em `filename` e não tem uma
+    extensão aceita pelo ITI (recebe a extensão do formato detectado).
+
+    Args:
+        fonte: Caminho, bytes, objeto com read() ou DocumentoUpload
+        filename: Nome do documento (mantido como informado)
+        destacado: Se True, usa as extensões aceitas em detached_files[]
+    Returns:
+        DocumentoUpload
+    """
+    documento = abrir_documento(fonte, filename)
+    formato = detectar_formato(_inicio(documento))
+    documento.content_type = formato.content_type
+    if filename is None:
+        extensoes = EXTENSOES_DESTACADO if destacado else EXTENSOES_ASSINADO
+        documento.nome = _nome_para_envio(documento.nome, formato, extensoes)
+    return documento
+
+
+def digest_assinado(dados):
+    """
+    Hash do conteúdo assinado declarado em uma assinatura CMS (.p7s/.p7m).
+    Args:
+        dados: Bytes da assinatura (DER)
+    Returns:
+        Tupla (algoritmo, digest em hexadecimal), ou None se não encontrado
+    """
+    pos = dados.find(OID_MESSAGE_DIGEST)
+    if pos == -1:
+        return None
+    # OID, SET { OCTET STRING digest } com comprimentos curtos (< 128 bytes)
+    pos += len(OID_MESSAGE_DIGEST)
+    if dados[pos:pos + 1] != b'\x31' or dados[pos + 2:pos + 3] != b'\x04':
+        return None
+    tamanho = dados[pos + 3]
+    algoritmo = ALGORITMOS_POR_TAMANHO.get(tamanho)
+    digest = dados[pos + 4:pos + 4 + tamanho]
+    if algoritmo is None or len(digest) != tamanho:
+        return None
+    return algoritmo, digest.hex()
+
+
+class ParDocumento(namedtuple('ParDocumento', 'assinado destacados')):
+    """
+    Documento de um lote com as assinaturas destacadas encontradas para ele.
+
+    Atributos:
+        assinado: Path do documento enviado em signature_files[]
+        destacados: Tupla de Paths enviados em detached_files[] (pode ser vazia)
+    """
+
+    __slots__ = ()
+
+    def __str__(self):
+        return str(self.assinado)
+
+
+def _hash_arquivo(path, algoritmo):
+    h = hashlib.new(algoritmo)
+    with open(path, 'rb') as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+class _IndiceOriginais:
+    """Índice dos documentos do lote por nome, por nome sem extensão e (sob demanda) por hash."""
+
+    def __init__(self, caminhos):
+        self.caminhos = caminhos
+        self.por_nome = {}
+        self.por_stem = {}
+        for path in caminhos:
+            self.por_nome.setdefault(path.name, []).append(path)
+            self.por_stem.setdefault(path.stem, []).append(path)
+        self._hashes = {}
+        self._por_hash = {}
+
+    def hash(self, path, algoritmo):
+        chave = (path, algoritmo)
+        if chave not in self._hashes:
+            try:
+                self._hashes[chave] = _hash_arquivo(path, algoritmo)
+            except OSError:
+                self._hashes[chave] = None
+        return self._hashes[chave]
+
+    def por_hash(self, algoritmo, digest):
+        # O índice completo só é montado quando o nome não resolve o pareamento
+        indice = self._por_hash.get(algoritmo)
+        if indice is None:
+            indice = self._por_hash[algoritmo] = {}
+            for path in self.caminhos:
+                indice.setdefault(self.hash(path, algoritmo), path)
+        return indice.get(digest)
+
+    def por_nome_de(self, assinatura):
+        """Original pelo nome: contrato.pdf.p7s -> contrato.pdf; contrato.p7s -> contrato.*"""
+        candidatos = self.por_nome.get(assinatura.stem) or self.por_stem.get(assinatura.stem) or []
+        # Prefere o original do mesmo diretório; fora dele, só se for único
+        mesmos = [c for c in candidatos if c.parent == assinatura.parent]
+        if len(mesmos) == 1:
+            return mesmos[0]
+        if not mesmos and len(candidatos) == 1:
+            return candidatos[0]
+        return None
+
+
+def _ler_assinatura(path):
+    try:
+        with open(path, 'rb') as f:
+            return f.read(LIMITE_LEITURA_CMS)
+    except OSError:
+        return b''
+
+
+def parear_destacados(caminhos):
+    """
+    Agrupa as assinaturas destacadas de um lote com os documentos originais.
+
+    Cada assinatura (.p7s, .p7m, .jws) é associada ao original pelo nome.
+    Quando a assinatura CMS declara o hash do conteúdo assinado e ele não
+    confere com o do original encontrado (ou nenhum foi encontrado), o
+    original é procurado pelo hash entre todos os documentos do lote.
+    Assinaturas sem original são tratadas como documentos (ex.: .p7s com o
+    conteúdo embutido).
+
+    Args:
+        caminhos: Iterável de caminhos (ver batch.listar_documentos)
+    Returns:
+        Lista de ParDocumento, na ordem dos documentos originais
+    """
+    caminhos = [Path(c) for c in caminhos]
+    assinaturas = [c for c in caminhos if c.suffix.lower() in EXTENSOES_PAREAVEIS]
+    originais = [c for c in caminhos if c.suffix.lower() not in EXTENSOES_PAREAVEIS]
+    indice = _IndiceOriginais(originais)
+
+    destacados = {}
+    avulsas = []
+    for assinatura in assinaturas:
+        original = indice.por_nome_de(assinatura)
+        declarado = digest_assinado(_ler_assinatura(assinatura))
+        if declarado is not None and (original is None or indice.hash(original, declarado[0]) != declarado[1]):
+            original = indice.por_hash(*declarado) or original
+        if original is None:
+            avulsas.append(assinatura)
+        else:
+            destacados.setdefault(original, []).append(assinatura)
+
+    pares = [ParDocumento(c, tuple(destacados.get(c, ()))) for c in originais]
+    pares.extend(ParDocumento(c, ()) for c in avulsas)
+    return pares
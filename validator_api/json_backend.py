@@ -0,0 +1,129 @@
+"""
+Backend de JSON usado nas chamadas ao ITI, no cache e nas saídas em lote.
+
+Usa orjson ou msgspec quando instalados (bem mais rápidos que o módulo json
+em relatórios grandes) e o json da biblioteca padrão caso contrário. A
+variável de ambiente ITI_JSON_BACKEND ('orjson', 'msgspec' ou 'json') força
+um backend específico.
+
+As funções trabalham com bytes UTF-8, o formato que trafega na rede, de modo
+que respostas podem ser repassadas entre etapas sem decodificar e recodificar.
+"""
+
+import json
+import os
+
+
+BACKENDS = ("orjson", "msgspec", "json")
+
+TIPOS_BYTES = (bytes, bytearray, memoryview)
+
+
+def _funcoes_json():
+    def loads(dados):
+        return json.loads(bytes(dados) if isinstance(dados, memoryview) else dados)
+
+    def dumps(valor, sort_keys=False):
+        return json.dumps(valor, ensure_ascii=False, sort_keys=sort_keys, separators=(',', ':')).encode('utf-8')
+
+    return loads, dumps
+
+
+def _funcoes_orjson():
+    import orjson
+
+    def dumps(valor, sort_keys=False):
+        return orjson.dumps(valor, option=orjson.OPT_SORT_KEYS if sort_keys else 0)
+
+    return orjson.loads, dumps
+
+
+def _funcoes_msgspec():
+    import msgspec
+
+    def loads(dados):
+        try:
+            return msgspec.json.decode(dados)
+        except msgspec.DecodeError as e:
+            # Mesmo contrato dos outros backends (JSON inválido -> ValueError)
+            raise ValueError(str(e)) from None
+
+    def dumps(valor, sort_keys=False):
+        return msgspec.json.encode(valor, order='sorted' if sort_keys else None)
+
+    return loads, dumps
+
+
+_FABRICAS = {
+    "orjson": _funcoes_orjson,
+    "msgspec": _funcoes_msgspec,
+    "json": _funcoes_json,
+}
+
+BACKEND = None
+_loads = _dumps = None
+
+
+def usar_backend(nome=None):
+    """
+    Seleciona o backend de JSON.
+    Args:
+        nome: 'orjson', 'msgspec' ou 'json' (None = o mais rápido instalado)
+    Returns:
+        str com o nome do backend em uso
+    Raises:
+        ValueError: Se o nome for inválido
+        ImportError: Se o backend pedido não estiver instalado
+    """
+    global BACKEND, _loads, _dumps
+    if nome is not None and nome not in BACKENDS:
+        raise ValueError(f"Backend de JSON inválido: {nome}. Use {BACKENDS}")
+    for candidato in ((nome,) if nome else BACKENDS):
+        try:
+            _loads, _dumps = _FABRICAS[candidato]()
+        except ImportError:
+            if nome:
+                raise ImportError(f"Backend de JSON '{nome}' não instalado: pip install {nome}") from None
+            continue
+        BACKEND = candidato
+        return BACKEND
+
+
+def loads(dados):
+    """Decodifica JSON (bytes, bytearray, memoryview ou str)."""
+    return _loads(dados)
+
+
+def dumps(valor, sort_keys=False):
+    """
+    Codifica um valor em JSON compacto.
+    Args:
+        valor: Objeto serializável
+        sort_keys: Se True, ordena as chaves (forma canônica)
+    Returns:
+        bytes em UTF-8
+    """
+    return _dumps(valor, sort_keys)
+
+
+def como_bytes(valor):
+    """Corpo JSON em bytes: bytes são repassados como estão, o resto é codificado."""
+    if isinstance(valor, TIPOS_BYTES):
+        return valor
+    return _dumps(valor, False)
+
+
+def json_ou_texto(dados):
+    """
+    Decodifica um JSON recebido em bytes; se não for um JSON válido, retorna o
+    texto. Valores que não são bytes são retornados como estão.
+    """
+    if not isinstance(dados, TIPOS_BYTES):
+        return dados
+    try:
+        return _loads(dados)
+    except ValueError:
+        return bytes(dados).decode('utf-8', errors='replace')
+
+
+usar_backend(os.environ.get("ITI_JSON_BACKEND") or None)
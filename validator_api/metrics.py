@@ -0,0 +1,372 @@
+"""
+Instrumentação das chamadas ao ITI: spans por etapa e contadores.
+
+Os clientes aceitam hooks (MetricsHook) no estilo dos SpanProcessors do
+OpenTelemetry: cada etapa gera um Span com nome, atributos e duração,
+entregue em on_start/on_end, e os volumes transferidos chegam por on_counter.
+
+Etapas (nome do span):
+- validate_pdf, validate_document, validate_url, get_conformidade_report,
+  download_relatorio_pdf, validate_full: a operação inteira (atributo status;
+  em validate_url, também origem)
+- http: cada tentativa de requisição (endpoint, tentativa, status_code)
+- upload / espera_resposta: envio do corpo de /arquivo e espera pela resposta
+- json_decode: decodificação das respostas JSON (endpoint)
+- process_relatorio: estruturação do relatório de /simples
+- cache: consulta ao cache local, incluindo o hash do documento (hit)
+- preflight: verificação local de assinaturas (assinaturas)
+- preparacao: hash e verificação local no pool de processos do Pipeline (status)
+
+Contadores: bytes_enviados e bytes_recebidos (endpoint) e chamadas_coalescidas
+(endpoint; chamadas atendidas pelo single-flight, ver singleflight).
+
+Sem hooks instalados, medir() devolve um span nulo compartilhado e nenhum
+relógio é consultado, de modo que o custo fica em uma chamada de função.
+"""
+
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+
+BUCKETS_PADRAO = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class MetricsHook:
+    """
+    Interface dos hooks de instrumentação. Todos os métodos são opcionais:
+    subclasses sobrescrevem apenas os que interessam.
+    """
+
+    def on_start(self, span):
+        """Chamado quando uma etapa começa."""
+
+    def on_end(self, span):
+        """Chamado quando uma etapa termina (span.duracao já está disponível)."""
+
+    def on_counter(self, nome, valor, atributos):
+        """Chamado para somar `valor` ao contador `nome` (ex.: bytes_enviados)."""
+
+
+class Span:
+    """
+    Medição de uma etapa, usada como context manager.
+
+    Atributos:
+        nome: Nome da etapa
+        atributos: dict de atributos (endpoint, status_code, ...)
+        inicio: time.perf_counter() no início
+        inicio_ns: time.time_ns() no início (relógio de parede, para exportadores)
+        fim: time.perf_counter() no fim (None enquanto em andamento)
+        erro: Nome da exceção que interrompeu a etapa, se houver
+    """
+
+    __slots__ = ('nome', 'atributos', 'inicio', 'inicio_ns', 'fim', 'erro', '_hooks')
+
+    def __init__(self, hooks, nome, atributos):
+        self._hooks = hooks
+        self.nome = nome
+        self.atributos = atributos
+        self.inicio = None
+        self.inicio_ns = None
+        self.fim = None
+        self.erro = None
+
+    def __repr__(self):
+        return f"Span({self.nome!r}, {self.atributos!r})"
+
+    @property
+    def duracao(self):
+        """Duração em segundos (None enquanto em andamento)."""
+        if self.fim is None:
+            return None
+        return self.fim - self.inicio
+
+    def definir(self, **atributos):
+        """Acrescenta atributos ao span."""
+        self.atributos.update(atributos)
+
+    def __enter__(self):
+        self.inicio_ns = time.time_ns()
+        self.inicio = time.perf_counter()
+        for hook in self._hooks:
+            hook.on_start(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.fim = time.perf_counter()
+        if exc_type is not None:
+            self.erro = exc_type.__name__
+        for hook in self._hooks:
+            hook.on_end(self)
+
+
+class _SpanNulo:
+    __slots__ = ()
+
+    def definir(self, **atributos):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+
+SPAN_NULO = _SpanNulo()
+
+
+def normalizar_hooks(hooks):
+    """Converte None, um hook ou uma lista de hooks em tupla."""
+    if hooks is None:
+        return ()
+    if isinstance(hooks, MetricsHook):
+        return (hooks,)
+    return tuple(hooks)
+
+
+def medir(hooks, nome, **atributos):
+    """
+    Mede uma etapa.
+
+    Exemplo:
+        with medir(self.hooks, 'json_decode', endpoint='simples'):
+            dados = response.json()
+
+    Args:
+        hooks: Tupla de MetricsHook (vazia = nada é medido)
+        nome: Nome da etapa
+        **atributos: Atributos iniciais do span
+    Returns:
+        Span (ou o span nulo compartilhado, se não houver hooks)
+    """
+    if not hooks:
+        return SPAN_NULO
+    return Span(hooks, nome, atributos)
+
+
+def registrar_span(hooks, nome, inicio, fim, **atributos):
+    """
+    Registra uma etapa já concluída, medida com time.perf_counter().
+    Args:
+        hooks: Tupla de MetricsHook
+        nome: Nome da etapa
+        inicio, fim: Instantes (perf_counter) de início e fim
+        **atributos: Atributos do span
+    """
+    if not hooks:
+        return
+    span = Span(hooks, nome, atributos)
+    span.inicio = inicio
+    span.fim = fim
+    span.inicio_ns = time.time_ns() - int((time.perf_counter() - inicio) * 1e9)
+    for hook in hooks:
+        hook.on_start(span)
+    for hook in hooks:
+        hook.on_end(span)
+
+
+def contar(hooks, nome, valor, **atributos):
+    """Soma `valor` ao contador `nome` em todos os hooks."""
+    for hook in hooks:
+        hook.on_counter(nome, valor, atributos)
+
+
+def tamanho_requisicao(headers):
+    """Bytes do corpo enviado, a partir do Content-Length da requisição."""
+    try:
+        return int(headers.get('Content-Length') or 0)
+    except ValueError:
+        return 0
+
+
+def _escapar_label(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(pares):
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{nome}="{_escapar_label(valor)}"' for nome, valor in pares) + "}"
+
+
+def _numero(valor):
+    if valor == float('inf'):
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class PrometheusExporter(MetricsHook):
+    """
+    Hook que agrega as medições no formato de texto do Prometheus.
+
+    Métricas geradas (com o prefixo `namespace`):
+    - <ns>_stage_duration_seconds (histograma por etapa e endpoint)
+    - <ns>_stage_errors_total (etapas interrompidas por exceção)
+    - <ns>_http_responses_total (respostas por endpoint e status HTTP;
+      status="error" para falhas de conexão/timeout)
+    - <ns>_bytes_total (bytes enviados/recebidos por endpoint)
+    - <ns>_coalesced_total (chamadas atendidas pelo single-flight, por endpoint)
+
+    Args:
+        namespace: Prefixo dos nomes das métricas
+        buckets: Limites (segundos) dos buckets do histograma
+    """
+
+    def __init__(self, namespace="validador_iti", buckets=BUCKETS_PADRAO):
+        self.namespace = namespace
+        self.buckets = tuple(sorted(buckets))
+        # (etapa, endpoint) -> [contagens por bucket..., soma, total]
+        self._duracoes = {}
+        self._erros = {}
+        self._respostas = {}
+        self._bytes = {}
+        self._coalescidas = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"PrometheusExporter(namespace={self.namespace!r})"
+
+    def on_end(self, span):
+        duracao = span.duracao
+        chave = (span.nome, span.atributos.get('endpoint', ''))
+        with self._lock:
+            serie = self._duracoes.get(chave)
+            if serie is None:
+                serie = self._duracoes[chave] = [0] * len(self.buckets) + [0.0, 0]
+            for i, limite in enumerate(self.buckets):
+                if duracao <= limite:
+                    serie[i] += 1
+            serie[-2] += duracao
+            serie[-1] += 1
+            if span.erro is not None:
+                self._erros[chave] = self._erros.get(chave, 0) + 1
+            if span.nome == 'http':
+                status = span.atributos.get('status_code')
+                chave_status = (chave[1], 'error' if status is None else str(status))
+                self._respostas[chave_status] = self._respostas.get(chave_status, 0) + 1
+
+    def on_counter(self, nome, valor, atributos):
+        if nome == 'chamadas_coalescidas':
+            endpoint = atributos.get('endpoint', '')
+            with self._lock:
+                self._coalescidas[endpoint] = self._coalescidas.get(endpoint, 0) + valor
+            return
+        if nome not in ('bytes_enviados', 'bytes_recebidos'):
+            return
+        direcao = 'enviados' if nome == 'bytes_enviados' else 'recebidos'
+        chave = (atributos.get('endpoint', ''), direcao)
+        with self._lock:
+            self._bytes[chave] = self._bytes.get(chave, 0) + valor
+
+    def render(self):
+        """
+        Retorna as métricas no formato de exposição em texto do Prometheus.
+        Returns:
+            str pronto para servir em /metrics ou gravar para o textfile collector
+        """
+        ns = self.namespace
+        linhas = []
+        with self._lock:
+            linhas.append(f"# HELP {ns}_stage_duration_seconds Duração de cada etapa da validação")
+            linhas.append(f"# TYPE {ns}_stage_duration_seconds histogram")
+            for (etapa, endpoint), serie in sorted(self._duracoes.items()):
+                base = [("stage", etapa), ("endpoint", endpoint)]
+                for limite, contagem in zip(self.buckets + (float('inf'),), serie[:-2] + [serie[-1]]):
+                    linhas.append(
+                        f"{ns}_stage_duration_seconds_bucket{_labels(base + [('le', _numero(limite))])} {contagem}"
+                    )
+                linhas.append(f"{ns}_stage_duration_seconds_sum{_labels(base)} {_numero(serie[-2])}")
+                linhas.append(f"{ns}_stage_duration_seconds_count{_labels(base)} {serie[-1]}")
+
+            linhas.append(f"# HELP {ns}_stage_errors_total Etapas interrompidas por exceção")
+            linhas.append(f"# TYPE {ns}_stage_errors_total counter")
+            for (etapa, endpoint), total in sorted(self._erros.items()):
+                linhas.append(f"{ns}_stage_errors_total{_labels([('stage', etapa), ('endpoint', endpoint)])} {total}")
+
+            linhas.append(f"# HELP {ns}_http_responses_total Respostas HTTP por endpoint e status")
+            linhas.append(f"# TYPE {ns}_http_responses_total counter")
+            for (endpoint, status), total in sorted(self._respostas.items()):
+                linhas.append(f"{ns}_http_responses_total{_labels([('endpoint', endpoint), ('status', status)])} {total}")
+
+            linhas.append(f"# HELP {ns}_bytes_total Bytes transferidos por endpoint e direção")
+            linhas.append(f"# TYPE {ns}_bytes_total counter")
+            for (endpoint, direcao), total in sorted(self._bytes.items()):
+                linhas.append(f"{ns}_bytes_total{_labels([('endpoint', endpoint), ('direction', direcao)])} {total}")
+
+            linhas.append(f"# HELP {ns}_coalesced_total Chamadas atendidas pelo resultado de uma chamada simultânea")
+            linhas.append(f"# TYPE {ns}_coalesced_total counter")
+            for endpoint, total in sorted(self._coalescidas.items()):
+                linhas.append(f"{ns}_coalesced_total{_labels([('endpoint', endpoint)])} {total}")
+        return "\n".join(linhas) + "\n"
+
+    def write(self, path):
+        """
+        Grava as métricas em um arquivo de forma atômica (ex.: para o
+        textfile collector do node_exporter).
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(self.render())
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def reset(self):
+        """Zera todas as métricas."""
+        with self._lock:
+            self._duracoes.clear()
+            self._erros.clear()
+            self._respostas.clear()
+            self._bytes.clear()
+            self._coalescidas.clear()
+
+
+class OpenTelemetryHook(MetricsHook):
+    """
+    Encaminha spans e contadores para a API do OpenTelemetry.
+
+    Não importa o OpenTelemetry: recebe um tracer e/ou meter já configurados
+    (ex.: trace.get_tracer("validador_iti") e metrics.get_meter("validador_iti")).
+
+    Args:
+        tracer: Tracer do OpenTelemetry (opcional)
+        meter: Meter do OpenTelemetry (opcional)
+        prefixo: Prefixo dos nomes dos spans e contadores
+    """
+
+    def __init__(self, tracer=None, meter=None, prefixo="validador_iti."):
+        self.tracer = tracer
+        self.meter = meter
+        self.prefixo = prefixo
+        self._contadores = {}
+        self._lock = threading.Lock()
+
+    def on_end(self, span):
+        if self.tracer is None:
+            return
+        atributos = {k: v for k, v in span.atributos.items() if v is not None}
+        if span.erro is not None:
+            atributos['erro'] = span.erro
+        otel_span = self.tracer.start_span(self.prefixo + span.nome, start_time=span.inicio_ns,
+                                           attributes=atributos)
+        otel_span.end(end_time=span.inicio_ns + int(span.duracao * 1e9))
+
+    def on_counter(self, nome, valor, atributos):
+        if self.meter is None:
+            return
+        contador = self._contadores.get(nome)
+        if contador is None:
+            with self._lock:
+                contador = self._contadores.get(nome)
+                if contador is None:
+                    unidade = "By" if nome.startswith('bytes_') else "1"
+                    contador = self._contadores[nome] = self.meter.create_counter(self.prefixo + nome, unit=unidade)
+        contador.add(valor, atributos)
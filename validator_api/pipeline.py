@@ -0,0 +1,318 @@
+"""
+Pipeline em etapas para lotes grandes: preparação local em processos e
+chamadas ao ITI em threads.
+
+Hash SHA-256, verificação local (preflight) e leitura do cabeçalho/trailer
+do PDF usam CPU e disco; em threads eles disputam o GIL com o tratamento das
+respostas do ITI. O Pipeline separa as etapas:
+
+    caminhos -> [pool de processos: preparar_documento] -> fila limitada
+             -> [threads de E/S: client.validate_pdf ...] -> fila limitada -> run()
+
+As filas têm tamanho fixo, de modo que uma etapa mais rápida fica bloqueada
+(back-pressure) em vez de acumular documentos preparados ou resultados na
+memória. O hash calculado no processo é repassado ao DocumentoUpload, então
+o cache local não lê o arquivo de novo.
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from .client import ItiClient, base_url_padrao
+from .formatos import ParDocumento
+from .metrics import registrar_span
+from .preflight import inspecionar_pdf
+from .upload import DocumentoUpload
+
+
+OPERACOES_PIPELINE = ("validate_pdf", "get_conformidade_report", "validate_full")
+
+MARCADOR_VERSAO = b'%PDF-'
+MARCADOR_CRIPTOGRAFIA = b'/Encrypt'
+# O /Encrypt fica no trailer (ou no dicionário do xref stream), no fim do arquivo
+TAMANHO_TRAILER = 64 * 1024
+
+# Intervalo em que as threads bloqueadas em filas verificam o pedido de parada
+INTERVALO_PARADA = 0.1
+
+_FIM = object()
+
+
+def _versao_pdf(cabecalho):
+    pos = cabecalho.find(MARCADOR_VERSAO)
+    if pos == -1:
+        return None
+    versao = cabecalho[pos + len(MARCADOR_VERSAO):pos + len(MARCADOR_VERSAO) + 3]
+    return versao.decode('ascii', errors='replace')
+
+
+def preparar_documento(path):
+    """
+    Pré-processamento local de um PDF (executado no pool de processos).
+
+    Args:
+        path: Caminho do arquivo
+    Returns:
+        dict contendo:
+        - sha256: Hash do conteúdo
+        - tamanho: Tamanho em bytes
+        - versao_pdf: Versão do cabeçalho %PDF- (ex.: '1.7'), ou None
+        - criptografado: Se o trailer referencia /Encrypt
+        - preflight: Resultado de inspecionar_pdf
+        - duracao: Segundos gastos na preparação
+        Em caso de falha: status 'error' e error
+    """
+    inicio = time.perf_counter()
+    try:
+        with DocumentoUpload(path) as documento:
+            digest = documento.sha256()
+            verificacao = inspecionar_pdf(documento)
+            documento.rebobinar()
+            cabecalho = documento.arquivo.read(1024)
+            documento.arquivo.seek(documento.inicio + max(0, documento.tamanho - TAMANHO_TRAILER))
+            trailer = documento.arquivo.read(TAMANHO_TRAILER)
+            tamanho = documento.tamanho
+    except (OSError, ValueError) as e:
+        return {"status": "error", "error": str(e), "duracao": time.perf_counter() - inicio}
+    return {
+        "sha256": digest,
+        "tamanho": tamanho,
+        "versao_pdf": _versao_pdf(cabecalho),
+        "criptografado": MARCADOR_CRIPTOGRAFIA in trailer,
+        "preflight": verificacao,
+        "duracao": time.perf_counter() - inicio,
+    }
+
+
+def _principal(item):
+    """Caminho do documento preparado (o original, para um ParDocumento)."""
+    return item.assinado if isinstance(item, ParDocumento) else item
+
+
+def _colocar(fila, item, parar):
+    """put() que desiste quando a parada é pedida. Retorna False nesse caso."""
+    while not parar.is_set():
+        try:
+            fila.put(item, timeout=INTERVALO_PARADA)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _retirar(fila, parar):
+    """get() que devolve _FIM quando a parada é pedida."""
+    while not parar.is_set():
+        try:
+            return fila.get(timeout=INTERVALO_PARADA)
+        except queue.Empty:
+            continue
+    return _FIM
+
+
+class Pipeline:
+    """
+    Pipeline reutilizável de validação em lote (ver o docstring do módulo).
+
+    Exemplo:
+        with Pipeline(client, process_workers=4, io_workers=16) as pipeline:
+            for path, resultado in pipeline.run(caminhos):
+                print(path, resultado['status'], resultado['arquivo']['sha256'])
+
+    Args:
+        client: ItiClient usado nas chamadas (padrão: um cliente novo, fechado em close())
+        process_workers: Processos de preparação (None = os.cpu_count(); 0 =
+            prepara na thread de alimentação, sem pool de processos)
+        io_workers: Threads de chamadas ao ITI
+        queue_size: Capacidade de cada fila entre as etapas (padrão: 2x io_workers)
+        operation: Método do cliente chamado por documento ('validate_pdf',
+            'get_conformidade_report' ou 'validate_full'); itens ParDocumento
+            (ver formatos.parear_destacados) usam validate_document
+        preparar: Função de preparação (precisa ser serializável com pickle
+            para rodar no pool de processos)
+        mp_context: Contexto de multiprocessing do pool (ex.: multiprocessing.get_context('spawn'))
+    """
+
+    def __init__(self, client=None, process_workers=None, io_workers=8, queue_size=None,
+                 operation="validate_pdf", preparar=preparar_documento, mp_context=None):
+        if operation not in OPERACOES_PIPELINE:
+            raise ValueError(f"Operação inválida: {operation}. Use {OPERACOES_PIPELINE}")
+        if io_workers < 1:
+            raise ValueError("io_workers deve ser >= 1")
+        if process_workers is None:
+            process_workers = os.cpu_count() or 1
+        if process_workers < 0:
+            raise ValueError("process_workers deve ser >= 0")
+
+        self._fechar_cliente = client is None
+        self.client = client if client is not None else ItiClient(base_url=base_url_padrao(),
+                                                                  pool_maxsize=io_workers)
+        self.process_workers = process_workers
+        self.io_workers = io_workers
+        self.queue_size = queue_size or io_workers * 2
+        self.operation = operation
+        self.preparar = preparar
+        self.mp_context = mp_context
+        self._executor = None
+
+    def __repr__(self):
+        return (f"Pipeline(process_workers={self.process_workers}, io_workers={self.io_workers}, "
+                f"operation={self.operation!r})")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """Encerra o pool de processos (e o cliente, se foi criado pelo Pipeline)."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        if self._fechar_cliente:
+            self.client.close()
+
+    def _pool(self):
+        if self.process_workers == 0:
+            return None
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.process_workers, mp_context=self.mp_context)
+            # Cria os processos agora, antes das threads do pipeline existirem
+            # (com fork, os filhos copiam apenas a thread que os criou)
+            self._executor.submit(os.getpid).result()
+        return self._executor
+
+    def _registrar(self, preparado):
+        fim = time.perf_counter()
+        duracao = preparado.get("duracao") or 0.0
+        registrar_span(self.client.hooks, 'preparacao', fim - duracao, fim,
+                       status=preparado.get('status', 'success'))
+
+    def _preparar(self, caminhos, executor, preparados, parar, falhas):
+        """Thread de alimentação: prepara os documentos e os entrega às threads de E/S."""
+        try:
+            if executor is None:
+                for path in caminhos:
+                    preparado = self.preparar(_principal(path))
+                    self._registrar(preparado)
+                    if not _colocar(preparados, (path, preparado), parar):
+                        return
+                return
+
+            caminhos = iter(caminhos)
+            pendentes = {}
+            try:
+                while not parar.is_set():
+                    # Mantém no máximo 2x process_workers preparações em andamento
+                    for path in caminhos:
+                        pendentes[executor.submit(self.preparar, _principal(path))] = path
+                        if len(pendentes) >= self.process_workers * 2:
+                            break
+                    if not pendentes:
+                        return
+                    prontos, _ = wait(pendentes, return_when=FIRST_COMPLETED)
+                    for futuro in prontos:
+                        path = pendentes.pop(futuro)
+                        try:
+                            preparado = futuro.result()
+                        except Exception as e:
+                            preparado = {"status": "error", "error": f"Falha na preparação: {e}"}
+                        self._registrar(preparado)
+                        if not _colocar(preparados, (path, preparado), parar):
+                            return
+            finally:
+                for futuro in pendentes:
+                    futuro.cancel()
+        except Exception as e:
+            # Erro ao listar os caminhos: repassado a quem consome run()
+            falhas.append(e)
+        finally:
+            for _ in range(self.io_workers):
+                if not _colocar(preparados, _FIM, parar):
+                    break
+
+    def processar(self, path, preparado):
+        """
+        Executa a operação do cliente para um documento já preparado.
+        Args:
+            path: Caminho do documento (ou ParDocumento)
+            preparado: Resultado de preparar_documento
+        Returns:
+            dict com o resultado da operação e 'arquivo' (metadados locais:
+            sha256, tamanho, versao_pdf, criptografado)
+        """
+        if preparado.get('status') == 'error':
+            return {"status": "error", "error": preparado.get('error')}
+        arquivo = {k: v for k, v in preparado.items() if k not in ("preflight", "duracao")}
+        try:
+            with DocumentoUpload(_principal(path), sha256=preparado.get('sha256')) as documento:
+                documento.preflight = preparado.get('preflight')
+                if isinstance(path, ParDocumento):
+                    resultado = self.client.validate_document(documento, path.destacados)
+                else:
+                    resultado = getattr(self.client, self.operation)(documento)
+        except Exception as e:
+            resultado = {"status": "error", "error": str(e)}
+        return {**resultado, "arquivo": arquivo}
+
+    def _consumir(self, preparados, resultados, parar):
+        """Thread de E/S: chama o ITI para cada documento preparado."""
+        try:
+            while True:
+                item = _retirar(preparados, parar)
+                if item is _FIM:
+                    return
+                path, preparado = item
+                if not _colocar(resultados, (path, self.processar(path, preparado)), parar):
+                    return
+        finally:
+            _colocar(resultados, _FIM, parar)
+
+    def run(self, caminhos):
+        """
+        Processa os documentos, entregando os resultados à medida que ficam prontos.
+
+        Se o gerador for fechado antes do fim (break, exceção), as threads
+        param e as preparações pendentes são canceladas.
+
+        Args:
+            caminhos: Iterável de caminhos (consumido sob demanda)
+        Yields:
+            (path, resultado) na ordem de conclusão
+        Raises:
+            Exceção levantada ao iterar `caminhos`, depois dos resultados já prontos
+        """
+        executor = self._pool()
+        parar = threading.Event()
+        preparados = queue.Queue(maxsize=self.queue_size)
+        resultados = queue.Queue(maxsize=self.queue_size)
+        falhas = []
+
+        threads = [threading.Thread(target=self._preparar, args=(caminhos, executor, preparados, parar, falhas),
+                                    name="pipeline-preparacao", daemon=True)]
+        threads += [
+            threading.Thread(target=self._consumir, args=(preparados, resultados, parar),
+                             name=f"pipeline-io-{i}", daemon=True)
+            for i in range(self.io_workers)
+        ]
+        for thread in threads:
+            thread.start()
+
+        ativos = self.io_workers
+        try:
+            while ativos:
+                item = resultados.get()
+                if item is _FIM:
+                    ativos -= 1
+                    continue
+                yield item
+            if falhas:
+                raise falhas[0]
+        finally:
+            parar.set()
+            for thread in threads:
+                thread.join()
@@ -0,0 +1,131 @@
+"""
+Verificação local (pre-flight) de assinaturas em PDFs, antes do upload.
+
+O dicionário de uma assinatura PDF nunca fica comprimido: o /ByteRange aponta
+para os bytes assinados do próprio arquivo e o /Contents precisa estar
+visível entre eles. Por isso basta procurar /ByteRange e o nome /Sig nos
+bytes do arquivo, sem interpretar a estrutura do PDF. A busca usa mmap
+(bytes.find em C, sem carregar o arquivo na memória) e, quando o documento
+não é um arquivo em disco, blocos com sobreposição.
+
+PDFs sem nenhum dos dois marcadores recebem 'invalid' sem ir ao ITI.
+Documentos que não são PDF (ex.: assinaturas .p7s) não são classificados.
+"""
+
+import io
+import mmap
+import tempfile
+
+from .upload import abrir_documento
+
+
+MARCADOR_PDF = b'%PDF-'
+# O cabeçalho pode vir depois de lixo inicial, dentro do primeiro 1 KB
+LIMITE_CABECALHO = 1024
+
+MARCADOR_BYTERANGE = b'/ByteRange'
+MARCADOR_SIG = b'/Sig'
+# Bytes que encerram um nome PDF (separa /Sig de /SigFlags, /SigQ...)
+DELIMITADORES = frozenset(b' \t\r\n\f\x00/<>[](){}%')
+# Bytes mantidos entre blocos para não perder marcadores na divisa
+MARGEM_BLOCO = len(MARCADOR_BYTERANGE) + 1
+
+TAMANHO_BLOCO_VERIFICACAO = 1024 * 1024
+
+
+def _contar_marcadores(dados, inicio, fim, limite):
+    """Conta os marcadores que começam em [inicio, limite), buscando até fim."""
+    assinaturas = 0
+    pos = dados.find(MARCADOR_BYTERANGE, inicio, fim)
+    while pos != -1 and pos < limite:
+        assinaturas += 1
+        pos = dados.find(MARCADOR_BYTERANGE, pos + len(MARCADOR_BYTERANGE), fim)
+
+    sig = 0
+    pos = dados.find(MARCADOR_SIG, inicio, fim)
+    while pos != -1 and pos < limite:
+        seguinte = pos + len(MARCADOR_SIG)
+        if seguinte >= fim or dados[seguinte] in DELIMITADORES:
+            sig += 1
+        pos = dados.find(MARCADOR_SIG, seguinte, fim)
+    return assinaturas, sig
+
+
+def _mapear(arquivo):
+    """mmap somente leitura do arquivo em disco, ou None se não for possível."""
+    # fileno() de um SpooledTemporaryFile o despejaria para o disco
+    if isinstance(arquivo, (io.BytesIO, tempfile.SpooledTemporaryFile)):
+        return None
+    try:
+        return mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+    except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+        return None
+
+
+def _verificar_mmap(mapa, inicio, tamanho):
+    fim = inicio + tamanho
+    pdf = mapa.find(MARCADOR_PDF, inicio, min(fim, inicio + LIMITE_CABECALHO)) != -1
+    return (pdf, *_contar_marcadores(mapa, inicio, fim, fim))
+
+
+def _verificar_blocos(documento, tamanho_bloco):
+    cabecalho = b""
+    assinaturas = sig = 0
+    janela = b""
+    for bloco in documento.blocos(tamanho_bloco):
+        if len(cabecalho) < LIMITE_CABECALHO:
+            cabecalho += bloco[:LIMITE_CABECALHO - len(cabecalho)]
+        janela += bloco
+        corte = len(janela) - MARGEM_BLOCO
+        if corte > 0:
+            a, s = _contar_marcadores(janela, 0, len(janela), corte)
+            assinaturas += a
+            sig += s
+            janela = janela[corte:]
+    documento.rebobinar()
+    a, s = _contar_marcadores(janela, 0, len(janela), len(janela))
+    return MARCADOR_PDF in cabecalho, assinaturas + a, sig + s
+
+
+def inspecionar_pdf(fonte, filename=None, tamanho_bloco=TAMANHO_BLOCO_VERIFICACAO):
+    """
+    Procura indícios de assinatura digital nos bytes de um documento.
+
+    Args:
+        fonte: Caminho, bytes, objeto com read() ou DocumentoUpload
+        filename: Nome do documento (apenas se fonte não for DocumentoUpload)
+        tamanho_bloco: Tamanho dos blocos lidos quando não é possível usar mmap
+    Returns:
+        dict contendo:
+        - pdf: Se o documento tem o cabeçalho %PDF-
+        - assinaturas: Número de dicionários de assinatura (/ByteRange)
+        - sig: Ocorrências do nome /Sig (/Type /Sig, /FT /Sig)
+        - sem_assinatura: True apenas para PDFs sem nenhum dos marcadores
+    """
+    documento = abrir_documento(fonte, filename)
+    try:
+        mapa = _mapear(documento.arquivo) if documento.tamanho else None
+        if mapa is not None:
+            with mapa:
+                pdf, assinaturas, sig = _verificar_mmap(mapa, documento.inicio, documento.tamanho)
+        else:
+            pdf, assinaturas, sig = _verificar_blocos(documento, tamanho_bloco)
+    finally:
+        if documento is not fonte:
+            documento.close()
+    return {
+        "pdf": pdf,
+        "assinaturas": assinaturas,
+        "sig": sig,
+        "sem_assinatura": pdf and not assinaturas and not sig,
+    }
+
+
+def resultado_sem_assinatura(verificacao):
+    """Resultado 'invalid' (mesmo formato do 400 de /arquivo) para um PDF sem assinatura."""
+    return {
+        "status": "invalid",
+        "error": "Documento sem assinatura ou inválido",
+        "details": "Nenhuma assinatura encontrada na verificação local (/ByteRange, /Sig)",
+        "preflight": verificacao
+    }
@@ -0,0 +1,230 @@
+"""
+Controle de taxa adaptativo e novas tentativas para os endpoints do ITI.
+
+AdaptiveRateLimiter é um token bucket compartilhado por todas as chamadas do
+processo, com ajuste AIMD: a taxa cai pela metade quando o ITI responde 429 ou
+503 (respeitando Retry-After) e volta a subir enquanto as respostas estão
+saudáveis. RetryPolicy define novas tentativas com backoff exponencial e
+jitter, com limite e orçamento próprios para cada endpoint.
+"""
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+
+# Respostas que indicam sobrecarga do ITI (reduzem a taxa)
+STATUS_THROTTLE = (429, 503)
+
+# Respostas que valem nova tentativa (as chamadas ao ITI não alteram estado)
+STATUS_RETRY = (429, 500, 502, 503, 504)
+
+MAX_RETRIES_ENDPOINT = {
+    'arquivo': 2,
+    'url': 2,
+    'simples': 3,
+    'conformidade': 3,
+    'downloadPdf': 3,
+}
+
+
+def parse_retry_after(valor):
+    """
+    Converte o header Retry-After em segundos.
+    Args:
+        valor: Conteúdo do header (segundos ou data HTTP), ou None
+    Returns:
+        float com os segundos de espera, ou None
+    """
+    if not valor:
+        return None
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(valor).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket com taxa ajustada por AIMD.
+
+    Thread-safe. reservar() não bloqueia: retorna quanto tempo o chamador deve
+    esperar, o que permite usar o mesmo limitador em threads (time.sleep) e em
+    asyncio (asyncio.sleep).
+
+    Args:
+        rate: Taxa inicial (requisições por segundo)
+        min_rate: Taxa mínima após reduções
+        max_rate: Taxa máxima após aumentos
+        burst: Capacidade do balde (rajada máxima sem espera)
+        decrease_factor: Fator multiplicativo aplicado em 429/503
+        increase: Aumento aditivo da taxa, em req/s, a cada ~1s de respostas saudáveis
+    """
+
+    def __init__(self, rate=10.0, min_rate=0.5, max_rate=100.0, burst=10,
+                 decrease_factor=0.5, increase=1.0):
+        self.rate = float(rate)
+        self.min_rate = float(min_rate)
+        self.max_rate = float(max_rate)
+        self.burst = float(burst)
+        self.decrease_factor = decrease_factor
+        self.increase = increase
+        self._tokens = self.burst
+        self._atualizado_em = time.monotonic()
+        self._pausa_ate = 0.0
+        self._ultima_reducao = 0.0
+        # Até a primeira sobrecarga (slow start) a taxa cresce 1 req/s a cada
+        # resposta saudável: aumento aditivo por resposta, não por segundo
+        self._slow_start = True
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"AdaptiveRateLimiter(rate={self.rate:.2f})"
+
+    def _repor(self, agora):
+        self._tokens = min(self.burst, self._tokens + (agora - self._atualizado_em) * self.rate)
+        self._atualizado_em = agora
+
+    def reservar(self):
+        """
+        Reserva uma requisição.
+        Returns:
+            float com os segundos que o chamador deve aguardar antes de enviá-la
+        """
+        with self._lock:
+            agora = time.monotonic()
+            self._repor(agora)
+            self._tokens -= 1
+            espera = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            return max(espera, self._pausa_ate - agora)
+
+    def acquire(self):
+        """Bloqueia a thread até a requisição poder ser enviada."""
+        espera = self.reservar()
+        if espera > 0:
+            time.sleep(espera)
+
+    def registrar(self, status_code, retry_after=None):
+        """
+        Ajusta a taxa conforme a resposta recebida.
+        Args:
+            status_code: Status HTTP (ou None para falhas de conexão/timeout)
+            retry_after: Segundos indicados pelo header Retry-After (opcional)
+        """
+        with self._lock:
+            agora = time.monotonic()
+            if retry_after:
+                self._pausa_ate = max(self._pausa_ate, agora + retry_after)
+            if status_code in STATUS_THROTTLE or status_code is None:
+                self._slow_start = False
+                # Uma redução por "janela": respostas da mesma rajada não
+                # derrubam a taxa várias vezes seguidas
+                if agora - self._ultima_reducao >= 1.0 / self.rate:
+                    self._repor(agora)
+                    self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+                    self._tokens = min(self._tokens, 0.0)
+                    self._ultima_reducao = agora
+            elif status_code < 500:
+                self._repor(agora)
+                if self._slow_start:
+                    # +1 req/s por resposta (aditivo), sem esperar ~1s de respostas
+                    self.rate = min(self.max_rate, self.rate + 1.0)
+                else:
+                    self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+
+
+class RetryPolicy:
+    """
+    Política de novas tentativas com backoff exponencial e jitter ("full jitter").
+
+    Cada endpoint tem um limite de tentativas extras por chamada e um orçamento
+    compartilhado: cada requisição inicial deposita `budget_ratio` fichas e cada
+    nova tentativa consome uma, de modo que, com o ITI fora do ar, as novas
+    tentativas ficam limitadas a uma fração do tráfego.
+
+    Args:
+        max_retries: dict endpoint -> tentativas extras (ou int para todos)
+        backoff_base: Espera base (segundos) da primeira nova tentativa
+        backoff_max: Espera máxima entre tentativas
+        budget_ratio: Fração de novas tentativas permitida por requisição
+        budget_initial: Fichas iniciais de cada endpoint
+        budget_max: Máximo de fichas acumuladas por endpoint
+    """
+
+    def __init__(self, max_retries=None, backoff_base=0.5, backoff_max=30.0,
+                 budget_ratio=0.2, budget_initial=10.0, budget_max=100.0):
+        if max_retries is None:
+            max_retries = dict(MAX_RETRIES_ENDPOINT)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.budget_ratio = budget_ratio
+        self.budget_initial = budget_initial
+        self.budget_max = budget_max
+        self._orcamento = {}
+        self._lock = threading.Lock()
+
+    def tentativas_extras(self, endpoint):
+        """Retorna o número máximo de novas tentativas para o endpoint."""
+        if isinstance(self.max_retries, int):
+            return self.max_retries
+        return self.max_retries.get(endpoint, 0)
+
+    def registrar_requisicao(self, endpoint):
+        """Deposita fichas no orçamento do endpoint (uma vez por chamada)."""
+        with self._lock:
+            atual = self._orcamento.get(endpoint, self.budget_initial)
+            self._orcamento[endpoint] = min(self.budget_max, atual + self.budget_ratio)
+
+    def pode_repetir(self, endpoint, tentativa):
+        """
+        Decide se a tentativa de número `tentativa` (1 = primeira repetição)
+        pode ser feita, consumindo uma ficha do orçamento.
+        """
+        if tentativa > self.tentativas_extras(endpoint):
+            return False
+        with self._lock:
+            atual = self._orcamento.get(endpoint, self.budget_initial)
+            if atual < 1:
+                return False
+            self._orcamento[endpoint] = atual - 1
+            return True
+
+    def atraso(self, tentativa, retry_after=None):
+        """
+        Calcula a espera antes da tentativa.
+        Args:
+            tentativa: Número da nova tentativa (1, 2, ...)
+            retry_after: Segundos indicados pelo ITI (prevalecem se maiores)
+        Returns:
+            float com os segundos de espera
+        """
+        teto = min(self.backoff_max, self.backoff_base * (2 ** (tentativa - 1)))
+        espera = random.uniform(0, teto)
+        if retry_after:
+            espera = max(espera, min(retry_after, self.backoff_max))
+        return espera
+
+
+def deve_repetir(status_code):
+    """Indica se o status HTTP justifica nova tentativa."""
+    return status_code in STATUS_RETRY
+
+
+_default_rate_limiter = None
+_default_rate_limiter_lock = threading.Lock()
+
+
+def get_default_rate_limiter():
+    """Retorna o limitador de taxa compartilhado por todos os clientes do processo."""
+    global _default_rate_limiter
+    if _default_rate_limiter is None:
+        with _default_rate_limiter_lock:
+            if _default_rate_limiter is None:
+                _default_rate_limiter = AdaptiveRateLimiter()
+    return _default_rate_limiter
@@ -0,0 +1,534 @@
+"""
+Processamento do relatório simplificado retornado pelo endpoint /simples.
+
+parse_relatorio() gera um ValidationResult compacto (dataclasses com
+__slots__, textos repetidos internados e o relatório bruto guardado apenas
+quando pedido). process_relatorio() mantém o formato em dict de sempre.
+
+A extração é guiada por mapas de campos (CAMPOS_ASSINATURA/CAMPOS_DOCUMENTO):
+para cada formato de relatório (conjunto de chaves de topo) e de assinatura,
+as chaves presentes são resolvidas uma única vez e o plano resultante fica em
+cache, inclusive o caminho até a lista de assinaturas (que pode estar
+aninhada abaixo do topo).
+"""
+
+import sys
+import threading
+from dataclasses import dataclass, field
+from itertools import repeat, starmap
+from operator import itemgetter
+
+from .json_backend import loads
+
+
+NA = 'N/A'
+
+# Campo -> chaves aceitas no JSON do ITI (em ordem de preferência) e valor padrão.
+# A ordem dos campos é a dos atributos de SignatureInfo/DocumentInfo.
+CAMPOS_ASSINATURA = (
+    ('assinado_por', ('nome', 'signerName', 'assinado_por'), NA),
+    ('cpf', ('cpf', 'CPF'), NA),
+    ('certificadora', ('certificadora',), NA),
+    ('numero_serie_certificado', ('numSerial', 'serialNumber', 'numero_serie'), NA),
+    ('data_assinatura', ('data', 'signatureDate', 'data_assinatura'), NA),
+    ('status', ('status', 'resultado'), NA),
+    ('possui_carimbo_tempo', ('possuiCarimboTempo',), False),
+)
+# nome_arquivo usa o nome do arquivo enviado quando ausente (padrão None)
+CAMPOS_DOCUMENTO = (
+    ('nome_arquivo', ('nomeArquivo',), None),
+    ('hash', ('hash', 'documentHash'), NA),
+    ('data_validacao', ('dataValidacao', 'validationDate'), NA),
+    ('status_documento', ('statusDocumento',), NA),
+)
+CAMPOS_INTERNADOS = ('certificadora', 'status', 'status_documento')
+
+# Chaves que contêm a lista de assinaturas, em qualquer nível
+CHAVES_ASSINATURAS = ('assinaturas', 'signatures')
+
+# Um objeto é uma assinatura se tiver ao menos duas chaves de CAMPOS_ASSINATURA
+# ou alguma chave com um destes trechos
+CHAVES_CONHECIDAS_ASSINATURA = frozenset(
+    chave for _, candidatas, _ in CAMPOS_ASSINATURA for chave in candidatas
+) - {'status'}
+MARCADORES_ASSINATURA = ('assinado', 'cpf', 'certificado', 'signature')
+
+# Profundidade máxima da busca por listas de assinaturas aninhadas
+PROFUNDIDADE_BUSCA = 4
+
+# Formatos distintos mantidos em cache (o cache é esvaziado ao atingir o limite)
+LIMITE_FORMATOS = 256
+
+
+def _internar(valor):
+    # Status e certificadoras se repetem em quase todos os resultados
+    return sys.intern(valor) if isinstance(valor, str) else valor
+
+
+def _dict_assinatura(assinado_por, cpf, certificadora, numero_serie_certificado, data_assinatura, status,
+                     possui_carimbo_tempo):
+    # Assinatura no formato de process_relatorio a partir dos valores na ordem
+    # de CAMPOS_ASSINATURA (o dict literal sai bem mais rápido que dict(zip(...)))
+    return {
+        'assinado_por': assinado_por,
+        'cpf': cpf,
+        'certificadora': certificadora,
+        'numero_serie_certificado': numero_serie_certificado,
+        'data_assinatura': data_assinatura,
+        'status': status,
+        'possui_carimbo_tempo': possui_carimbo_tempo,
+    }
+
+
+# Montagem do dict de cada mapa de campos quando todos os campos estão presentes
+MONTAGEM_DICT = {CAMPOS_ASSINATURA: _dict_assinatura}
+
+
+@dataclass(slots=True)
+class SignatureInfo:
+    """Dados de uma assinatura do relatório."""
+    assinado_por: object = NA
+    cpf: object = NA
+    certificadora: object = NA
+    numero_serie_certificado: object = NA
+    data_assinatura: object = NA
+    status: object = NA
+    possui_carimbo_tempo: object = False
+
+    @classmethod
+    def from_iti(cls, assinatura):
+        """Cria a partir de uma assinatura do JSON do ITI (aceita as variações de nomes dos campos)."""
+        return cls(*_plano(_planos_assinatura, assinatura, CAMPOS_ASSINATURA).valores(assinatura))
+
+    @classmethod
+    def from_dict(cls, dados):
+        """Cria a partir do dict de to_dict()."""
+        return cls(
+            assinado_por=dados.get('assinado_por', NA),
+            cpf=dados.get('cpf', NA),
+            certificadora=_internar(dados.get('certificadora', NA)),
+            numero_serie_certificado=dados.get('numero_serie_certificado', NA),
+            data_assinatura=dados.get('data_assinatura', NA),
+            status=_internar(dados.get('status', NA)),
+            possui_carimbo_tempo=dados.get('possui_carimbo_tempo', False),
+        )
+
+    def to_dict(self):
+        return {
+            'assinado_por': self.assinado_por,
+            'cpf': self.cpf,
+            'certificadora': self.certificadora,
+            'numero_serie_certificado': self.numero_serie_certificado,
+            'data_assinatura': self.data_assinatura,
+            'status': self.status,
+            'possui_carimbo_tempo': self.possui_carimbo_tempo,
+        }
+
+
+@dataclass(slots=True)
+class DocumentInfo:
+    """Dados do documento validado."""
+    nome_arquivo: object = NA
+    hash: object = NA
+    data_validacao: object = NA
+    status_documento: object = NA
+
+    @classmethod
+    def from_iti(cls, relatorio, filename):
+        """Cria a partir do JSON do ITI."""
+        return cls(*_plano(_planos_relatorio, relatorio, CAMPOS_DOCUMENTO).valores(relatorio, filename))
+
+    @classmethod
+    def from_dict(cls, dados):
+        """Cria a partir do dict de to_dict()."""
+        return cls(
+            nome_arquivo=dados.get('nome_arquivo', NA),
+            hash=dados.get('hash', NA),
+            data_validacao=dados.get('data_validacao', NA),
+            status_documento=_internar(dados.get('status_documento', NA)),
+        )
+
+    def to_dict(self):
+        return {
+            'nome_arquivo': self.nome_arquivo,
+            'hash': self.hash,
+            'data_validacao': self.data_validacao,
+            'status_documento': self.status_documento,
+        }
+
+
+@dataclass(slots=True)
+class ValidationResult:
+    """
+    Resultado de uma validação.
+
+    O relatório bruto do ITI só é mantido se pedido (ver parse_relatorio);
+    quando recebido como bytes, fica guardado assim e só é decodificado ao
+    acessar relatorio_completo.
+
+    Atributos:
+        status: 'valid', 'invalid', 'unknown' ou 'error'
+        documento: DocumentInfo (None se o relatório não pôde ser lido)
+        assinaturas: Tupla de SignatureInfo
+        error: Mensagem de erro (se houver)
+        details: Detalhes do erro (se houver)
+    """
+    status: str
+    documento: object = None
+    assinaturas: tuple = ()
+    error: object = None
+    details: object = None
+    _relatorio: object = field(default=None, repr=False)
+
+    @property
+    def total_assinaturas(self):
+        return len(self.assinaturas)
+
+    @property
+    def tem_relatorio(self):
+        """Indica se o relatório bruto foi mantido."""
+        return self._relatorio is not None
+
+    @property
+    def relatorio_completo(self):
+        """Relatório bruto do ITI (decodificado sob demanda), ou None se não foi mantido."""
+        if isinstance(self._relatorio, (bytes, bytearray, memoryview)):
+            return loads(self._relatorio)
+        return self._relatorio
+
+    @classmethod
+    def from_dict(cls, resultado, keep_raw=True):
+        """
+        Converte um resultado em dict (de validate_pdf/process_relatorio).
+        Args:
+            resultado: dict de resultado
+            keep_raw: Se False, descarta relatorio_completo
+        Returns:
+            ValidationResult
+        """
+        documento = resultado.get('documento')
+        return cls(
+            status=_internar(resultado.get('status', 'unknown')),
+            documento=DocumentInfo.from_dict(documento) if isinstance(documento, dict) else None,
+            assinaturas=tuple(SignatureInfo.from_dict(a) for a in resultado.get('assinaturas', ())),
+            error=resultado.get('error'),
+            details=resultado.get('details'),
+            _relatorio=resultado.get('relatorio_completo') if keep_raw else None,
+        )
+
+    def to_dict(self, incluir_relatorio=True):
+        """
+        Retorna o resultado no formato em dict de process_relatorio.
+        Args:
+            incluir_relatorio: Se False, omite relatorio_completo mesmo que mantido
+        Returns:
+            dict
+        """
+        resultado = {'status': self.status}
+        if self.error is not None:
+            resultado['error'] = self.error
+        if self.details is not None:
+            resultado['details'] = self.details
+        if self.documento is not None:
+            resultado['documento'] = self.documento.to_dict()
+            resultado['assinaturas'] = [a.to_dict() for a in self.assinaturas]
+            resultado['total_assinaturas'] = len(self.assinaturas)
+        if incluir_relatorio and self._relatorio is not None:
+            resultado['relatorio_completo'] = self.relatorio_completo
+        return resultado
+
+
+class _PlanoExtracao:
+    """
+    Plano de extração para um formato de objeto do ITI.
+
+    A chave usada em cada campo é resolvida uma única vez (sem .get
+    encadeados a cada objeto): valores() retorna a tupla de valores (com
+    textos internados) e como_dict() o dict no formato de process_relatorio
+    (como_dicts() converte uma lista inteira de uma vez). Ambos levantam KeyError se o objeto não tiver o formato do plano (chave
+    usada ausente ou chave preferida presente), de modo que o plano de uma
+    assinatura pode ser tentado direto nas seguintes.
+
+    Para relatórios, guarda também o caminho até a lista de assinaturas
+    (descoberto no primeiro relatório do formato) e o último plano de
+    assinatura usado.
+    """
+
+    __slots__ = ('fontes', 'proibidas', '_nomes', '_pegar', '_montar', '_modelo', '_ausentes', '_internar',
+                 'caminho', 'assinatura')
+
+    def __init__(self, formato, campos):
+        presentes = set(formato)
+        proibidas = []
+        fontes = []
+        for nome, candidatas, padrao in campos:
+            chave = next((c for c in candidatas if c in presentes), None)
+            # Chaves de maior preferência que a usada não podem aparecer
+            proibidas.extend(candidatas if chave is None else candidatas[:candidatas.index(chave)])
+            fontes.append((nome, chave, padrao))
+        # (nome, chave no objeto ou None, padrão); padrão None: valor passado na chamada
+        self.fontes = tuple(fontes)
+        self.proibidas = frozenset(proibidas)
+        chaves = [chave for _, chave, _ in fontes if chave is not None]
+        # Os valores presentes saem de uma vez, como tupla, e o dict é montado
+        # com zip sobre os nomes (itemgetter de uma chave só não retorna tupla)
+        self._nomes = tuple(nome for nome, chave, _ in fontes if chave is not None)
+        self._pegar = itemgetter(*chaves) if len(chaves) > 1 else None
+        # Campos ausentes: dict modelo, na ordem do plano, com os padrões
+        self._montar = self._modelo = None
+        if len(chaves) < len(fontes):
+            self._modelo = {nome: padrao for nome, _, padrao in fontes}
+        elif self._pegar is not None:
+            self._montar = MONTAGEM_DICT.get(campos)
+        self._ausentes = tuple(nome for nome, chave, padrao in fontes if chave is None and padrao is None)
+        self._internar = tuple(i for i, (nome, _, _) in enumerate(fontes) if nome in CAMPOS_INTERNADOS)
+        self.caminho = None
+        self.assinatura = None
+
+    def valores(self, objeto, ausente=None):
+        """
+        Valores dos campos, na ordem do plano.
+        Args:
+            objeto: dict no formato do plano
+            ausente: Valor dos campos ausentes com padrão None (ex.: nome do arquivo)
+        """
+        if self.proibidas and not objeto.keys().isdisjoint(self.proibidas):
+            raise KeyError('formato')
+        if self._pegar is not None and self._modelo is None:
+            valores = list(self._pegar(objeto))
+        else:
+            valores = [objeto[chave] if chave is not None else (ausente if padrao is None else padrao)
+                       for _, chave, padrao in self.fontes]
+        for i in self._internar:
+            if type(valores[i]) is str:
+                valores[i] = sys.intern(valores[i])
+        return tuple(valores)
+
+    def como_dict(self, objeto, ausente=None):
+        """Como valores(), no formato em dict de process_relatorio (sem internar textos)."""
+        if self.proibidas and not objeto.keys().isdisjoint(self.proibidas):
+            raise KeyError('formato')
+        if self._pegar is None:
+            return {nome: objeto[chave] if chave is not None else (ausente if padrao is None else padrao)
+                    for nome, chave, padrao in self.fontes}
+        if self._montar is not None:
+            return self._montar(*self._pegar(objeto))
+        if self._modelo is None:
+            return dict(zip(self._nomes, self._pegar(objeto)))
+        resultado = self._modelo.copy()
+        resultado.update(zip(self._nomes, self._pegar(objeto)))
+        for nome in self._ausentes:
+            resultado[nome] = ausente
+        return resultado
+
+    def como_dicts(self, objetos):
+        """
+        como_dict() de uma lista inteira de uma vez (sem laço em Python).
+        Returns:
+            list de dicts, ou None se algum elemento não tiver o formato do
+            plano (o chamador trata a lista elemento a elemento)
+        """
+        if self.proibidas or self._pegar is None or self._modelo is not None:
+            return None
+        try:
+            if self._montar is not None:
+                return list(starmap(self._montar, map(self._pegar, objetos)))
+            return list(map(dict, map(zip, repeat(self._nomes), map(self._pegar, objetos))))
+        except (LookupError, TypeError):
+            return None
+
+
+_planos_assinatura = {}
+_planos_relatorio = {}
+_planos_lock = threading.Lock()
+
+
+def _plano(cache, objeto, campos):
+    formato = tuple(objeto)
+    plano = cache.get(formato)
+    if plano is None:
+        plano = _PlanoExtracao(formato, campos)
+        with _planos_lock:
+            if len(cache) >= LIMITE_FORMATOS:
+                cache.clear()
+            cache[formato] = plano
+    return plano
+
+
+def _parece_assinatura(objeto):
+    # Olha só as chaves do objeto (sem serializá-lo com os valores aninhados)
+    if len(CHAVES_CONHECIDAS_ASSINATURA.intersection(objeto)) >= 2:
+        return True
+    return any(marcador in chave.lower() for chave in objeto for marcador in MARCADORES_ASSINATURA)
+
+
+def _localizar_assinaturas(relatorio):
+    """
+    Descobre onde está a lista de assinaturas de um relatório.
+
+    Ordem: 'assinaturas'/'signatures' no topo; depois, em largura até
+    PROFUNDIDADE_BUSCA níveis, essas mesmas chaves ou a primeira lista cujo
+    primeiro objeto pareça uma assinatura (ver MARCADORES_ASSINATURA).
+    Listas de outros objetos (ex.: vários documentos) são percorridas
+    elemento a elemento.
+
+    Args:
+        relatorio: dict do relatório
+    Returns:
+        tuple com o caminho (chaves; None = cada elemento de uma lista), ou
+        None se nenhuma lista de assinaturas for encontrada
+    """
+    for chave in CHAVES_ASSINATURAS:
+        if chave in relatorio:
+            return (chave,)
+    fila = [(relatorio, ())]
+    for _ in range(PROFUNDIDADE_BUSCA):
+        proxima = []
+        for no, caminho in fila:
+            if caminho:
+                for chave in CHAVES_ASSINATURAS:
+                    if isinstance(no.get(chave), list):
+                        return caminho + (chave,)
+            for chave, valor in no.items():
+                if isinstance(valor, dict):
+                    proxima.append((valor, caminho + (chave,)))
+                elif isinstance(valor, list) and valor and isinstance(valor[0], dict):
+                    if _parece_assinatura(valor[0]):
+                        return caminho + (chave,)
+                    proxima.append((valor[0], caminho + (chave, None)))
+        fila = proxima
+    return None
+
+
+def _seguir(no, caminho):
+    """Lista no fim do caminho (passos None percorrem cada elemento de uma lista e juntam os resultados)."""
+    for i, passo in enumerate(caminho):
+        if passo is None:
+            encontrados = []
+            if isinstance(no, list):
+                for item in no:
+                    encontrados.extend(_seguir(item, caminho[i + 1:]))
+            return encontrados
+        if not isinstance(no, dict) or passo not in no:
+            return []
+        no = no[passo]
+    return no if isinstance(no, list) else []
+
+
+def _assinaturas_brutas(relatorio, plano):
+    for chave in CHAVES_ASSINATURAS:
+        if chave in relatorio:
+            return relatorio[chave]
+    # Caminho descoberto em um relatório anterior do mesmo formato
+    if plano.caminho is not None:
+        assinaturas = _seguir(relatorio, plano.caminho)
+        if assinaturas:
+            return assinaturas
+    caminho = _localizar_assinaturas(relatorio)
+    if caminho is None:
+        return []
+    plano.caminho = caminho
+    return _seguir(relatorio, caminho)
+
+
+def _extrair(relatorio, filename, como_dict=False):
+    """
+    Documento e assinaturas de um relatório, como tuplas de valores (na ordem
+    dos campos) ou, com como_dict, como os dicts de process_relatorio.
+    """
+    plano = _plano(_planos_relatorio, relatorio, CAMPOS_DOCUMENTO)
+    plano_assinatura = plano.assinatura
+    extrair = None
+    if plano_assinatura is not None:
+        extrair = plano_assinatura.como_dict if como_dict else plano_assinatura.valores
+    brutas = _assinaturas_brutas(relatorio, plano)
+    if como_dict and plano_assinatura is not None:
+        assinaturas = plano_assinatura.como_dicts(brutas)
+        if assinaturas is not None:
+            return plano.como_dict(relatorio, filename), assinaturas
+    assinaturas = []
+    for assinatura in brutas:
+        if not isinstance(assinatura, dict):
+            continue
+        if extrair is not None:
+            try:
+                assinaturas.append(extrair(assinatura))
+                continue
+            except KeyError:
+                pass
+        # Formato diferente do anterior
+        plano_assinatura = _plano(_planos_assinatura, assinatura, CAMPOS_ASSINATURA)
+        plano.assinatura = plano_assinatura
+        extrair = plano_assinatura.como_dict if como_dict else plano_assinatura.valores
+        assinaturas.append(extrair(assinatura))
+    documento = plano.como_dict(relatorio, filename) if como_dict else plano.valores(relatorio, filename)
+    return documento, assinaturas
+
+
+def parse_relatorio(relatorio, filename, keep_raw=False):
+    """
+    Processa o relatório simplificado em um ValidationResult.
+    Args:
+        relatorio: JSON retornado pelo /simples, já decodificado ou em bytes
+        filename: Nome do arquivo original
+        keep_raw: Se True, mantém o relatório bruto (em bytes, se recebido
+            assim, decodificado apenas quando acessado)
+    Returns:
+        ValidationResult
+    """
+    bruto = relatorio if keep_raw else None
+    try:
+        if isinstance(relatorio, (bytes, bytearray, memoryview)):
+            relatorio = loads(relatorio)
+        if isinstance(relatorio, dict):
+            documento, assinaturas = _extrair(relatorio, filename)
+            return ValidationResult(
+                status='valid' if assinaturas else 'invalid',
+                documento=DocumentInfo(*documento),
+                assinaturas=tuple(SignatureInfo(*valores) for valores in assinaturas),
+                _relatorio=bruto,
+            )
+        return ValidationResult(status='unknown', _relatorio=bruto)
+    except Exception as e:
+        return ValidationResult(
+            status='error',
+            error=f"Erro ao processar relatório: {str(e)}",
+            _relatorio=bruto,
+        )
+
+
+def process_relatorio(relatorio, filename):
+    """
+    Processa o relatório simplificado e extrai informações estruturadas.
+
+    Mesmo resultado de parse_relatorio(..., keep_raw=True).to_dict(), montado
+    diretamente em dicts.
+
+    Args:
+        relatorio: JSON retornado pelo /simples
+        filename: Nome do arquivo original
+    Returns:
+        dict estruturado com resultado
+    """
+    try:
+        if isinstance(relatorio, (bytes, bytearray, memoryview)):
+            relatorio = loads(relatorio)
+        if isinstance(relatorio, dict):
+            documento, assinaturas = _extrair(relatorio, filename, como_dict=True)
+            return {
+                'status': 'valid' if assinaturas else 'invalid',
+                'documento': documento,
+                'assinaturas': assinaturas,
+                'total_assinaturas': len(assinaturas),
+                'relatorio_completo': relatorio
+            }
+        return {
+            'status': 'unknown',
+            'relatorio_completo': relatorio
+        }
+    except Exception as e:
+        return {
+            'status': 'error',
+            'error': f"Erro ao processar relatório: {str(e)}",
+            'relatorio_completo': relatorio
+        }
@@ -0,0 +1,142 @@
+"""
+Política de retenção dos dados brutos do ITI nos resultados.
+
+Por padrão cada resultado carrega o relatório completo de /simples
+(relatorio_completo) e, em vários caminhos, o json_bruto de /arquivo. Em
+lotes grandes isso dobra a memória e o tamanho da saída. As políticas são:
+
+- always: mantém os dados brutos (comportamento original)
+- none: remove os dados brutos
+- on_error: mantém apenas em resultados com status 'error' ou 'unknown'
+- spill: grava os dados brutos em um RawStore (arquivos endereçados pelo
+  SHA-256 do conteúdo) e deixa no resultado só a referência
+  (relatorio_completo_ref / json_bruto_ref)
+"""
+
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+from .json_backend import dumps, loads
+
+
+RETENCOES = ("none", "on_error", "always", "spill")
+
+CAMPOS_BRUTOS = ("relatorio_completo", "json_bruto")
+
+# Sub-resultados de validate_full que também recebem a política
+SUBRESULTADOS = ("simples", "conformidade")
+
+STATUS_COM_ERRO = ("error", "unknown")
+
+SUFIXO_REFERENCIA = "_ref"
+
+
+def validar_retencao(retention):
+    """Levanta ValueError se a política não existir."""
+    if retention not in RETENCOES:
+        raise ValueError(f"Política de retenção inválida: {retention}. Use {RETENCOES}")
+    return retention
+
+
+class RawStore:
+    """
+    Armazenamento de JSON endereçado pelo conteúdo: cada item é gravado uma
+    única vez em <diretório>/<2 primeiros caracteres>/<sha256>.json.
+
+    Args:
+        directory: Diretório do armazenamento (criado se não existir)
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def __repr__(self):
+        return f"RawStore({str(self.directory)!r})"
+
+    def path(self, digest):
+        """Caminho do arquivo de um item."""
+        return self.directory / digest[:2] / f"{digest}.json"
+
+    def put(self, valor):
+        """
+        Grava um valor JSON (se ainda não existir).
+        Args:
+            valor: Objeto serializável em JSON
+        Returns:
+            str com o SHA-256 do conteúdo (a referência)
+        """
+        dados = dumps(valor, sort_keys=True)
+        digest = hashlib.sha256(dados).hexdigest()
+        destino = self.path(digest)
+        if destino.exists():
+            return digest
+        destino.parent.mkdir(exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=destino.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(dados)
+            os.replace(tmp, destino)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        return digest
+
+    def get(self, digest):
+        """
+        Lê um valor gravado.
+        Raises:
+            FileNotFoundError: Se a referência não existir
+        """
+        return loads(self.path(digest).read_bytes())
+
+    def resolver(self, resultado):
+        """
+        Retorna uma cópia do resultado com as referências (*_ref) trocadas
+        pelos dados brutos gravados.
+        """
+        completo = dict(resultado)
+        for campo in CAMPOS_BRUTOS:
+            referencia = completo.pop(campo + SUFIXO_REFERENCIA, None)
+            if referencia is not None:
+                completo[campo] = self.get(referencia)
+        for chave in SUBRESULTADOS:
+            if isinstance(completo.get(chave), dict):
+                completo[chave] = self.resolver(completo[chave])
+        return completo
+
+
+def aplicar_retencao(resultado, retention, store=None):
+    """
+    Aplica a política de retenção a um resultado.
+
+    O dict recebido não é alterado (ele pode estar guardado no cache).
+
+    Args:
+        resultado: dict de resultado (validate_pdf, get_conformidade_report ou validate_full)
+        retention: 'none', 'on_error', 'always' ou 'spill'
+        store: RawStore (obrigatório com 'spill')
+    Returns:
+        dict com o resultado após a política
+    """
+    validar_retencao(retention)
+    if retention == "always":
+        return resultado
+    if retention == "spill" and store is None:
+        raise ValueError("A política 'spill' requer um RawStore (raw_store)")
+
+    final = dict(resultado)
+    manter = retention == "on_error" and final.get('status') in STATUS_COM_ERRO
+    if not manter:
+        for campo in CAMPOS_BRUTOS:
+            if campo not in final:
+                continue
+            valor = final.pop(campo)
+            if retention == "spill" and valor is not None:
+                final[campo + SUFIXO_REFERENCIA] = store.put(valor)
+    for chave in SUBRESULTADOS:
+        if isinstance(final.get(chave), dict):
+            final[chave] = aplicar_retencao(final[chave], retention, store)
+    return final
@@ -0,0 +1,520 @@
+"""
+Serviço local de validação (python -m validator_api serve).
+
+Um único processo recebe jobs por uma API HTTP/JSON local, os coloca em uma
+fila de prioridade limitada e os executa em um pool de workers que
+compartilha um ItiClient: um pool de conexões, um cache, um limitador de
+taxa e o single-flight. Os serviços que validam documentos passam a usar esse
+gateway em vez de cada um chamar o ITI por conta própria.
+
+API:
+    POST   /jobs              Cria um job. Corpo = bytes do documento, ou JSON
+                              {"url": ...} para validate_url. Parâmetros:
+                              operation, priority, filename, want, language, wait
+    GET    /jobs/<id>         Estado do job (e o resultado, quando concluído);
+                              ?wait=N espera até N segundos pela conclusão
+    GET    /jobs/<id>/pdf     PDF do relatório (validate_full com want=pdf)
+    DELETE /jobs/<id>         Cancela um job ainda na fila
+    GET    /health            Estado do serviço (fila, workers, jobs)
+    GET    /metrics           Métricas no formato do Prometheus (se houver PrometheusExporter)
+
+Respostas: 202 (job na fila), 200, 400 (parâmetros inválidos ou corpo vazio),
+404, 409 (job não cancelável), 411 (sem Content-Length, ex.: corpo chunked),
+413 (documento grande demais) e 503 (fila cheia, com Retry-After).
+"""
+
+import itertools
+import queue
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from .client import ETAPAS_VALIDACAO_COMPLETA, IDIOMAS_RELATORIO, eh_url
+from .json_backend import dumps, loads
+from .metrics import PrometheusExporter
+from .upload import LIMITE_SPOOL_MEMORIA, TAMANHO_BLOCO_UPLOAD, DocumentoUpload
+
+
+OPERACOES_SERVICO = ("validate_pdf", "validate_document", "get_conformidade_report", "validate_full", "validate_url")
+
+HOST_PADRAO = "127.0.0.1"
+PORTA_PADRAO = 8765
+
+TAMANHO_MAXIMO_UPLOAD = 100 * 1024 * 1024
+# Corpo JSON de POST /jobs ({"url": ...})
+TAMANHO_MAXIMO_JSON = 64 * 1024
+# Espera máxima aceita em ?wait=
+ESPERA_MAXIMA = 300.0
+# Retry-After sugerido quando a fila está cheia
+RETRY_AFTER_FILA_CHEIA = 1
+
+# Intervalo em que os workers ociosos verificam o pedido de parada
+INTERVALO_PARADA = 0.5
+
+_PARAR = object()
+
+
+class Job:
+    """
+    Job de validação.
+
+    Atributos:
+        id: Identificador (hex)
+        operacao: Método do ItiClient executado
+        prioridade: Jobs de prioridade maior saem primeiro da fila
+        status: 'queued', 'running', 'done' ou 'cancelled'
+        resultado: dict de resultado (quando 'done')
+        criado_em, iniciado_em, concluido_em: time.time() de cada transição
+    """
+
+    __slots__ = ('id', 'operacao', 'prioridade', 'filename', 'opcoes', 'arquivo', 'url', 'status',
+                 'resultado', 'pdf', 'criado_em', 'iniciado_em', 'concluido_em', 'concluido')
+
+    def __init__(self, operacao, prioridade=0, filename=None, opcoes=None, arquivo=None, url=None):
+        self.id = uuid.uuid4().hex
+        self.operacao = operacao
+        self.prioridade = prioridade
+        self.filename = filename
+        self.opcoes = opcoes or {}
+        self.arquivo = arquivo
+        self.url = url
+        self.status = 'queued'
+        self.resultado = None
+        self.pdf = None
+        self.criado_em = time.time()
+        self.iniciado_em = None
+        self.concluido_em = None
+        self.concluido = threading.Event()
+
+    def __repr__(self):
+        return f"Job({self.id!r}, {self.operacao!r}, status={self.status!r})"
+
+    def resumo(self, com_resultado=True):
+        """dict com o estado do job (formato das respostas da API)."""
+        dados = {
+            "id": self.id,
+            "operation": self.operacao,
+            "priority": self.prioridade,
+            "status": self.status,
+            "created_at": self.criado_em,
+            "started_at": self.iniciado_em,
+            "finished_at": self.concluido_em,
+        }
+        if self.filename:
+            dados["filename"] = self.filename
+        if self.url:
+            dados["url"] = self.url
+        if com_resultado and self.resultado is not None:
+            dados["result"] = self.resultado
+        return dados
+
+    def liberar(self):
+        """Descarta o documento recebido (após a execução ou o cancelamento)."""
+        if self.arquivo is not None:
+            self.arquivo.close()
+            self.arquivo = None
+
+
+def _separar_pdf(job, resultado):
+    """Move os bytes do PDF do relatório para o job (o resultado é servido como JSON)."""
+    pdf = resultado.get('pdf')
+    if isinstance(pdf, dict) and isinstance(pdf.get('pdf_bytes'), bytes):
+        job.pdf = pdf['pdf_bytes']
+        pdf = {k: v for k, v in pdf.items() if k != 'pdf_bytes'}
+        pdf['pdf_url'] = f"/jobs/{job.id}/pdf"
+        pdf['pdf_size'] = len(job.pdf)
+        return {**resultado, 'pdf': pdf}
+    return resultado
+
+
+class ServicoValidacao:
+    """
+    Fila de prioridade limitada e pool de workers em torno de um ItiClient.
+
+    Args:
+        client: ItiClient compartilhado pelos workers
+        workers: Número de workers (jobs simultâneos)
+        queue_size: Capacidade da fila (submeter levanta queue.Full quando cheia)
+        max_jobs: Jobs concluídos mantidos para consulta (os mais antigos saem primeiro)
+        job_ttl: Segundos em que um job concluído fica disponível para consulta
+    """
+
+    def __init__(self, client, workers=8, queue_size=1000, max_jobs=10000, job_ttl=3600):
+        if workers < 1:
+            raise ValueError("workers deve ser >= 1")
+        self.client = client
+        self.workers = workers
+        self.max_jobs = max_jobs
+        self.job_ttl = job_ttl
+        self._fila = queue.PriorityQueue(maxsize=queue_size)
+        self._sequencia = itertools.count()
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._parar = threading.Event()
+
+    def __repr__(self):
+        return f"ServicoValidacao(workers={self.workers}, fila={self._fila.qsize()})"
+
+    def start(self):
+        """Inicia os workers."""
+        self._parar.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._trabalhar, name=f"validador-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, timeout=None):
+        """Pede aos workers que parem quando a fila esvaziar e espera por eles."""
+        self._parar.set()
+        for _ in self._threads:
+            # Sentinelas com prioridade mínima: os jobs já na fila são executados
+            # antes. Com a fila cheia, os workers param ao encontrá-la vazia
+            try:
+                self._fila.put_nowait((float('inf'), next(self._sequencia), _PARAR))
+            except queue.Full:
+                break
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def submeter(self, operacao, arquivo=None, url=None, prioridade=0, filename=None, opcoes=None):
+        """
+        Coloca um job na fila.
+
+        Args:
+            operacao: Um de OPERACOES_SERVICO
+            arquivo: Arquivo (aberto, posicionado no início) com o documento;
+                passa a pertencer ao job, que o fecha ao final
+            url: URL do documento (validate_url)
+            prioridade: Jobs de prioridade maior saem primeiro
+            filename: Nome do documento
+            opcoes: Argumentos extras da operação (want, language)
+        Returns:
+            Job
+        Raises:
+            ValueError: Operação inválida ou documento/URL ausente
+            queue.Full: Fila cheia
+        """
+        if operacao not in OPERACOES_SERVICO:
+            raise ValueError(f"Operação inválida: {operacao}. Use {OPERACOES_SERVICO}")
+        if operacao == "validate_url":
+            if not eh_url(url):
+                raise ValueError("validate_url requer uma URL http(s)")
+        elif arquivo is None:
+            raise ValueError(f"{operacao} requer o documento no corpo da requisição")
+
+        job = Job(operacao, prioridade, filename, opcoes, arquivo, url)
+        with self._lock:
+            self._limpar()
+            self._fila.put_nowait((-prioridade, next(self._sequencia), job))
+            self._jobs[job.id] = job
+        return job
+
+    def obter(self, job_id):
+        """Job pelo id (None se não existir ou já tiver expirado)."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancelar(self, job_id):
+        """
+        Cancela um job que ainda está na fila.
+        Returns:
+            True se foi cancelado; False se já começou ou terminou
+        Raises:
+            KeyError: Se o job não existir
+        """
+        with self._lock:
+            job = self._jobs[job_id]
+            if job.status != 'queued':
+                return False
+            job.status = 'cancelled'
+            job.concluido_em = time.time()
+        job.liberar()
+        job.concluido.set()
+        return True
+
+    def estado(self):
+        """Contagem dos jobs por status, tamanho da fila e número de workers."""
+        with self._lock:
+            por_status = {}
+            for job in self._jobs.values():
+                por_status[job.status] = por_status.get(job.status, 0) + 1
+        return {
+            "status": "ok",
+            "workers": self.workers,
+            "queue": self._fila.qsize(),
+            "queue_size": self._fila.maxsize,
+            "jobs": por_status,
+        }
+
+    def _limpar(self):
+        """Remove jobs concluídos expirados ou além de max_jobs (chamado com o lock)."""
+        limite = time.time() - self.job_ttl
+        concluidos = [j for j in self._jobs.values() if j.concluido_em is not None]
+        excesso = len(concluidos) - self.max_jobs
+        for job in concluidos:
+            if excesso > 0 or job.concluido_em < limite:
+                del self._jobs[job.id]
+                excesso -= 1
+
+    def _executar(self, job):
+        metodo = getattr(self.client, job.operacao)
+        if job.operacao == "validate_url":
+            return metodo(job.url, filename=job.filename)
+        documento = DocumentoUpload(job.arquivo, filename=job.filename)
+        try:
+            return metodo(documento, **job.opcoes)
+        finally:
+            documento.close()
+
+    def _trabalhar(self):
+        while True:
+            try:
+                _, _, job = self._fila.get(timeout=INTERVALO_PARADA)
+            except queue.Empty:
+                if self._parar.is_set():
+                    return
+                continue
+            if job is _PARAR:
+                return
+            with self._lock:
+                if job.status != 'queued':
+                    continue
+                job.status = 'running'
+                job.iniciado_em = time.time()
+            try:
+                resultado = self._executar(job)
+            except Exception as e:
+                resultado = {"status": "error", "error": str(e)}
+            finally:
+                job.liberar()
+            job.resultado = _separar_pdf(job, resultado)
+            with self._lock:
+                job.status = 'done'
+                job.concluido_em = time.time()
+            job.concluido.set()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "validador-iti"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    @property
+    def servico(self):
+        return self.server.servico
+
+    def _responder(self, status, corpo, content_type="application/json", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(corpo)))
+        for nome, valor in (headers or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def _json(self, status, dados, headers=None):
+        self._responder(status, dumps(dados), headers=headers)
+
+    def _erro(self, status, mensagem, headers=None):
+        self._json(status, {"status": "error", "error": mensagem}, headers)
+
+    def _rota(self):
+        partes = urlsplit(self.path)
+        caminho = [p for p in partes.path.split('/') if p]
+        parametros = {k: v[-1] for k, v in parse_qs(partes.query).items()}
+        return caminho, parametros
+
+    def _espera(self, parametros):
+        try:
+            return min(max(float(parametros.get('wait', 0)), 0.0), ESPERA_MAXIMA)
+        except ValueError:
+            raise ValueError("wait deve ser um número de segundos") from None
+
+    def _ler_corpo(self, limite, descricao):
+        """
+        Corpo da requisição em um arquivo temporário (em memória até 8 MB).
+
+        Exige Content-Length (corpos chunked não são aceitos): sem ele a
+        resposta é 411; com corpo vazio, tamanho inválido ou conexão encerrada
+        antes do fim, 400; acima de limite, 413.
+
+        Args:
+            limite: Tamanho máximo do corpo em bytes
+            descricao: Nome do corpo nas mensagens de erro (ex.: "Documento")
+        Returns:
+            O arquivo, ou None se a requisição já foi respondida com erro
+        """
+        if "Transfer-Encoding" in self.headers or "Content-Length" not in self.headers:
+            self._erro_corpo(411, "Content-Length obrigatório (corpo chunked não é aceito)")
+            return None
+        try:
+            tamanho = int(self.headers["Content-Length"])
+        except ValueError:
+            tamanho = -1
+        if tamanho < 0:
+            self._erro_corpo(400, "Content-Length inválido")
+            return None
+        if tamanho == 0:
+            self._erro_corpo(400, f"{descricao} vazio")
+            return None
+        if tamanho > limite:
+            self._erro_corpo(413, f"{descricao} maior que {limite} bytes")
+            return None
+        arquivo = tempfile.SpooledTemporaryFile(max_size=LIMITE_SPOOL_MEMORIA)
+        restante = tamanho
+        while restante > 0:
+            bloco = self.rfile.read(min(TAMANHO_BLOCO_UPLOAD, restante))
+            if not bloco:
+                break
+            arquivo.write(bloco)
+            restante -= len(bloco)
+        if restante > 0:
+            arquivo.close()
+            self._erro_corpo(400, f"{descricao} incompleto ({tamanho - restante} de {tamanho} bytes)")
+            return None
+        arquivo.seek(0)
+        return arquivo
+
+    def _erro_corpo(self, status, mensagem):
+        # O corpo (se houver) não foi lido: a conexão não pode ser reaproveitada
+        self.close_connection = True
+        self._erro(status, mensagem)
+
+    def _responder_job(self, job, espera):
+        if espera and job.concluido.wait(espera):
+            return self._json(200, job.resumo())
+        status = 200 if job.concluido.is_set() else 202
+        self._json(status, job.resumo(), headers={"Location": f"/jobs/{job.id}"})
+
+    def do_GET(self):
+        caminho, parametros = self._rota()
+        if caminho == ['health']:
+            return self._json(200, self.servico.estado())
+        if caminho == ['metrics']:
+            exportadores = [h for h in self.servico.client.hooks if isinstance(h, PrometheusExporter)]
+            if not exportadores:
+                return self._erro(404, "Métricas desativadas")
+            corpo = "".join(h.render() for h in exportadores).encode('utf-8')
+            return self._responder(200, corpo, "text/plain; version=0.0.4; charset=utf-8")
+        if len(caminho) in (2, 3) and caminho[0] == 'jobs':
+            job = self.servico.obter(caminho[1])
+            if job is None:
+                return self._erro(404, "Job não encontrado")
+            if len(caminho) == 3:
+                if caminho[2] != 'pdf' or job.pdf is None:
+                    return self._erro(404, "PDF não disponível")
+                return self._responder(200, job.pdf, "application/pdf")
+            try:
+                espera = self._espera(parametros)
+            except ValueError as e:
+                return self._erro(400, str(e))
+            return self._responder_job(job, espera)
+        self._erro(404, "Rota não encontrada")
+
+    def do_POST(self):
+        caminho, parametros = self._rota()
+        if caminho != ['jobs']:
+            return self._erro(404, "Rota não encontrada")
+
+        tipo = self.headers.get("Content-Type", "").split(';')[0].strip().lower()
+        operacao = parametros.get('operation')
+        url = None
+        arquivo = None
+        try:
+            prioridade = int(parametros.get('priority', 0))
+            espera = self._espera(parametros)
+            opcoes = {}
+            if 'want' in parametros:
+                opcoes['want'] = tuple(e for e in parametros['want'].split(',') if e)
+                if set(opcoes['want']) - set(ETAPAS_VALIDACAO_COMPLETA):
+                    raise ValueError(f"want inválido. Use {ETAPAS_VALIDACAO_COMPLETA}")
+            if 'language' in parametros:
+                if parametros['language'] not in IDIOMAS_RELATORIO:
+                    raise ValueError(f"language inválido. Use {IDIOMAS_RELATORIO}")
+                opcoes['language'] = parametros['language']
+            if opcoes and (operacao or 'validate_pdf') != 'validate_full':
+                raise ValueError("want e language só se aplicam a validate_full")
+
+            if tipo == 'application/json':
+                corpo = self._ler_corpo(TAMANHO_MAXIMO_JSON, "Corpo JSON")
+                if corpo is None:
+                    return
+                with corpo:
+                    url = loads(corpo.read()).get('url')
+                operacao = operacao or 'validate_url'
+            else:
+                arquivo = self._ler_corpo(self.server.max_upload, "Documento")
+                if arquivo is None:
+                    return
+                operacao = operacao or 'validate_pdf'
+
+            job = self.servico.submeter(operacao, arquivo=arquivo, url=url, prioridade=prioridade,
+                                        filename=parametros.get('filename'), opcoes=opcoes)
+        except (ValueError, AttributeError) as e:
+            if arquivo is not None:
+                arquivo.close()
+            return self._erro(400, str(e))
+        except queue.Full:
+            if arquivo is not None:
+                arquivo.close()
+            return self._erro(503, "Fila cheia", headers={"Retry-After": str(RETRY_AFTER_FILA_CHEIA)})
+        self._responder_job(job, espera)
+
+    def do_DELETE(self):
+        caminho, _ = self._rota()
+        if len(caminho) != 2 or caminho[0] != 'jobs':
+            return self._erro(404, "Rota não encontrada")
+        try:
+            cancelado = self.servico.cancelar(caminho[1])
+        except KeyError:
+            return self._erro(404, "Job não encontrado")
+        if not cancelado:
+            return self._erro(409, "O job já começou ou terminou")
+        self._json(200, self.servico.obter(caminho[1]).resumo())
+
+
+class ServidorValidacao(ThreadingHTTPServer):
+    """
+    Servidor HTTP (uma thread por conexão) da API do ServicoValidacao.
+
+    Args:
+        servico: ServicoValidacao (iniciado por start())
+        host, port: Endereço de escuta (port=0 escolhe uma porta livre)
+        max_upload: Tamanho máximo (bytes) de um documento enviado
+        verbose: Se True, registra cada requisição na saída de erro
+    """
+
+    daemon_threads = True
+
+    def __init__(self, servico, host=HOST_PADRAO, port=PORTA_PADRAO, max_upload=TAMANHO_MAXIMO_UPLOAD,
+                 verbose=False):
+        self.servico = servico
+        self.max_upload = max_upload
+        self.verbose = verbose
+        super().__init__((host, port), _Handler)
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Inicia os workers e atende requisições em uma thread de fundo."""
+        self.servico.start()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        """Para de aceitar requisições e espera os workers terminarem os jobs atuais."""
+        self.shutdown()
+        self.server_close()
+        self.servico.stop()
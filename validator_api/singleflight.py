@@ -0,0 +1,278 @@
+"""
+Coalescência (single-flight) de validações simultâneas do mesmo documento.
+
+Quando várias threads (ou workers) recebem o mesmo PDF ao mesmo tempo, só a
+primeira chamada vai ao ITI; as demais esperam por ela e recebem o mesmo
+resultado. A chave é o endpoint somado ao SHA-256 do conteúdo, como no
+cache (ver cache.ResultCache.chave).
+
+- SingleFlight: threads do mesmo processo
+- SingleFlightAsync: tarefas do mesmo event loop (AsyncItiClient)
+- FileLockSingleFlight: processos do mesmo host, com travas de arquivo
+  (fcntl.flock); o resultado do líder é gravado ao lado da trava para os
+  processos que esperavam por ele
+"""
+
+import asyncio
+import copy
+import functools
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from .json_backend import dumps, loads
+
+try:
+    import fcntl
+except ImportError:  # Windows: FileLockSingleFlight indisponível
+    fcntl = None
+
+
+def chave_voo(digest, endpoint):
+    """Chave de uma chamada: endpoint + SHA-256 do conteúdo."""
+    return f"{endpoint}:{digest}"
+
+
+class _Chamada:
+    __slots__ = ('concluida', 'resultado', 'erro', 'esperando')
+
+    def __init__(self):
+        self.concluida = threading.Event()
+        self.resultado = None
+        self.erro = None
+        self.esperando = 0
+
+
+class SingleFlight:
+    """
+    Coalescência de chamadas entre threads do mesmo processo.
+
+    Pode ser compartilhado por vários ItiClient (ex.: um por worker).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._chamadas = {}
+
+    def __repr__(self):
+        return f"SingleFlight(em_andamento={self.em_andamento()})"
+
+    def em_andamento(self):
+        """Número de chamadas em andamento."""
+        with self._lock:
+            return len(self._chamadas)
+
+    def executar(self, chave, funcao):
+        """
+        Executa funcao() uma única vez por chave entre as chamadas simultâneas.
+
+        Args:
+            chave: Chave da chamada (ver chave_voo)
+            funcao: Função sem argumentos que produz o resultado
+        Returns:
+            Tupla (resultado, compartilhado); compartilhado é True quando o
+            resultado veio da chamada de outra thread. Se outras threads
+            esperaram pela chamada, cada uma (inclusive a que a executou)
+            recebe a sua cópia (copy.deepcopy) do resultado
+        Raises:
+            A exceção levantada por funcao(), também nas threads que esperavam
+        """
+        with self._lock:
+            chamada = self._chamadas.get(chave)
+            lider = chamada is None
+            if lider:
+                chamada = self._chamadas[chave] = _Chamada()
+            else:
+                chamada.esperando += 1
+
+        if not lider:
+            chamada.concluida.wait()
+            if chamada.erro is not None:
+                raise chamada.erro
+            return copy.deepcopy(chamada.resultado), True
+
+        try:
+            chamada.resultado = funcao()
+        except BaseException as e:
+            chamada.erro = e
+            raise
+        finally:
+            with self._lock:
+                del self._chamadas[chave]
+            chamada.concluida.set()
+        # Sem ninguém esperando (a chave já saiu do dict), o original é só do líder
+        if chamada.esperando:
+            return copy.deepcopy(chamada.resultado), False
+        return chamada.resultado, False
+
+
+class SingleFlightAsync:
+    """
+    Coalescência de chamadas entre tarefas do mesmo event loop.
+
+    A chamada roda em uma tarefa própria: cancelar quem a iniciou não cancela
+    as demais tarefas que esperam pelo mesmo resultado.
+    """
+
+    def __init__(self):
+        self._chamadas = {}
+
+    def __repr__(self):
+        return f"SingleFlightAsync(em_andamento={len(self._chamadas)})"
+
+    async def executar(self, chave, fabrica):
+        """
+        Versão assíncrona de SingleFlight.executar.
+        Args:
+            chave: Chave da chamada (ver chave_voo)
+            fabrica: Função sem argumentos que retorna a corrotina do resultado
+        Returns:
+            Tupla (resultado, compartilhado), com cópias do resultado como
+            em SingleFlight.executar
+        """
+        chamada = self._chamadas.get(chave)
+        compartilhado = chamada is not None
+        if chamada is None:
+            tarefa = asyncio.ensure_future(fabrica())
+            # [tarefa, número de tarefas que esperam além da que iniciou]
+            chamada = self._chamadas[chave] = [tarefa, 0]
+            tarefa.add_done_callback(functools.partial(self._concluir, chave))
+        else:
+            chamada[1] += 1
+        # shield: cancelar uma das tarefas que esperam (inclusive a que
+        # iniciou a chamada) não cancela a chamada das outras
+        resultado = await asyncio.shield(chamada[0])
+        if compartilhado or chamada[1]:
+            resultado = copy.deepcopy(resultado)
+        return resultado, compartilhado
+
+    def _concluir(self, chave, tarefa):
+        chamada = self._chamadas.get(chave)
+        if chamada is not None and chamada[0] is tarefa:
+            del self._chamadas[chave]
+        if not tarefa.cancelled():
+            # Evita "exception was never retrieved" quando ninguém mais esperava
+            tarefa.exception()
+
+
+class FileLockSingleFlight:
+    """
+    Coalescência de chamadas entre processos do mesmo host.
+
+    Cada chave tem uma trava em <diretório>/<2 primeiros caracteres do
+    hash>/<chave>.lock. O líder executa a chamada com a trava e grava o
+    resultado em <chave>.json; os processos que esperavam usam esse resultado
+    se ele foi gravado depois que começaram a esperar. Se o líder falhar, o
+    próximo processo da fila executa a chamada. Dentro de cada processo, as
+    threads são coalescidas antes (ver SingleFlight).
+
+    Os resultados só servem a quem já esperava pela trava; travas e
+    resultados sem uso há mais de max_idade segundos são removidos (ver
+    limpar()) na primeira chamada e, depois, a cada max_idade segundos.
+
+    Args:
+        directory: Diretório das travas e resultados (criado se não existir)
+        max_idade: Idade (segundos) a partir da qual os arquivos são removidos
+            pela limpeza automática (padrão: 1 hora; None desativa)
+    Raises:
+        ImportError: Em plataformas sem fcntl (Windows)
+    """
+
+    def __init__(self, directory, max_idade=3600):
+        if fcntl is None:
+            raise ImportError("FileLockSingleFlight requer fcntl (Linux/macOS)")
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_idade = max_idade
+        self._local = SingleFlight()
+        self._proxima_limpeza = 0.0
+        self._lock_limpeza = threading.Lock()
+
+    def __repr__(self):
+        return f"FileLockSingleFlight({str(self.directory)!r})"
+
+    def _caminhos(self, chave):
+        """(trava, resultado) de uma chave."""
+        endpoint, _, digest = chave.rpartition(':')
+        pasta = self.directory / digest[:2]
+        pasta.mkdir(exist_ok=True)
+        base = f"{digest}.{endpoint or 'resultado'}"
+        return pasta / f"{base}.lock", pasta / f"{base}.json"
+
+    def _ler(self, caminho, desde):
+        try:
+            registro = loads(caminho.read_bytes())
+        except (OSError, ValueError):
+            return None
+        if registro.get('gravado_em', 0) < desde:
+            return None
+        return registro
+
+    def _gravar(self, caminho, resultado):
+        dados = dumps({"gravado_em": time.time(), "resultado": resultado})
+        fd, tmp = tempfile.mkstemp(dir=caminho.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(dados)
+            os.replace(tmp, caminho)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def executar(self, chave, funcao):
+        """
+        Ver SingleFlight.executar; compartilhado também é True quando o
+        resultado veio de outro processo.
+        """
+        inicio = time.time()
+        self._limpar_periodicamente(inicio)
+
+        def entre_processos():
+            caminho_trava, caminho = self._caminhos(chave)
+            with open(caminho_trava, 'a+b') as trava:
+                fcntl.flock(trava, fcntl.LOCK_EX)
+                try:
+                    # Trava em uso não é removida pela limpeza de outro processo
+                    os.utime(trava.fileno())
+                    registro = self._ler(caminho, inicio)
+                    if registro is not None:
+                        return registro['resultado'], True
+                    resultado = funcao()
+                    self._gravar(caminho, resultado)
+                    return resultado, False
+                finally:
+                    fcntl.flock(trava, fcntl.LOCK_UN)
+
+        (resultado, outro_processo), outra_thread = self._local.executar(chave, entre_processos)
+        return resultado, outro_processo or outra_thread
+
+    def _limpar_periodicamente(self, agora):
+        if self.max_idade is None or agora < self._proxima_limpeza:
+            return
+        with self._lock_limpeza:
+            if agora < self._proxima_limpeza:
+                return
+            self._proxima_limpeza = agora + self.max_idade
+        self.limpar(self.max_idade)
+
+    def limpar(self, max_idade=3600):
+        """
+        Remove travas e resultados sem uso há mais de max_idade segundos.
+
+        Se um processo ainda estiver esperando por uma trava removida, a pior
+        consequência é uma chamada duplicada ao ITI.
+        Returns:
+            int com o número de arquivos removidos
+        """
+        limite = time.time() - max_idade
+        removidos = 0
+        for arquivo in self.directory.glob('*/*'):
+            try:
+                if arquivo.stat().st_mtime < limite:
+                    arquivo.unlink()
+                    removidos += 1
+            except OSError:
+                continue
+        return removidos
@@ -0,0 +1,261 @@
+"""
+Upload em streaming para /arquivo.
+
+O corpo multipart/form-data é gerado sob demanda, em blocos lidos direto da
+origem (arquivo em disco, bytes ou qualquer objeto com read()), de modo que o
+consumo de memória por upload é limitado ao tamanho do bloco, seja qual for o
+tamanho do documento.
+"""
+
+import asyncio
+import hashlib
+import io
+import os
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+
+TAMANHO_BLOCO_UPLOAD = 64 * 1024
+
+# Fontes sem tamanho conhecido (ex.: streams não posicionáveis) são copiadas
+# para um arquivo temporário, mantido em memória apenas até este limite
+LIMITE_SPOOL_MEMORIA = 8 * 1024 * 1024
+
+NOME_PADRAO = "documento.pdf"
+
+
+class DocumentoUpload:
+    """
+    Documento a ser enviado, aberto a partir de um caminho, bytes ou stream.
+
+    Args:
+        fonte: Caminho (str/Path), bytes, objeto com read() ou iterável de bytes
+        filename: Nome enviado ao ITI (padrão: nome do arquivo/stream)
+        content_type: Tipo MIME da parte multipart
+        sha256: SHA-256 do conteúdo, se já calculado (evita uma nova leitura)
+
+    Atributos:
+        preflight: Resultado da verificação local (preenchido pelo cliente
+            ou por quem já a fez, ver preflight.inspecionar_pdf)
+    """
+
+    def __init__(self, fonte, filename=None, content_type='application/pdf', sha256=None):
+        self.content_type = content_type
+        self._fechar = False
+        self._digest = sha256
+        self.preflight = None
+        nome = None
+
+        if isinstance(fonte, (str, os.PathLike)):
+            path = Path(fonte)
+            if not path.exists():
+                raise FileNotFoundError(f"Arquivo não encontrado: {path}")
+            self.arquivo = path.open('rb')
+            self._fechar = True
+            nome = path.name
+        elif isinstance(fonte, (bytes, bytearray, memoryview)):
+            self.arquivo = io.BytesIO(fonte)
+            self._fechar = True
+        elif hasattr(fonte, 'read'):
+            self.arquivo = fonte
+            nome = getattr(fonte, 'name', None)
+            if not _posicionavel(fonte):
+                self.arquivo = _spool(iter(lambda: fonte.read(TAMANHO_BLOCO_UPLOAD), b''))
+                self._fechar = True
+        else:
+            self.arquivo = _spool(fonte)
+            self._fechar = True
+
+        if filename is None and isinstance(nome, (str, os.PathLike)):
+            filename = Path(nome).name
+        self.nome = filename or NOME_PADRAO
+
+        self.inicio = self.arquivo.tell()
+        self.arquivo.seek(0, os.SEEK_END)
+        self.tamanho = self.arquivo.tell() - self.inicio
+        self.arquivo.seek(self.inicio)
+
+    def __repr__(self):
+        return f"DocumentoUpload({self.nome!r}, {self.tamanho} bytes)"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """Fecha o arquivo se ele foi aberto (ou copiado) por esta classe."""
+        if self._fechar:
+            self.arquivo.close()
+
+    def rebobinar(self):
+        """Volta para o início do documento."""
+        self.arquivo.seek(self.inicio)
+
+    def blocos(self, tamanho=TAMANHO_BLOCO_UPLOAD):
+        """Itera sobre o conteúdo em blocos, a partir do início."""
+        self.rebobinar()
+        restante = self.tamanho
+        while restante > 0:
+            bloco = self.arquivo.read(min(tamanho, restante))
+            if not bloco:
+                break
+            restante -= len(bloco)
+            yield bloco
+
+    def sha256(self):
+        """Calcula (uma única vez) o SHA-256 do conteúdo."""
+        if self._digest is None:
+            h = hashlib.sha256()
+            for bloco in self.blocos(1024 * 1024):
+                h.update(bloco)
+            self.rebobinar()
+            self._digest = h.hexdigest()
+        return self._digest
+
+
+def _posicionavel(arquivo):
+    try:
+        return arquivo.seekable()
+    except (AttributeError, ValueError):
+        return False
+
+
+def _spool(blocos):
+    temp = tempfile.SpooledTemporaryFile(max_size=LIMITE_SPOOL_MEMORIA)
+    for bloco in blocos:
+        temp.write(bloco)
+    temp.seek(0)
+    return temp
+
+
+def abrir_documento(fonte, filename=None, content_type='application/pdf', sha256=None):
+    """
+    Abre a fonte como DocumentoUpload (devolve a própria fonte se já for um).
+    Ver DocumentoUpload.
+    """
+    if isinstance(fonte, DocumentoUpload):
+        return fonte
+    return DocumentoUpload(fonte, filename=filename, content_type=content_type, sha256=sha256)
+
+
+def _parametro_header(nome, valor):
+    # Mesmo escape do urllib3/navegadores (WHATWG): \n, \r e " viram %XX
+    valor = valor.translate({10: "%0A", 13: "%0D", 34: "%22"})
+    return f'{nome}="{valor}"'
+
+
+class MultipartStream:
+    """
+    Corpo multipart/form-data gerado em streaming.
+
+    Funciona como arquivo (read) para o requests, como iterável síncrono e
+    como iterável assíncrono (httpx.AsyncClient, via assincrono()). O tamanho total é conhecido
+    de antemão, então o envio usa Content-Length, não chunked.
+
+    Args:
+        partes: Lista de tuplas (nome do campo, DocumentoUpload)
+    """
+
+    def __init__(self, partes):
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={self.boundary}"
+        self._segmentos = []
+        for campo, documento in partes:
+            cabecalho = (
+                f"--{self.boundary}\r\n"
+                f"Content-Disposition: form-data; {_parametro_header('name', campo)}; "
+                f"{_parametro_header('filename', documento.nome)}\r\n"
+                f"Content-Type: {documento.content_type}\r\n\r\n"
+            ).encode('utf-8')
+            self._segmentos.extend([cabecalho, documento, b"\r\n"])
+        self._segmentos.append(f"--{self.boundary}--\r\n".encode('ascii'))
+        self.tamanho = sum(
+            s.tamanho if isinstance(s, DocumentoUpload) else len(s) for s in self._segmentos
+        )
+        self._iterador = None
+        # Bloco atual de read() e posição já lida nele (sem copiar o restante)
+        self._bloco = memoryview(b"")
+        self._posicao = 0
+        # Instantes (perf_counter) do início e do fim do último envio do corpo
+        self.iniciado_em = None
+        self.enviado_em = None
+
+    def __len__(self):
+        return self.tamanho
+
+    @property
+    def headers(self):
+        """Headers HTTP do corpo."""
+        return {'Content-Type': self.content_type, 'Content-Length': str(self.tamanho)}
+
+    def __iter__(self):
+        self.iniciado_em = time.perf_counter()
+        self.enviado_em = None
+        for segmento in self._segmentos:
+            if isinstance(segmento, DocumentoUpload):
+                yield from segmento.blocos()
+            else:
+                yield segmento
+        self.enviado_em = time.perf_counter()
+
+    async def __aiter__(self):
+        # Leituras de disco fora do event loop
+        iterador = iter(self)
+        fim = object()
+        while True:
+            bloco = await asyncio.to_thread(next, iterador, fim)
+            if bloco is fim:
+                break
+            yield bloco
+
+    def assincrono(self):
+        """
+        Retorna o corpo como iterável apenas assíncrono, como o httpx.AsyncClient
+        exige (objetos também iteráveis de forma síncrona são recusados).
+        """
+        return _CorpoAssincrono(self)
+
+    def seek(self, posicao, whence=os.SEEK_SET):
+        """Permite reenviar o corpo (apenas seek(0) é suportado)."""
+        if posicao != 0 or whence != os.SEEK_SET:
+            raise OSError("MultipartStream só pode voltar ao início")
+        self._iterador = None
+        self._bloco = memoryview(b"")
+        self._posicao = 0
+
+    def read(self, tamanho=-1):
+        """Lê até `tamanho` bytes do corpo (interface de arquivo)."""
+        if self._iterador is None:
+            self._iterador = iter(self)
+        partes = [self._bloco[self._posicao:]]
+        if tamanho is None or tamanho < 0:
+            partes.extend(self._iterador)
+            self._bloco = memoryview(b"")
+            self._posicao = 0
+            return b"".join(partes)
+        partes[0] = partes[0][:tamanho]
+        self._posicao += len(partes[0])
+        lidos = len(partes[0])
+        while lidos < tamanho:
+            bloco = next(self._iterador, b"")
+            if not bloco:
+                break
+            # Só o trecho devolvido é copiado; o resto do bloco fica para as
+            # próximas leituras
+            self._bloco = memoryview(bloco)
+            self._posicao = min(len(bloco), tamanho - lidos)
+            partes.append(self._bloco[:self._posicao])
+            lidos += self._posicao
+        return b"".join(partes)
+
+
+class _CorpoAssincrono:
+    def __init__(self, corpo):
+        self.corpo = corpo
+
+    def __aiter__(self):
+        return self.corpo.__aiter__()
@@ -0,0 +1,370 @@
+"""
+Observação de diretório: valida os documentos novos ou alterados assim que
+terminam de ser gravados (python -m validator_api watch <dir>).
+
+As mudanças chegam pelo watchdog (inotify no Linux, FSEvents no macOS,
+ReadDirectoryChangesW no Windows) quando ele está instalado; sem ele, ou com
+polling=True, o diretório é varrido periodicamente. Nos dois casos um arquivo
+só é validado depois de passar `debounce` segundos sem mudar de tamanho nem
+de mtime, para não enviar ao ITI um PDF que o scanner ainda está gravando.
+
+O estado de cada arquivo (path, mtime, tamanho, sha256, status) fica em um
+índice SQLite. Ao reiniciar, arquivos com o mesmo mtime e tamanho nem são
+lidos, e arquivos apenas "tocados" (mesmo hash) não são validados de novo.
+"""
+
+import fnmatch
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from .batch import abrir_jsonl
+from .client import ItiClient, base_url_padrao
+from .json_backend import dumps
+from .upload import DocumentoUpload
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # sem watchdog: varredura periódica
+    FileSystemEventHandler = object
+    Observer = None
+
+
+# Segundos sem mudanças (tamanho e mtime) antes de validar um arquivo
+DEBOUNCE_PADRAO = 2.0
+# Intervalo da varredura periódica (sem watchdog)
+INTERVALO_VARREDURA = 5.0
+# Intervalo em que os arquivos pendentes são verificados
+INTERVALO_VERIFICACAO = 0.5
+
+NOME_ESTADO = ".validador_iti.db"
+SUFIXO_RESULTADO = ".iti.json"
+# Arquivos temporários de cópias e downloads em andamento
+SUFIXOS_TEMPORARIOS = (".tmp", ".part", ".partial", ".crdownload", ".swp", "~")
+
+
+def _assinatura(st):
+    """(mtime em ns, tamanho): muda quando o arquivo é regravado."""
+    return st.st_mtime_ns, st.st_size
+
+
+def _gravar_atomico(destino, dados):
+    fd, tmp = tempfile.mkstemp(dir=destino.parent, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(dados)
+        os.replace(tmp, destino)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class EstadoArquivos:
+    """
+    Índice persistente (SQLite) dos arquivos já validados.
+
+    Args:
+        path: Arquivo do banco (criado se não existir)
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS arquivos ("
+            " path TEXT PRIMARY KEY,"
+            " mtime_ns INTEGER NOT NULL,"
+            " tamanho INTEGER NOT NULL,"
+            " sha256 TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " validado_em REAL NOT NULL)"
+        )
+
+    def __repr__(self):
+        return f"EstadoArquivos({str(self.path)!r})"
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM arquivos").fetchone()[0]
+
+    def obter(self, path):
+        """
+        Returns:
+            dict com mtime_ns, tamanho, sha256 e status, ou None se o arquivo não foi validado
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT mtime_ns, tamanho, sha256, status FROM arquivos WHERE path = ?", (str(path),)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"mtime_ns": row[0], "tamanho": row[1], "sha256": row[2], "status": row[3]}
+
+    def registrar(self, path, assinatura, sha256, status):
+        """Grava o estado do arquivo depois de validado (assinatura = (mtime_ns, tamanho))."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO arquivos (path, mtime_ns, tamanho, sha256, status, validado_em)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (str(path), assinatura[0], assinatura[1], sha256, status, time.time())
+            )
+
+    def assinaturas(self):
+        """dict path -> (mtime_ns, tamanho) de todos os arquivos do índice."""
+        with self._lock:
+            return {p: (m, t) for p, m, t in self._conn.execute("SELECT path, mtime_ns, tamanho FROM arquivos")}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class _Eventos(FileSystemEventHandler):
+    """Repassa ao observador os caminhos criados, alterados ou movidos."""
+
+    def __init__(self, observador):
+        self.observador = observador
+
+    def on_any_event(self, event):
+        if event.is_directory or event.event_type not in ("created", "modified", "moved", "closed"):
+            return
+        caminho = getattr(event, "dest_path", None) or event.src_path
+        self.observador.notificar(os.fsdecode(caminho))
+
+
+class ObservadorDiretorio:
+    """
+    Observa um diretório e valida cada documento novo ou alterado.
+
+    Exemplo:
+        observador = ObservadorDiretorio("/srv/scanner", output="resultados.jsonl")
+        observador.run()  # até observador.stop() (ou Ctrl+C)
+
+    Args:
+        directory: Diretório observado
+        client: ItiClient usado nas validações (padrão: um cliente novo, fechado ao final)
+        output: JSONL de resultados (caminho, objeto com write() ou None)
+        sidecar: Se True, grava o resultado ao lado de cada arquivo (<arquivo>.iti.json)
+        state: Índice SQLite do estado (padrão: <directory>/.validador_iti.db)
+        pattern: Padrão dos nomes validados (padrão: "*.pdf")
+        recursive: Se True, observa também os subdiretórios
+        debounce: Segundos sem mudanças antes de validar um arquivo
+        workers: Validações simultâneas
+        polling: Se True, usa a varredura periódica mesmo com o watchdog instalado
+        interval: Intervalo (segundos) da varredura periódica
+        progress: Função chamada com (path, resultado, contadores) a cada documento
+    """
+
+    def __init__(self, directory, client=None, output=None, sidecar=False, state=None, pattern="*.pdf",
+                 recursive=True, debounce=DEBOUNCE_PADRAO, workers=4, polling=False,
+                 interval=INTERVALO_VARREDURA, progress=None):
+        self.directory = Path(directory)
+        if not self.directory.is_dir():
+            raise NotADirectoryError(f"Diretório não encontrado: {self.directory}")
+        if workers < 1:
+            raise ValueError("workers deve ser >= 1")
+
+        self._fechar_cliente = client is None
+        self.client = client if client is not None else ItiClient(base_url=base_url_padrao(), pool_maxsize=workers)
+        self.sidecar = sidecar
+        self.pattern = pattern
+        self.recursive = recursive
+        self.debounce = debounce
+        self.workers = workers
+        self.polling = polling or Observer is None
+        self.interval = interval
+        self.progress = progress
+
+        self.estado = EstadoArquivos(state or self.directory / NOME_ESTADO)
+        if output is None and sidecar:
+            self._saida, self._fechar_saida = None, False
+        elif output is None:
+            self._saida, self._fechar_saida = sys.stdout, False
+        elif isinstance(output, (str, Path)):
+            self._saida, self._fechar_saida = abrir_jsonl(output), True
+        else:
+            self._saida, self._fechar_saida = output, False
+
+        self.contadores = {"skipped": 0, "total": 0}
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        # path -> (assinatura, instante em que foi vista pela primeira vez)
+        self._pendentes = {}
+        self._em_andamento = set()
+        # Última assinatura conhecida de cada arquivo (evita notificar o que não mudou)
+        self._vistos = self.estado.assinaturas()
+
+    def __repr__(self):
+        modo = "polling" if self.polling else "watchdog"
+        return f"ObservadorDiretorio({str(self.directory)!r}, {modo})"
+
+    def aceita(self, path):
+        """Indica se o arquivo deve ser validado (padrão, temporários e arquivos do próprio observador)."""
+        nome = path.name
+        if nome.startswith(('.', '~$')) or nome.endswith(SUFIXOS_TEMPORARIOS) or nome.endswith(SUFIXO_RESULTADO):
+            return False
+        if path == self.estado.path or not fnmatch.fnmatch(nome, self.pattern):
+            return False
+        return self.recursive or path.parent == self.directory
+
+    def notificar(self, path):
+        """Registra uma mudança em um arquivo (chamado pelo watchdog ou pela varredura)."""
+        path = Path(path)
+        if not self.aceita(path):
+            return
+        with self._lock:
+            # A contagem do debounce começa na próxima verificação
+            self._pendentes.setdefault(str(path), None)
+
+    def varrer(self):
+        """Notifica os arquivos do diretório cuja assinatura (mtime, tamanho) mudou."""
+        caminhos = self.directory.rglob(self.pattern) if self.recursive else self.directory.glob(self.pattern)
+        for path in caminhos:
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            if not path.is_file() or not self.aceita(path):
+                continue
+            if self._vistos.get(str(path)) != _assinatura(st):
+                self.notificar(path)
+
+    def _prontos(self):
+        """Arquivos pendentes que passaram `debounce` segundos sem mudar."""
+        agora = time.monotonic()
+        prontos = []
+        with self._lock:
+            pendentes = list(self._pendentes.items())
+        for caminho, anterior in pendentes:
+            try:
+                assinatura = _assinatura(os.stat(caminho))
+            except OSError:
+                # Removido (ou movido) antes de terminar de ser gravado
+                with self._lock:
+                    self._pendentes.pop(caminho, None)
+                continue
+            with self._lock:
+                if anterior is None or anterior[0] != assinatura:
+                    self._pendentes[caminho] = (assinatura, agora)
+                elif agora - anterior[1] >= self.debounce and caminho not in self._em_andamento:
+                    del self._pendentes[caminho]
+                    self._em_andamento.add(caminho)
+                    self._vistos[caminho] = assinatura
+                    prontos.append((caminho, assinatura))
+        return prontos
+
+    def processar(self, caminho, assinatura):
+        """
+        Valida um arquivo estável, a menos que o índice mostre que o conteúdo não mudou.
+        Returns:
+            dict com o resultado, ou None se o arquivo foi pulado
+        """
+        try:
+            registro = self.estado.obter(caminho)
+            if registro is not None and (registro["mtime_ns"], registro["tamanho"]) == assinatura:
+                return self._pular()
+            with DocumentoUpload(caminho) as documento:
+                digest = documento.sha256()
+                # Arquivo regravado com o mesmo conteúdo (cópia, touch): só atualiza o índice
+                if registro is not None and registro["sha256"] == digest:
+                    self.estado.registrar(caminho, assinatura, digest, registro["status"])
+                    return self._pular()
+                try:
+                    resultado = self.client.validate_document(documento)
+                except Exception as e:
+                    resultado = {"status": "error", "error": str(e)}
+        except OSError as e:
+            digest = None
+            resultado = {"status": "error", "error": str(e)}
+        finally:
+            with self._lock:
+                self._em_andamento.discard(caminho)
+
+        status = resultado.get('status', 'unknown')
+        # Erros (de rede, do ITI) ficam fora do índice para serem refeitos na próxima mudança ou reinício
+        if digest is not None and status != 'error':
+            self.estado.registrar(caminho, assinatura, digest, status)
+        self._gravar(caminho, digest, resultado)
+        return resultado
+
+    def _pular(self):
+        with self._lock:
+            self.contadores["skipped"] += 1
+        return None
+
+    def _gravar(self, caminho, digest, resultado):
+        linha = {"path": caminho, "sha256": digest, **resultado}
+        if self.sidecar:
+            try:
+                _gravar_atomico(Path(caminho + SUFIXO_RESULTADO), dumps(linha))
+            except OSError as e:
+                linha["sidecar_error"] = str(e)
+        dados = dumps(linha)
+        with self._lock:
+            if self._saida is not None:
+                self._saida.write(dados.decode('utf-8') + '\n')
+                self._saida.flush()
+            status = resultado.get('status', 'unknown')
+            self.contadores[status] = self.contadores.get(status, 0) + 1
+            self.contadores["total"] += 1
+            if self.progress is not None:
+                self.progress(caminho, resultado, self.contadores)
+
+    def _iniciar_watchdog(self):
+        observer = Observer()
+        observer.schedule(_Eventos(self), str(self.directory), recursive=self.recursive)
+        observer.start()
+        return observer
+
+    def run(self, duration=None):
+        """
+        Observa o diretório até stop() (ou até `duration` segundos).
+
+        Arquivos criados ou alterados enquanto o observador estava parado são
+        encontrados pela varredura inicial.
+        Returns:
+            dict com contadores por status, 'skipped' e 'total'
+        """
+        observer = None if self.polling else self._iniciar_watchdog()
+        fim = None if duration is None else time.monotonic() + duration
+        ultima_varredura = time.monotonic()
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="watch") as executor:
+                self.varrer()
+                while not self._parar.wait(INTERVALO_VERIFICACAO):
+                    for caminho, assinatura in self._prontos():
+                        executor.submit(self.processar, caminho, assinatura)
+                    agora = time.monotonic()
+                    if self.polling and agora - ultima_varredura >= self.interval:
+                        self.varrer()
+                        ultima_varredura = agora
+                    if fim is not None and agora >= fim:
+                        break
+        finally:
+            if observer is not None:
+                observer.stop()
+                observer.join()
+            self.close()
+        return self.contadores
+
+    def stop(self):
+        """Pede o encerramento de run() (as validações em andamento terminam antes)."""
+        self._parar.set()
+
+    def close(self):
+        """Fecha o índice, a saída JSONL (se foi aberta aqui) e o cliente (se foi criado aqui)."""
+        self.estado.close()
+        if self._fechar_saida:
+            self._saida.close()
+        if self._fechar_cliente:
+            self.client.close()